@@ -0,0 +1,58 @@
+"""
+Session overhead per dashboard request, by session engine.
+
+Run with:  pytest benchmarks/bench_sessions.py -s
+Prints mean wall time and django_session queries per dashboard GET for the
+plain DB engine, Django's cached_db, and the coalescing main.sessions store.
+"""
+import time
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from main.utils.preview_codec import set_preview
+
+
+ENGINES = [
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+    "main.sessions",
+]
+REQUESTS = 50
+
+
+def measure_dashboard(client, requests=REQUESTS):
+    """Returns (seconds per request, django_session queries per request)."""
+    url = reverse("main:dashboard")
+    client.get(url)  # warm up templates and the session cache
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        elapsed = time.perf_counter() - start
+    session_queries = sum("django_session" in q["sql"] for q in queries.captured_queries)
+    return elapsed / requests, session_queries / requests
+
+
+@pytest.mark.django_db
+def test_session_overhead_per_dashboard_request(django_user_model, settings):
+    results = {}
+    for engine in ENGINES:
+        settings.SESSION_ENGINE = engine
+        cache.clear()
+        client = Client()  # SessionMiddleware picks its engine when the handler is built
+        user, _ = django_user_model.objects.get_or_create(username=f"bench-{engine}")
+        client.force_login(user)
+        session = client.session
+        set_preview(session, [{"name": f"Student {i}", "score1": i % 5, "score2": i % 4} for i in range(30)])
+        session["wizard"] = {"lesson_1_id": "5", "lesson_2_id": "6", "step1_done": True, "step2_done": True}
+        session.save()
+        results[engine] = measure_dashboard(client)
+
+    print("\nengine                                        ms/request  session queries/request")
+    for engine, (seconds, session_queries) in results.items():
+        print(f"{engine:<45} {seconds * 1000:>10.2f}  {session_queries:>23.2f}")
+
+    assert results["main.sessions"][1] < results["django.contrib.sessions.backends.db"][1]
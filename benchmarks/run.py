@@ -0,0 +1,183 @@
+"""
+Timing suite for the grouping, parsing, export and session hot paths.
+
+    python -m benchmarks.run                      # tiny, class, school rosters
+    python -m benchmarks.run --sizes all          # adds the 100k-student district roster
+    python -m benchmarks.run --save               # record timings as the new baseline
+    python -m benchmarks.run --check              # exit 1 if anything is >25% slower than baseline
+    python -m benchmarks.run --check --threshold 1.5 --only assign_group
+
+Each case is timed --repeat times on the same input and the fastest run is
+reported (the least noisy estimate). Baselines live in benchmarks/baselines.json
+and are only comparable on the machine that recorded them; re-run --save after
+changing hardware.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "sort2support.settings")
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from main import views  # noqa: E402
+from main.main_utils import assign_group, find_lesson, load_ufli_lessons  # noqa: E402
+from main.sessions import SessionStore  # noqa: E402
+from main.utils.parse_excel import parse_roster_dataframe, parse_roster_workbook  # noqa: E402
+from main.utils.polished_export import build_export_bytes  # noqa: E402
+from main.utils.preview_codec import set_preview  # noqa: E402
+from main.wizard import WizardState, lesson_meta  # noqa: E402
+from benchmarks.synthetic import SIZES, preview_rows, roster_xlsx  # noqa: E402
+
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+LESSON_IDS = ("5", "6")
+
+
+def _lessons():
+    catalog = load_ufli_lessons()
+    return [find_lesson(catalog, lesson_id) for lesson_id in LESSON_IDS]
+
+
+def _grouped(n):
+    lesson_1, lesson_2 = _lessons()
+    return assign_group(preview_rows(n), lesson_1, lesson_2, {})
+
+
+# ---------- Cases: each takes a roster size and returns the callable to time ----------
+
+def case_assign_group(n):
+    rows = preview_rows(n)
+    lesson_1, lesson_2 = _lessons()
+    return lambda: assign_group(rows, lesson_1, lesson_2, {})
+
+
+def case_dashboard_upload_parse(n):
+    data = roster_xlsx(n)
+    return lambda: parse_roster_dataframe(data)
+
+
+def case_upload_page_parse(n):
+    data = roster_xlsx(n)
+    return lambda: parse_roster_workbook(data)
+
+
+def case_generate_excel(n):
+    _, grouped_data = _grouped(n)
+    meta = lesson_meta(*_lessons())
+    return lambda: build_export_bytes(grouped_data, meta["lesson_1"], meta["lesson_2"])
+
+
+def case_export_grouped_excel(n):
+    _, grouped_data = _grouped(n)
+    request = RequestFactory().get("/")
+    request.user = User(username="bench")
+    request.session = SessionStore()
+    request.session["grouped_data"] = grouped_data
+    wizard = WizardState()
+    wizard.set_lessons(*_lessons())
+    wizard.save(request.session)
+    return lambda: views.export_grouped_excel(request)
+
+
+def case_session_roundtrip(n):
+    _, grouped_data = _grouped(n)
+    session = SessionStore()
+    set_preview(session, preview_rows(n))
+    session["grouped_data"] = grouped_data
+    data = dict(session.items())
+    return lambda: session.decode(session.encode(data))
+
+
+CASES = {
+    "assign_group": case_assign_group,
+    "dashboard_upload_parse": case_dashboard_upload_parse,
+    "upload_page_parse": case_upload_page_parse,
+    "generate_excel": case_generate_excel,
+    "export_grouped_excel": case_export_grouped_excel,
+    "session_roundtrip": case_session_roundtrip,
+}
+
+
+def time_case(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, only=None, repeat=5):
+    """Returns {"case[size]": seconds}."""
+    results = {}
+    for name, case in CASES.items():
+        if only and name not in only:
+            continue
+        for size_name in sizes:
+            n = SIZES[size_name]
+            func = case(n)
+            key = f"{name}[{size_name}]"
+            # The 100k-student cases take seconds each; one run is enough
+            results[key] = time_case(func, 1 if n >= 100_000 else repeat)
+            print(f"{key:<40} {results[key] * 1000:>12.2f} ms", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the (key, ratio) pairs slower than threshold x baseline."""
+    regressions = []
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        if before:
+            ratio = seconds / before
+            marker = "  REGRESSION" if ratio > threshold else ""
+            print(f"{key:<40} {before * 1000:>10.2f} -> {seconds * 1000:>10.2f} ms  x{ratio:.2f}{marker}")
+            if ratio > threshold:
+                regressions.append((key, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="tiny,class,school", help=f"comma list of {', '.join(SIZES)}, or 'all'")
+    parser.add_argument("--only", help="comma list of cases to run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--check", action="store_true", help="compare against the baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    sizes = list(SIZES) if args.sizes == "all" else args.sizes.split(",")
+    only = set(args.only.split(",")) if args.only else None
+    results = run(sizes, only, args.repeat)
+
+    if args.save:
+        saved = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        saved.setdefault("results", {}).update({key: round(seconds, 6) for key, seconds in results.items()})
+        saved["machine"] = f"{platform.python_implementation()} {platform.python_version()} / {platform.machine()}"
+        args.baseline.write_text(json.dumps(saved, indent=2, sort_keys=True) + "\n")
+        print(f"Saved {len(results)} timings to {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            print(f"No baseline at {args.baseline}; run with --save first.")
+            return 2
+        regressions = compare(results, json.loads(args.baseline.read_text())["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than x{args.threshold} baseline.")
+            return 1
+        print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
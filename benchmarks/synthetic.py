@@ -0,0 +1,38 @@
+"""
+Synthetic rosters for the benchmarks: deterministic names and scores, in the
+shapes the app passes around (preview rows, uploaded .xlsx bytes, grouped data).
+"""
+import io
+import random
+from openpyxl import Workbook
+
+
+SIZES = {"tiny": 25, "class": 500, "school": 10_000, "district": 100_000}
+
+
+def preview_rows(n, max_points=5, seed=0):
+    """n preview rows like parse_roster_dataframe returns, ~3% with a missing score."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        missing1, missing2 = rng.random() < 0.03, rng.random() < 0.03
+        rows.append({
+            "name": f"Student {i:06d}",
+            "score1": 0 if missing1 else rng.randint(0, max_points),
+            "score2": 0 if missing2 else rng.randint(0, max_points),
+            "missing_score1": missing1,
+            "missing_score2": missing2,
+        })
+    return rows
+
+
+def roster_xlsx(n, seed=0):
+    """An uploaded roster workbook (Name, Score1, Score2) as bytes."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Roster")
+    ws.append(["Name", "Score1", "Score2"])
+    for row in preview_rows(n, seed=seed):
+        ws.append([row["name"], None if row["missing_score1"] else row["score1"], row["score2"]])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,24 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def _unhashed_static_files(settings):
+    """Tests run without collectstatic, so {% static %} must not need the manifest."""
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    """Rolled-back test databases reuse primary keys, so per-user cache entries must not outlive a test."""
+    cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _coalescing_sessions(settings):
+    """Tests run in one process, so the local cache is shared and the dashboard's session engine can be used."""
+    settings.SESSION_ENGINE = "main.sessions"
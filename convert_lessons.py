@@ -1,23 +1,22 @@
-import pandas as pd
-import json
+"""
+Rebuilds the lesson catalog without Django (same as `manage.py build_catalog`).
 
-# 1. Load your CSV file (export your lesson table as CSV first)
-# Make sure the CSV has headers: Lesson, Concept, Irregular Words, New Concept Points
-df = pd.read_csv("lessons.csv")
+    python convert_lessons.py                 # from main/data/ufli_lessons.csv
+    python convert_lessons.py lessons.csv --force
 
-records = []
+The CSV needs headers: Lesson, Concept, Irregular Words, New Concept Points.
+"""
+import argparse
+from pathlib import Path
 
-# 2. Convert each row into a dictionary
-for _, row in df.iterrows():
-    records.append({
-        "number": str(row["Lesson"]).strip(),  # keep lesson numbers as strings (handles 35a, 35b, etc.)
-        "concept": str(row["Concept"]).strip() if pd.notna(row["Concept"]) else "",
-        "irregular_words": str(row["Irregular Words"]).strip() if pd.notna(row["Irregular Words"]) else "",
-        "total_points": int(row["New Concept Points"]) if pd.notna(row["New Concept Points"]) else None
-    })
+from main.utils.catalog import build_catalog
 
-# 3. Save to JSON
-with open("ufli_lessons.json", "w", encoding="utf-8") as f:
-    json.dump(records, f, ensure_ascii=False, indent=2)
+BASE_DIR = Path(__file__).resolve().parent
 
-print("✅ JSON file created: ufli_lessons.json")
\ No newline at end of file
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("source", nargs="?", default=BASE_DIR / "main" / "data" / "ufli_lessons.csv")
+parser.add_argument("--force", action="store_true")
+args = parser.parse_args()
+
+written, artifact = build_catalog(args.source, BASE_DIR / "main" / "static" / "main" / "data" / "ufli_lessons.json", args.force)
+print(f"✅ Catalog {artifact['version']} written ({len(artifact['lessons'])} lessons)" if written else "Catalog is up to date.")
@@ -6,14 +6,21 @@ from openpyxl.styles import Font, PatternFill
 from datetime import datetime
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from main import main_utils
 from main.models import Student
+from main.utils.preview_codec import set_preview
+from main.utils.upload_limits import UploadRejected, read_checked_upload
 from .utils import parse_excel  # generate_excel - add later?
 from django.views.decorators.http import require_POST
 from django import forms
+from django.db.models import F
+from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 from django.forms import modelformset_factory
+import io
 import json
+import re
 from django.conf import settings
 import os
 import pandas as pd
@@ -27,6 +34,9 @@ from django.http import HttpResponse
 from django.shortcuts import redirect
 from excel_app.utils.parse_excel import parse_excel # or parse_excel
 from .utils.grouping import assign_group 
+import logging
+
+logger = logging.getLogger(__name__)
 
 @login_required
 def saved_roster(request):
@@ -127,9 +137,11 @@ def manual_roster_entry(request):
 
 # --- Excel parsing helper ---
 
-def parse_excel(file):
-    """Read Excel file and return list of dicts (one per row)."""
-    df = pd.read_excel(file)
+def parse_excel(file, max_rows=None):
+    """Read Excel file and return list of dicts (one per row), stopping after max_rows."""
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    df = pd.read_excel(file, nrows=max_rows)
     return df.to_dict(orient="records")
 
 
@@ -167,9 +179,15 @@ def parse_excel_upload(request):
         if uploaded_file:
             request.session.pop("uploaded_students", None)
             request.session.pop("saved_students", None)
+            try:
+                data, shape = read_checked_upload(uploaded_file)
+            except UploadRejected as e:
+                messages.error(request, f"❌ Upload rejected: {e}")
+                return redirect("main:dashboard")
+
             request.session["file_uploaded"] = True
 
-            rows = parse_excel(uploaded_file)
+            rows = parse_excel(data, shape.max_rows)
 
             def normalize(header):
                 return header.strip().lower().replace("_", " ")
@@ -212,7 +230,7 @@ def parse_excel_upload(request):
                 merged[name] = student_data
                 preview_data.append(preview_row)
 
-            request.session["preview_data"] = preview_data
+            set_preview(request.session, preview_data)
             request.session["uploaded_students"] = list(merged.values())
             request.session["score_columns"] = score_columns
             request.session["score_keys"] = score_keys
@@ -236,26 +254,34 @@ def save_student_scores(request):
     is_edit_mode = request.GET.get("edit") == "true"
 
     if is_edit_mode:
-        saved_count = 0
-
-        student_ids = [s.id for s in Student.objects.filter(teacher=request.user)]
-        for student_id in student_ids:
-            student = Student.objects.get(id=student_id)
-
+        # The page posts only the rows the teacher changed, each with the
+        # version it was loaded with; rows saved elsewhere since are skipped
+        changes = {}
+        for key, value in request.POST.items():
+            match = re.fullmatch(r"version_(\d+)", key)
+            if not match or not value.isdigit():
+                continue
+            student_id = int(match.group(1))
             score_1_raw = request.POST.get(f"ufli_score_1_{student_id}", "").strip()
             score_2_raw = request.POST.get(f"ufli_score_2_{student_id}", "").strip()
-            
-            student.ufli_score_1 = int(score_1_raw) if score_1_raw.isdigit() else None
-            student.ufli_score_2 = int(score_2_raw) if score_2_raw.isdigit() else None
+            changes[student_id] = {
+                "version": int(value),
+                "ufli_score_1": int(score_1_raw) if score_1_raw.isdigit() else None,
+                "ufli_score_2": int(score_2_raw) if score_2_raw.isdigit() else None,
+            }
 
-            print(f"✅ Saving {student.name}: {student.ufli_score_1}, {student.ufli_score_2}")
-            student.save()
-            saved_count += 1
+        saved, conflicts = Student.apply_score_changes(request.user, changes)
+        logger.debug("Saved scores for %s students, %s conflicts", len(saved), len(conflicts))
 
         messages.success(
             request,
-            f"✅ Saved {saved_count} students."
+            f"✅ Saved {len(saved)} students."
         )
+        if conflicts:
+            messages.warning(
+                request,
+                f"⚠️ {len(conflicts)} students were changed in another tab and not saved. Reload to see their latest scores."
+            )
         return redirect(reverse("main:dashboard") + "#sort2support")
 
 
@@ -292,13 +318,16 @@ def preview_uploaded_students(request):
     is_edit_mode = request.GET.get("edit") == "true"
 
     if is_edit_mode:
-        students = Student.objects.filter(teacher=request.user)
-        table = convert_students_to_dicts(students)
+        table = Student.objects.filter(teacher=request.user).values("id", "name", *Student.SCORE_FIELDS, "version")
+        concepts, score_keys = ["Score 1", "Score 2"], Student.SCORE_FIELDS
     else:
         table = request.session.get("uploaded_students", [])
+        concepts, score_keys = request.session.get("score_columns", []), request.session.get("score_keys", [])
 
     return render(request, "excel_app/preview.html", {
         "table": table,
+        "concepts": concepts,
+        "score_keys": score_keys,
         "is_edit_mode": is_edit_mode,
     })
 def add_group_color_highlighting(ws, start_row=2, last_col="E", group_col="B"):
@@ -363,16 +392,8 @@ def clear_preview_scores(request):
     return redirect("main:upload_page")
 # ---------- Load UFLI lessons ----------
 def load_ufli_lessons():
-    path = os.path.join(settings.BASE_DIR, "main", "static", "main", "data", "ufli_lessons.json")
-    with open(path, encoding="utf-8") as f:
-        lessons = json.load(f)
-
-    # Ensure every lesson has a total_points field
-    for lesson in lessons:
-        if "total_points" not in lesson:
-            lesson["total_points"] = 5  # fallback
-
-    return lessons
+    # The built catalog guarantees total_points on every lesson
+    return list(main_utils.load_ufli_lessons())
 
 ufli_lessons = load_ufli_lessons()
 
@@ -383,14 +404,13 @@ def save_students(request):
         teacher = request.user  # ✅ Get the logged-in teacher
 
         for student in students:
-            Student.objects.update_or_create(
-                name=student["name"],
-                teacher=teacher,  # ✅ Link to teacher
-                defaults={
-                    "ufli_score_1": student["ufli_score_1"],
-                    "ufli_score_2": student["ufli_score_2"],
-                }
+            # One version-bumping UPDATE per name, creating the student only if it's new
+            scores = {"ufli_score_1": student["ufli_score_1"], "ufli_score_2": student["ufli_score_2"]}
+            updated = Student.objects.filter(name=student["name"], teacher=teacher).update(
+                version=F("version") + 1, last_updated=timezone.now(), **scores
             )
+            if not updated:
+                Student.objects.create(name=student["name"], teacher=teacher, **scores)  # ✅ Link to teacher
 
         # ✅ Clear session before redirect
         request.session.pop("uploaded_students", None)
@@ -405,8 +425,13 @@ def save_students(request):
 
 def parse_excel_upload(request):
     if request.method == "POST" and request.FILES.get("file"):
-        file = request.FILES["file"]
-        student_data = parse_excel(file)  # returns list of dicts with name, score1, score2
+        try:
+            data, shape = read_checked_upload(request.FILES["file"])
+        except UploadRejected as e:
+            messages.error(request, f"❌ Upload rejected: {e}")
+            return redirect("main:dashboard")
+
+        student_data = parse_excel(data, shape.max_rows)  # returns list of dicts with name, score1, score2
 
         # Save to session for grouping
         request.session["student_data"] = student_data
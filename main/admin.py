@@ -1,10 +1,42 @@
-from django.contrib import admin
-from .models import Student, StudentGroup, Assignment, Profile
+from django import forms
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+from .models import (
+    Student, StudentGroup, Assignment, Profile, InterventionSchedule, AssessmentResult, LessonRollup, Roster, StaleVersion,
+)
+
+class VersionedAdmin(admin.ModelAdmin):
+    """
+    Change forms for VersionedModels carry the version they were opened at, so
+    saving over someone else's newer save shows an error instead of a 500.
+    """
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name == "version":
+            kwargs["widget"] = forms.HiddenInput
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
+        # Caught out here, after the view's transaction has rolled back, so nothing half-saves
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except StaleVersion:
+            self.message_user(
+                request,
+                "⚠️ This record was changed by someone else after you opened it, so your changes were not saved. "
+                "Review the latest version and try again.",
+                messages.ERROR,
+            )
+            return HttpResponseRedirect(request.get_full_path())
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(VersionedAdmin):
     list_display = ("name", "teacher", "ufli_score_1", "ufli_score_2", "last_updated")
 
+@admin.register(Roster)
+class RosterAdmin(VersionedAdmin):
+    list_display = ("name", "user", "version", "created_at")
+
 @admin.register(StudentGroup)
 class StudentGroupAdmin(admin.ModelAdmin):
     list_display = ("name", "teacher")
@@ -15,4 +47,18 @@ class AssignmentAdmin(admin.ModelAdmin):
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ("user", "has_paid")
+    list_display = ("user", "has_paid", "school")
+
+@admin.register(InterventionSchedule)
+class InterventionScheduleAdmin(admin.ModelAdmin):
+    list_display = ("name", "teacher", "school", "group_capacity", "updated_at")
+
+@admin.register(AssessmentResult)
+class AssessmentResultAdmin(admin.ModelAdmin):
+    list_display = ("student_name", "teacher", "lesson_number", "score", "max_points", "band", "tier", "assessed_on")
+    list_filter = ("lesson_number", "assessed_on")
+
+@admin.register(LessonRollup)
+class LessonRollupAdmin(admin.ModelAdmin):
+    list_display = ("teacher", "lesson_number", "assessed_on", "count", "mean", "median")
+    list_filter = ("lesson_number", "assessed_on")
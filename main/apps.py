@@ -5,4 +5,5 @@ class MainConfig(AppConfig):
     name = 'main'
 
     def ready(self):
+        import main.checks  # noqa: F401
         import main.signals
\ No newline at end of file
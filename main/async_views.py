@@ -0,0 +1,166 @@
+"""
+Async (ASGI) versions of the upload, grouping and export endpoints.
+
+Parsing and openpyxl work runs on the shared offload pool (main/utils/offload.py)
+so a uvicorn worker keeps serving other teachers while a workbook is being read
+or built.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect
+from django.views.decorators.http import require_POST
+from main.models import AssessmentResult, InterventionSchedule, Student
+from main.main_utils import GROUPING_CACHE_SECONDS, load_ufli_lessons, find_lesson, assign_group, grouping_cache_key
+from main.utils.offload import OffloadBusy, arun_offloaded
+from main.utils.parse_excel import MissingColumnsError, parse_roster_dataframe, parse_roster_workbook
+from main.utils.polished_export import build_export_bytes
+from main.utils.preview_codec import PreviewRoster
+from main.utils.profiling import phase
+from main.utils.upload_limits import UploadRejected, read_checked_upload
+from main.views import _export_summaries, _grouped_fragment, _json_payload
+from main.wizard import WizardState, lesson_meta
+
+
+# ---------- Upload ----------
+
+@login_required
+@require_POST
+async def upload_roster_async(request):
+    """Async Step 2b: parse an uploaded roster (name, score1, score2) into the preview table."""
+    roster_file = request.FILES.get("roster_file")
+    if not roster_file:
+        messages.error(request, "⚠️ No file was uploaded. Please select a file and try again.", extra_tags="step2")
+        return redirect("main:dashboard")
+
+    try:
+        data, shape = read_checked_upload(roster_file)
+    except UploadRejected as e:
+        messages.error(request, f"❌ Upload rejected: {e}", extra_tags="step2")
+        return redirect("main:dashboard")
+
+    try:
+        preview_data = await arun_offloaded(parse_roster_dataframe, data, shape.max_rows)
+    except OffloadBusy:
+        raise
+    except MissingColumnsError as e:
+        messages.error(request, f"❌ {e}")
+        return redirect("main:dashboard")
+    except Exception:
+        messages.error(request, "❌ Upload failed: invalid file.", extra_tags="step2")
+        return redirect("main:dashboard")
+
+    if not preview_data:
+        messages.error(request, "❌ Upload failed: no valid rows.", extra_tags="step2")
+        return redirect("main:dashboard")
+
+    await request.session.aset("preview_data", PreviewRoster.from_rows(preview_data).encode())
+    wizard = await WizardState.aload(request.session)
+    wizard.update(entry_mode="upload", student_count=len(preview_data))
+    wizard.complete("step2")
+    await wizard.asave(request.session)
+    messages.success(request, f"✅ {len(preview_data)} names processed from upload.", extra_tags="step2")
+    if shape.truncated:
+        messages.warning(request, f"⚠️ Only the first {shape.max_rows} rows were loaded.", extra_tags="step2")
+    return redirect("main:dashboard")
+
+@login_required
+async def upload_page_async(request):
+    """Async version of upload_page: first three columns of the active sheet become the preview."""
+    if request.method == "POST" and request.FILES.get("file"):
+        try:
+            data, shape = read_checked_upload(request.FILES["file"])
+        except UploadRejected as e:
+            messages.error(request, f"❌ Upload rejected: {e}")
+            return redirect("main:dashboard")
+
+        preview_data = await arun_offloaded(parse_roster_workbook, data, shape.max_rows)
+        if shape.truncated:
+            messages.warning(request, f"⚠️ Only the first {shape.max_rows} rows were loaded.")
+        await request.session.aset("preview_data", PreviewRoster.from_rows(preview_data).encode())
+        wizard = await WizardState.aload(request.session)
+        wizard.update(entry_mode="preview", student_count=len(preview_data))
+        await wizard.asave(request.session)
+    return redirect("main:dashboard")
+
+
+# ---------- Grouping ----------
+
+@login_required
+@require_POST
+async def group_async(request):
+    """Async version of api_group: regroups the session roster and returns the refreshed tables."""
+    payload = _json_payload(request) or {}
+    wizard = await WizardState.aload(request.session)
+    lesson_1_id = payload.get("lesson_1") or wizard.lesson_1_id
+    lesson_2_id = payload.get("lesson_2") or wizard.lesson_2_id
+
+    ufli_lessons = load_ufli_lessons()
+    lesson_1 = find_lesson(ufli_lessons, lesson_1_id)
+    lesson_2 = find_lesson(ufli_lessons, lesson_2_id)
+    preview_data = PreviewRoster.decode(await request.session.aget("preview_data"))
+
+    if not lesson_1 or not lesson_2 or not preview_data:
+        return JsonResponse({
+            "ok": False,
+            "error": "❌ Missing data for grouping. Please select lessons and add students first.",
+        }, status=400)
+
+    user = await request.auser()
+    student_tags = {s.name: getattr(s, "tag", None) async for s in Student.objects.filter(teacher=user)}
+    schedule_config = await InterventionSchedule.acompiled_for(user)
+    key = grouping_cache_key(preview_data, lesson_1, lesson_2, student_tags, schedule_config)
+    cached = await cache.aget(key) if key else None
+    if cached is None:
+        with phase("grouping"):
+            cached = await arun_offloaded(
+                assign_group, preview_data, lesson_1, lesson_2, student_tags, schedule_config
+            )
+        if key:
+            await cache.aset(key, cached, GROUPING_CACHE_SECONDS)
+    grouped_html, grouped_data = cached
+
+    await request.session.aupdate({
+        "grouped_data": grouped_data,
+        "grouped_html": grouped_html,
+        "lesson_meta": lesson_meta(lesson_1, lesson_2),
+    })
+    await AssessmentResult.arecord_grouping(user, preview_data, lesson_1, lesson_2)
+    wizard.set_lessons(lesson_1, lesson_2)
+    wizard.complete("step4")
+    await wizard.asave(request.session)
+
+    return JsonResponse({
+        "ok": True,
+        "message": f"✅ Students grouped for {lesson_1['concept']} and {lesson_2['concept']}.",
+        "daily": grouped_data["daily"],
+        "fragment": _grouped_fragment(request, grouped_data, lesson_1, lesson_2),
+    })
+
+
+# ---------- Export ----------
+
+@login_required
+async def generate_excel_view_async(request):
+    """Async version of generate_excel_view: builds the polished workbook off the event loop."""
+    grouped_data = await request.session.aget("grouped_data", {})
+    lesson_meta = await request.session.aget("lesson_meta", {})
+    lesson_1 = lesson_meta.get("lesson_1", {})
+    lesson_2 = lesson_meta.get("lesson_2", {})
+
+    if not grouped_data or not lesson_1 or not lesson_2:
+        messages.error(request, "Missing data for export. Please click Sort2Support first.")
+        return redirect("main:dashboard")
+
+    summaries = await sync_to_async(_export_summaries)(await request.auser(), lesson_1, lesson_2)
+    with phase("export"):
+        content = await arun_offloaded(build_export_bytes, grouped_data, lesson_1, lesson_2, summaries)
+
+    response = HttpResponse(
+        content,
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    response["Content-Disposition"] = 'attachment; filename="student_export.xlsx"'
+    return response
@@ -0,0 +1,18 @@
+"""
+Deployment checks, run by `manage.py check --deploy`.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Version-keyed caches (sessions, fragments, grouping) break when each worker has its own cache."""
+    if settings.DEBUG or not getattr(settings, "LOCAL_CACHE", False):
+        return []
+    return [Error(
+        "The default cache is process-local memory.",
+        hint="Set CACHE_URL to a shared redis or memcached server; each worker would otherwise "
+             "keep its own sessions and cache versions and serve stale pages.",
+        id="main.E001",
+    )]
@@ -1,22 +1,39 @@
-import os, json
-import pandas as pd
+import os
+import functools
+import hashlib
+import json
 from django.conf import settings
+from django.core.cache import cache
+from main.utils.catalog import LessonCatalog, load_catalog
+from main.utils.preview_codec import student_records
+from main.utils.profiling import timed
+from main.utils.schedule import compute_schedule, schedule_rows
 
 # ---------- Load UFLI lessons ----------
+def ufli_lessons_path():
+    return os.path.join(settings.BASE_DIR, "main", "static", "main", "data", "ufli_lessons.json")
+
+def ufli_source_path():
+    return os.path.join(settings.BASE_DIR, "main", "data", "ufli_lessons.csv")
+
+@functools.cache
 def load_ufli_lessons():
-    path = os.path.join(settings.BASE_DIR, "main", "static", "main", "data", "ufli_lessons.json")
-    with open(path, encoding="utf-8") as f:
-        lessons = json.load(f)
+    """
+    The lesson catalog, read once per process from the artifact built by
+    `manage.py build_catalog` (validated there, so nothing is checked here).
+    Shared between requests: treat it and its lesson dicts as read-only.
+    """
+    return load_catalog(ufli_lessons_path())
 
-    # Optional: validate total_points
-    for lesson in lessons:
-        if not isinstance(lesson, dict):
-            print(f"⚠️ Skipping invalid lesson entry: {lesson}")
-            continue
-        if "total_points" not in lesson or not isinstance(lesson["total_points"], int):
-            print(f"⚠️ Lesson {lesson.get('number')} missing valid total_points")
+def lesson_catalog_version():
+    """Changes whenever the catalog is rebuilt; keys cached renders of the catalog."""
+    return load_ufli_lessons().version
 
-    return lessons
+def find_lesson(ufli_lessons, lesson_id):
+    """Returns the lesson whose number matches lesson_id, or None."""
+    if isinstance(ufli_lessons, LessonCatalog):
+        return ufli_lessons.get(lesson_id)
+    return next((l for l in ufli_lessons if str(l.get("number")) == str(lesson_id)), None)
 
 
 
@@ -50,17 +67,6 @@ def get_color_class(score, max_points):
 
 
 
-def get_instruction_group(score, max_points):
-    if max_points == 3:
-        return "Intensive Reteach" if score <= 1 else "Review" if score == 2 else "None"
-    elif max_points == 4:
-        return "Intensive Reteach" if score <= 1 else "Reteach" if score == 2 else "Review" if score == 3 else "None"
-    elif max_points == 5:
-        return "Intensive Reteach" if score <= 1 else "Reteach" if score in [2,3] else "Review" if score == 4 else "None"
-    elif max_points == 6:
-        return "Intensive Reteach" if score <= 1 else "Reteach" if score in [2,3] else "Review" if score in [4,5] else "None"
-    return "Unclassified"
-
 def build_table(groups, concept_name, max_points):
     html = f"<h4>{concept_name} (Max: {max_points})</h4>"
     html += "<table class='assessment-table'><tr><th>Group</th><th>Name</th><th>Score</th></tr>"
@@ -71,44 +77,17 @@ def build_table(groups, concept_name, max_points):
     html += "</table>"
     return html
 
-def build_weekly_group_table(students, score_key, concept_name, max_points):
-    schedule_map = {
-        "Intensive Reteach": ["M","Tu","W","Th","F"],
-        "Reteach": ["M","W","F"],
-        "Review": ["Tu","Th"],
-        "None": [],
-        "Unclassified": []
-    }
-    day_order = ["M","Tu","W","Th","F"]
+def build_weekly_group_table(schedule, concept_name, max_points):
     day_labels = {"M":"M 📘","Tu":"Tu ✏️","W":"W 📚","Th":"Th 🎨","F":"F 🎉"}
-    categories = {
-        "Intensive Reteach": "🚨 Extra Boost Crew",
-        "Reteach": "🔄 Reteach Squad",
-        "Review": "🔍 Quick Checkers",
-        "None": "🌟 Ready to Fly"
-    }
-    table_data = {cat:{day:[] for day in day_order} for cat in categories}
-
-    for student in students:
-        score = student[score_key]
-        name = student["name"]
-        group = get_instruction_group(score, max_points)
-        if group in table_data:
-            for day in schedule_map.get(group, []):
-                table_data[group][day].append(name)
-    print("🧪 students[0]:", students[0])
-    print("🧪 type:", type(students[0]))
-
 
     html = f"<h4>Weekly Group Plan – {concept_name} (Max: {max_points})</h4>"
     html += "<table class='weekly-group-table'>"
-    html += "<tr><th>Focus Group</th>" + "".join(f"<th>{day_labels[d]}</th>" for d in day_order) + "</tr>"
+    html += "<tr><th>Focus Group</th>" + "".join(f"<th>{day_labels[d]}</th>" for d in schedule["days"]) + "</tr>"
 
-    for cat, label in categories.items():
+    for label, cells in schedule_rows(schedule):
         html += f"<tr><td>{label}</td>"
-        for day in day_order:
-            names = ", ".join(table_data[cat][day]) or "— No group today —"
-            html += f"<td>{names}</td>"
+        for names in cells:
+            html += f"<td>{', '.join(names) or '— No group today —'}</td>"
         html += "</tr>"
 
     html += "</table>"
@@ -129,7 +108,8 @@ def build_daily_group_table(daily_group_data, concept1_name, concept2_name):
 
 
 # ---------- Main grouping orchestrator ----------
-def assign_group(preview_data, lesson_1, lesson_2, student_tags):
+@timed("grouping")
+def assign_group(preview_data, lesson_1, lesson_2, student_tags, schedule_config=None):
     max1 = lesson_1["total_points"] if lesson_1 else 5
     max2 = lesson_2["total_points"] if lesson_2 else 5
     concept1_name = lesson_1["concept"] if lesson_1 else "Concept 1"
@@ -139,10 +119,10 @@ def assign_group(preview_data, lesson_1, lesson_2, student_tags):
     concept2_groups = {"Red": [], "Yellow": [], "Green": [], "Blue": []}
     daily_group_data = []
 
-    for student in preview_data:
-        name = student["name"]
-        score1 = student.get("score1", 0)
-        score2 = student.get("score2", 0)
+    # Slotted records, not per-row dicts; the concept names are stored once in grouped_data
+    students = student_records(preview_data)
+    for student in students:
+        name, score1, score2 = student.name, student.score1, student.score2
 
         group1 = get_color(score1, max1)
         group2 = get_color(score2, max2)
@@ -152,13 +132,7 @@ def assign_group(preview_data, lesson_1, lesson_2, student_tags):
         if group2 in concept2_groups:
             concept2_groups[group2].append((name, score2))
 
-        daily_group_data.append({
-            "name": name,
-            "group_1": group1,
-            "concept_1": concept1_name,
-            "group_2": group2,
-            "concept_2": concept2_name,
-        })
+        daily_group_data.append({"name": name, "group_1": group1, "score1": score1, "group_2": group2, "score2": score2})
 
     # --- Build HTML blocks ---
     html = "<div class='grouping-tables'>"
@@ -191,9 +165,11 @@ def assign_group(preview_data, lesson_1, lesson_2, student_tags):
     </div>
     """
 
-    # 📊 Weekly grouping
-    weekly_html_1 = build_weekly_group_table(preview_data, "score1", concept1_name, max1)
-    weekly_html_2 = build_weekly_group_table(preview_data, "score2", concept2_name, max2)
+    # 📊 Weekly grouping: one plan per concept, shared with the Excel exports
+    schedule_1 = compute_schedule(students, "score1", max1, schedule_config)
+    schedule_2 = compute_schedule(students, "score2", max2, schedule_config)
+    weekly_html_1 = build_weekly_group_table(schedule_1, concept1_name, max1)
+    weekly_html_2 = build_weekly_group_table(schedule_2, concept2_name, max2)
 
     html += "<hr><h3>📈 Weekly Grouping Tables</h3>"
     html += f"""
@@ -211,9 +187,38 @@ def assign_group(preview_data, lesson_1, lesson_2, student_tags):
 
     return html, {
         "daily": daily_group_data,
+        "concepts": {"concept_1": concept1_name, "concept_2": concept2_name},
         "weekly_1": weekly_html_1,
         "weekly_2": weekly_html_2,
+        "schedule_1": schedule_1,
+        "schedule_2": schedule_2,
         "concept1": concept1_groups,
         "concept2": concept2_groups,
-        "tags": student_tags,
+        "tags": {name: tag for name, tag in student_tags.items() if tag},
     }
+
+
+# ---------- Grouping cache ----------
+GROUPING_CACHE_SECONDS = 60 * 60 * 24
+
+def grouping_cache_key(preview_data, lesson_1, lesson_2, student_tags, schedule_config=None):
+    """
+    Cache key for assign_group's result on an unedited saved roster: its id and
+    version fix the scores, the rest of the inputs are hashed. None for a
+    preview that was pasted, uploaded or edited since it was loaded.
+    """
+    source = getattr(preview_data, "source", None)
+    if not source:
+        return None
+    inputs = json.dumps([lesson_1, lesson_2, student_tags, schedule_config], sort_keys=True, default=str)
+    return f"grouping:{source[0]}:{source[1]}:{hashlib.sha256(inputs.encode()).hexdigest()[:20]}"
+
+def cached_assign_group(preview_data, lesson_1, lesson_2, student_tags, schedule_config=None):
+    """assign_group, reusing the result for a saved roster version grouped before."""
+    key = grouping_cache_key(preview_data, lesson_1, lesson_2, student_tags, schedule_config)
+    result = cache.get(key) if key else None
+    if result is None:
+        result = assign_group(preview_data, lesson_1, lesson_2, student_tags, schedule_config)
+        if key:
+            cache.set(key, result, GROUPING_CACHE_SECONDS)
+    return result
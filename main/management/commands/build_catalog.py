@@ -0,0 +1,36 @@
+"""
+Builds the UFLI lesson catalog artifact from its CSV source.
+
+    python manage.py build_catalog            # no-op unless main/data/ufli_lessons.csv changed
+    python manage.py build_catalog --force
+    python manage.py build_catalog --source lessons.csv
+
+Run it after editing the source (and on deploy); running processes pick up a
+new catalog when they restart.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from main.main_utils import ufli_lessons_path, ufli_source_path
+from main.utils.catalog import CatalogError, build_catalog
+
+
+class Command(BaseCommand):
+    help = "Validates the UFLI lesson CSV and rebuilds ufli_lessons.json if the CSV changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=None, help="lesson CSV (default: main/data/ufli_lessons.csv)")
+        parser.add_argument("--out", default=None, help="artifact path (default: main/static/main/data/ufli_lessons.json)")
+        parser.add_argument("--force", action="store_true", help="rebuild even if the source is unchanged")
+
+    def handle(self, *args, **options):
+        try:
+            written, artifact = build_catalog(
+                options["source"] or ufli_source_path(), options["out"] or ufli_lessons_path(), options["force"]
+            )
+        except (CatalogError, OSError) as exc:
+            raise CommandError(str(exc))
+        if not written:
+            self.stdout.write("Catalog is up to date.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Catalog {artifact['version']} written with {len(artifact['lessons'])} lessons."
+        ))
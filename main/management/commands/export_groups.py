@@ -0,0 +1,144 @@
+"""
+Friday batch: regroups every saved roster for a lesson pair and writes each
+teacher's polished workbooks, without going through the dashboard.
+
+    python manage.py export_groups --lesson-pair 5,6 --out exports/
+    python manage.py export_groups --lesson-pair 5,6 --out exports/ --school "Lincoln Elementary" --workers 8
+
+Workbooks land in <out>/<username>/<roster>.xlsx and are built exactly like the
+"Export Weekly Plan" download (assign_group + the polished export, with the
+teacher's intervention schedule and class summary) in a process pool.
+
+Each output's inputs (roster data, lessons, schedule, summaries) are hashed into
+<out>/.export_groups.json; a roster whose inputs hash the same as last run and
+whose workbook is still there is skipped, so reruns only rebuild what changed.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils.text import slugify
+from main.main_utils import find_lesson, load_ufli_lessons
+from main.models import InterventionSchedule, LessonRollup, Roster
+from main.utils.polished_export import build_grouped_export
+
+
+MANIFEST_NAME = ".export_groups.json"
+
+
+def input_hash(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def write_atomic(path, content):
+    """Writes via a temp file so an interrupted run never leaves half a workbook."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+class Command(BaseCommand):
+    help = "Regroups saved rosters for a lesson pair and writes per-teacher grouped workbooks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lesson-pair", required=True, help="two UFLI lesson numbers, e.g. 5,6")
+        parser.add_argument("--out", required=True, help="output directory")
+        parser.add_argument("--school", action="append", default=[], help="only teachers at this school (repeatable)")
+        parser.add_argument("--teacher", action="append", default=[], help="only this username (repeatable)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="builder processes (0 builds in this process)")
+        parser.add_argument("--force", action="store_true", help="rebuild every workbook")
+
+    def handle(self, *args, **options):
+        lesson_1, lesson_2 = self.lessons(options["lesson_pair"])
+        out = options["out"]
+        manifest_path = os.path.join(out, MANIFEST_NAME)
+        manifest = {}
+        if os.path.exists(manifest_path) and not options["force"]:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+
+        counts = {"written": 0, "unchanged": 0, "failed": 0}
+        pool = None
+        if options["workers"] > 0:
+            pool = ProcessPoolExecutor(options["workers"], mp_context=multiprocessing.get_context("spawn"))
+        in_flight = {}  # future -> (relative path, hash)
+        limit = max(options["workers"], 1) * 2  # bounds how many rosters' data is held at once
+        try:
+            for rel, digest, job in self.jobs(options, lesson_1, lesson_2, manifest, counts):
+                if pool is None:
+                    self.finish(out, rel, digest, manifest, counts, build_grouped_export, *job)
+                    continue
+                in_flight[pool.submit(build_grouped_export, *job)] = (rel, digest)
+                if len(in_flight) >= limit:
+                    self.collect(out, in_flight, manifest, counts, FIRST_COMPLETED)
+            if in_flight:
+                self.collect(out, in_flight, manifest, counts)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            os.makedirs(out, exist_ok=True)
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {counts['written']} workbooks written, {counts['unchanged']} unchanged, {counts['failed']} failed."
+        ))
+
+    def lessons(self, pair):
+        catalog = load_ufli_lessons()
+        numbers = [n.strip() for n in pair.split(",")]
+        lessons = [find_lesson(catalog, n) for n in numbers]
+        if len(numbers) != 2 or None in lessons:
+            raise CommandError(f"--lesson-pair needs two lesson numbers from the UFLI catalog, got {pair!r}.")
+        return lessons
+
+    def jobs(self, options, lesson_1, lesson_2, manifest, counts):
+        """Yields (relative path, input hash, build args) for each roster whose workbook is stale."""
+        rosters = Roster.objects.select_related("user").order_by("user_id", "id")
+        if options["school"] or options["teacher"]:
+            rosters = rosters.filter(Q(user__profile__school__in=options["school"]) | Q(user__username__in=options["teacher"]))
+
+        teacher, config, summaries, used = None, None, [], set()
+        for roster in rosters.iterator(chunk_size=200):
+            if roster.user_id != getattr(teacher, "pk", None):
+                teacher, used = roster.user, set()
+                config = InterventionSchedule.compiled_for(teacher)
+                summaries = LessonRollup.latest_summaries(teacher, [lesson_1["number"], lesson_2["number"]])
+
+            stem = slugify(roster.name) or f"roster-{roster.pk}"
+            if stem in used:
+                stem = f"{stem}-{roster.pk}"
+            used.add(stem)
+            rel = os.path.join(teacher.username, f"{stem}.xlsx")
+
+            digest = input_hash(roster.data, lesson_1, lesson_2, config, summaries)
+            if manifest.get(rel) == digest and os.path.exists(os.path.join(options["out"], rel)):
+                counts["unchanged"] += 1
+                continue
+            yield rel, digest, (roster.data, lesson_1, lesson_2, config, summaries)
+
+    def collect(self, out, in_flight, manifest, counts, return_when=ALL_COMPLETED):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            rel, digest = in_flight.pop(future)
+            self.finish(out, rel, digest, manifest, counts, future.result)
+
+    def finish(self, out, rel, digest, manifest, counts, build, *args):
+        try:
+            content = build(*args)
+        except Exception as exc:  # one bad roster should not stop the batch
+            counts["failed"] += 1
+            manifest.pop(rel, None)
+            self.stderr.write(f"⚠️ {rel}: {exc}")
+            return
+        write_atomic(os.path.join(out, rel), content)
+        manifest[rel] = digest
+        counts["written"] += 1
+        if counts["written"] % 100 == 0:
+            self.stdout.write(f"… {counts['written']} workbooks written")
@@ -0,0 +1,247 @@
+"""
+Offline bulk roster import from a directory of class spreadsheets.
+
+    python manage.py import_rosters /data/fall-rosters
+    python manage.py import_rosters /data/fall-rosters --workers 8 --report import.csv
+
+Files are matched to teachers by folder: <directory>/<username>/<roster name>.xlsx
+(or .csv, with Name/Score1/Score2 headers). Each file is saved as a Roster named
+after the file (re-importing replaces its data) and its students are added to,
+or rescored on, the teacher's class.
+
+The directory is walked lazily and parsed in a process pool --batch-size files
+at a time; each batch is written in one transaction and then appended to a
+journal (default <directory>/.import_rosters.journal). A rerun skips files
+already imported and unchanged, so an interrupted import resumes where it
+stopped and files that failed or had no teacher yet are retried.
+"""
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from main.models import Roster, Student, bump_cache_version
+from main.utils.parse_excel import parse_roster_path
+
+
+EXTENSIONS = (".xlsx", ".csv")
+NAME_LENGTH = 100  # Roster.name / Student.name max_length
+
+
+@dataclass
+class Summary:
+    imported: int = 0
+    resumed: int = 0
+    unmatched: int = 0
+    failed: int = 0
+    students_created: int = 0
+    students_updated: int = 0
+    failures: list = field(default_factory=list)  # first few (path, reason), for the closing report
+
+
+def roster_files(root):
+    """Yields (relative path, change stamp) for each spreadsheet under root, in a stable order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if filename.lower().endswith(EXTENSIONS) and not filename.startswith((".", "~$")):
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                yield os.path.relpath(path, root), f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Imports a directory of roster spreadsheets (<username>/<roster>.xlsx|.csv) as saved rosters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="parser processes (0 parses in this process)")
+        parser.add_argument("--batch-size", type=int, default=200, help="files parsed and written per transaction")
+        parser.add_argument("--journal", help="resume journal (default: <directory>/.import_rosters.journal)")
+        parser.add_argument("--restart", action="store_true", help="ignore the journal and import everything")
+        parser.add_argument("--report", help="write a per-file CSV report (path, status, detail)")
+
+    def handle(self, *args, **options):
+        root = options["directory"]
+        if not os.path.isdir(root):
+            raise CommandError(f"{root} is not a directory.")
+        journal_path = options["journal"] or os.path.join(root, ".import_rosters.journal")
+        done = {} if options["restart"] else self.read_journal(journal_path)
+        limits = {"max_rows": settings.UPLOAD_MAX_ROWS, "max_bytes": settings.UPLOAD_MAX_BYTES}
+
+        summary = Summary()
+        pending = self.pending(root, done, summary)
+        pool = None
+        if options["workers"] > 0:
+            pool = ProcessPoolExecutor(options["workers"], mp_context=multiprocessing.get_context("spawn"))
+        report = open(options["report"], "w", newline="", encoding="utf-8") if options["report"] else None
+        try:
+            writer = csv.writer(report) if report else None
+            if writer:
+                writer.writerow(["path", "status", "detail"])
+            with open(journal_path, "a", encoding="utf-8") as journal:
+                for batch in batches(pending, options["batch_size"]):
+                    parsed = self.parse(pool, root, batch, limits)
+                    outcomes = self.write(parsed, summary)
+                    journal.writelines(f"{rel}\t{stamp}\n" for rel, stamp, status, _ in outcomes if status == "imported")
+                    journal.flush()
+                    if writer:
+                        writer.writerows((rel, status, detail) for rel, _, status, detail in outcomes)
+                    self.stdout.write(
+                        f"… {summary.imported} imported, {summary.unmatched} unmatched, "
+                        f"{summary.failed} failed ({summary.resumed} already done)"
+                    )
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+            if report:
+                report.close()
+
+        for rel, reason in summary.failures:
+            self.stderr.write(f"⚠️ {rel}: {reason}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {summary.imported} rosters: {summary.students_created} students added, "
+            f"{summary.students_updated} rescored. {summary.unmatched} files had no matching teacher, "
+            f"{summary.failed} could not be parsed, {summary.resumed} were already imported."
+        ))
+
+    def read_journal(self, path):
+        """{relative path: change stamp} of files finished by earlier runs."""
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return dict(line.rstrip("\n").split("\t", 1) for line in f if "\t" in line)
+
+    def pending(self, root, done, summary):
+        """roster_files() minus those journaled with the same change stamp."""
+        for rel, stamp in roster_files(root):
+            if done.get(rel) == stamp:
+                summary.resumed += 1
+            else:
+                yield rel, stamp
+
+    def parse(self, pool, root, batch, limits):
+        """Returns [(rel, stamp, rows or exception)] in batch order."""
+        paths = [os.path.join(root, rel) for rel, _ in batch]
+        if pool:
+            futures = [pool.submit(parse_roster_path, path, **limits) for path in paths]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as exc:  # a bad file fails alone, not the batch
+                    results.append(exc)
+        else:
+            results = []
+            for path in paths:
+                try:
+                    results.append(parse_roster_path(path, **limits))
+                except Exception as exc:
+                    results.append(exc)
+        return [(rel, stamp, result) for (rel, stamp), result in zip(batch, results)]
+
+    def write(self, parsed, summary):
+        """
+        Saves one batch of parsed files in a single transaction.
+        Returns [(rel, stamp, status, detail)] for the journal and report.
+        """
+        usernames = {rel.split(os.sep, 1)[0] for rel, _, _ in parsed if os.sep in rel}
+        teachers = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+
+        outcomes, imports = [], []  # imports: (teacher_id, roster name, rows)
+        for rel, stamp, result in parsed:
+            username = rel.split(os.sep, 1)[0] if os.sep in rel else None
+            if isinstance(result, Exception):
+                summary.failed += 1
+                if len(summary.failures) < 20:
+                    summary.failures.append((rel, result))
+                outcomes.append((rel, stamp, "failed", str(result)))
+            elif username not in teachers:
+                summary.unmatched += 1
+                outcomes.append((rel, stamp, "unmatched", f"no teacher named {username!r}" if username else "not in a teacher folder"))
+            else:
+                name = os.path.splitext(os.path.basename(rel))[0][:NAME_LENGTH]
+                imports.append((teachers[username], name, result))
+                outcomes.append((rel, stamp, "imported", f"{len(result)} students"))
+
+        with transaction.atomic():
+            self.save_rosters(imports)
+            created, updated = self.save_students(imports)
+        for teacher_id in {teacher_id for teacher_id, _, _ in imports}:
+            bump_cache_version(Roster.cache_version_key(teacher_id))
+
+        summary.imported += len(imports)
+        summary.students_created += created
+        summary.students_updated += updated
+        return outcomes
+
+    def save_rosters(self, imports):
+        teacher_ids = {teacher_id for teacher_id, _, _ in imports}
+        names = {name for _, name, _ in imports}
+        existing = {
+            (roster.user_id, roster.name): roster
+            for roster in Roster.objects.filter(user_id__in=teacher_ids, name__in=names).only("id", "user_id", "name")
+        }
+        new, changed = [], []
+        for teacher_id, name, rows in imports:
+            roster = existing.get((teacher_id, name))
+            if roster is None:
+                roster = existing[teacher_id, name] = Roster(user_id=teacher_id, name=name, data=rows)
+                new.append(roster)
+            else:
+                roster.data = rows
+                if roster.pk:
+                    roster.version = F("version") + 1
+                    changed.append(roster)
+        Roster.objects.bulk_create(new, batch_size=500)
+        Roster.objects.bulk_update(changed, ["data", "version"], batch_size=500)
+
+    def save_students(self, imports):
+        """Adds each roster's students to the teacher's class, rescoring names already there."""
+        scores = {}  # (teacher_id, name) -> (score1, score2); a later file wins
+        for teacher_id, _, rows in imports:
+            for row in rows:
+                scores[teacher_id, row["name"][:NAME_LENGTH]] = (
+                    None if row.get("missing_score1") else row["score1"],
+                    None if row.get("missing_score2") else row["score2"],
+                )
+        existing = Student.objects.filter(
+            teacher_id__in={teacher_id for teacher_id, _ in scores},
+            name__in={name for _, name in scores},
+        ).only("id", "teacher_id", "name")
+
+        now = timezone.now()
+        changed, seen = [], set()
+        for student in existing:
+            key = (student.teacher_id, student.name)
+            if key in scores:
+                student.ufli_score_1, student.ufli_score_2 = scores[key]
+                student.last_updated = now
+                student.version = F("version") + 1
+                changed.append(student)
+                seen.add(key)
+        new = [
+            Student(teacher_id=teacher_id, name=name, ufli_score_1=score1, ufli_score_2=score2)
+            for (teacher_id, name), (score1, score2) in scores.items() if (teacher_id, name) not in seen
+        ]
+        Student.objects.bulk_update(changed, ["ufli_score_1", "ufli_score_2", "last_updated", "version"], batch_size=500)
+        Student.objects.bulk_create(new, batch_size=500)
+        return len(new), len(changed)
@@ -0,0 +1,53 @@
+"""
+Term-start reset: clears UFLI scores (names stay) for whole schools at once.
+
+    python manage.py reset_scores --school "Lincoln Elementary" --dry-run
+    python manage.py reset_scores --school "Lincoln Elementary" --school "Oak Ridge"
+    python manage.py reset_scores --teacher jsmith --delete-students
+    python manage.py reset_scores --all
+
+However many teachers are selected, the reset is one UPDATE (or one DELETE)
+with the teacher selection as a subquery. Teachers' open dashboard sessions
+keep their previews until they reset or reload a roster.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from main.models import Student
+
+
+class Command(BaseCommand):
+    help = "Clears student scores, or deletes students, for schools, named teachers, or everyone."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--school", action="append", default=[], help="Profile school name (repeatable)")
+        parser.add_argument("--teacher", action="append", default=[], help="teacher username (repeatable)")
+        parser.add_argument("--all", action="store_true", help="every teacher")
+        parser.add_argument("--delete-students", action="store_true", help="remove the students instead of clearing scores")
+        parser.add_argument("--dry-run", action="store_true", help="report what would change and stop")
+
+    def handle(self, *args, **options):
+        schools, usernames = options["school"], options["teacher"]
+        if not (schools or usernames or options["all"]):
+            raise CommandError("Choose teachers with --school, --teacher or --all.")
+
+        teachers = User.objects.all()
+        if not options["all"]:
+            teachers = teachers.filter(Q(profile__school__in=schools) | Q(username__in=usernames))
+            missing = set(usernames) - set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+            for username in sorted(missing):
+                self.stderr.write(f"⚠️ No teacher named {username!r}")
+
+        students = Student.objects.filter(teacher__in=teachers)
+        action = "Deleted" if options["delete_students"] else "Cleared scores for"
+        if options["dry_run"]:
+            self.stdout.write(f"Would affect {students.count()} students of {teachers.count()} teachers.")
+            return
+
+        with transaction.atomic():
+            if options["delete_students"]:
+                count = students.delete()[1].get(Student._meta.label, 0)
+            else:
+                count = Student.reset_scores(teachers)
+        self.stdout.write(self.style.SUCCESS(f"✅ {action} {count} students."))
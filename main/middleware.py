@@ -0,0 +1,72 @@
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+from main.utils.offload import OffloadBusy
+from main.utils.profiling import count_query, start_profile, stop_profile
+
+
+profiling_logger = logging.getLogger("main.profiling")
+
+
+class OffloadBackpressureMiddleware(MiddlewareMixin):
+    """Turns a saturated offload pool into a 503 so clients back off and retry."""
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, OffloadBusy):
+            response = HttpResponse(
+                "⏳ Sort2Support is busy building other spreadsheets. Please try again in a few seconds.",
+                status=503,
+            )
+            response["Retry-After"] = str(exception.retry_after)
+            return response
+        return None
+
+
+class RequestProfilingMiddleware:
+    """
+    Times each request's phases (see main/utils/profiling.py) and reports them
+    in a Server-Timing header and a "main.profiling" log record.
+    Enabled by REQUEST_PROFILING; when off it is dropped from the stack at startup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile, token = start_profile()
+        try:
+            with connection.execute_wrapper(count_query):
+                response = self.get_response(request)
+        finally:
+            stop_profile(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        # ORM calls in async views run in a worker thread, so db timings cover sync views only
+        profile, token = start_profile()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_profile(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        response["Server-Timing"] = profile.server_timing()
+        profiling_logger.info(
+            "%s %s %s", request.method, request.path, response.status_code,
+            extra={"path": request.path, "method": request.method, "status": response.status_code, **profile.as_dict()},
+        )
+        return response
@@ -1,21 +1,111 @@
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
+from main.main_utils import get_color, load_ufli_lessons
+from main.utils.preview_codec import student_records
+from main.utils.schedule import DEFAULT_SCHEDULE, compile_schedule, get_instruction_group
 
 
-class Student(models.Model):
+def bump_cache_version(key):
+    """Increments a version counter embedded in cache keys, retiring every entry built on it."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+class StaleVersion(Exception):
+    """Raised by save() when the row was saved by someone else after this copy was loaded."""
+
+
+class VersionedModel(models.Model):
+    """
+    Adds a version column that every write bumps. save() on an existing row is
+    a conditional UPDATE ... WHERE version = <loaded version>, so concurrent
+    editors can't overwrite each other and nothing needs a row lock; bulk
+    writes bump it with F("version") + 1.
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        version_field = self._meta.get_field("version")
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, self.version + 1))
+        if base_qs.filter(pk=pk_val, version=self.version)._update(values):
+            self.version += 1
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise StaleVersion(f"{self._meta.label} {pk_val} changed since version {self.version}")
+        return False  # deleted meanwhile: save() inserts it again, as for any model
+
+
+class Student(VersionedModel):
     teacher = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     ufli_score_1 = models.IntegerField(null=True, blank=True)
     ufli_score_2 = models.IntegerField(null=True, blank=True)
     last_updated = models.DateTimeField(auto_now=True)  # ✅ Tracks last save
 
+    SCORE_FIELDS = ("ufli_score_1", "ufli_score_2")
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def apply_score_changes(cls, teacher, changes):
+        """
+        Saves edited scores for teacher's students in one UPDATE.
+        changes maps student id -> {"version": the version the editor loaded,
+        plus any of SCORE_FIELDS}. Each row is guarded by its version, so a
+        student saved elsewhere since (another tab) is left alone.
+        Returns ({id: new version} saved, {id: current version} conflicts).
+        """
+        if not changes:
+            return {}, {}
+        guard = models.Q()
+        for pk, change in changes.items():
+            guard |= models.Q(pk=pk, version=change["version"])
+        values = {}
+        for field in cls.SCORE_FIELDS:
+            whens = [
+                models.When(pk=pk, then=models.Value(change[field], output_field=models.IntegerField()))
+                for pk, change in changes.items() if field in change
+            ]
+            if whens:
+                values[field] = models.Case(*whens, default=models.F(field))
+
+        with transaction.atomic():
+            # Lock the rows still at their loaded version; those, and only those, are ours to write
+            writable = set(cls.objects.select_for_update().filter(guard, teacher=teacher).values_list("pk", flat=True))
+            if writable:
+                cls.objects.filter(pk__in=writable).update(
+                    version=models.F("version") + 1, last_updated=timezone.now(), **values
+                )
+            versions = cls.objects.filter(teacher=teacher, pk__in=changes).values_list("pk", "version")
+            saved, conflicts = {}, {}
+            for pk, version in versions:
+                (saved if pk in writable else conflicts)[pk] = version
+        return saved, conflicts
+
+    @classmethod
+    def reset_scores(cls, teachers):
+        """
+        Clears both scores (names stay) for every student of teachers — user ids
+        or a User queryset — in one UPDATE. Returns the number of students reset.
+        """
+        return cls.objects.filter(teacher__in=teachers).update(
+            ufli_score_1=None, ufli_score_2=None, version=models.F("version") + 1, last_updated=timezone.now()
+        )
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     has_paid = models.BooleanField(default=False)
+    school = models.CharField(max_length=100, blank=True)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -35,7 +125,7 @@ class Assignment(models.Model):
     def __str__(self):
         return self.title
 
-class Roster(models.Model):
+class Roster(VersionedModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)  # e.g. "Period 3 – Reading"
     created_at = models.DateTimeField(auto_now_add=True)
@@ -43,3 +133,361 @@ class Roster(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
+
+    @staticmethod
+    def cache_version_key(user_id):
+        return f"rosters:{user_id}:version"
+
+    @classmethod
+    def cache_version(cls, user_id):
+        """Version of user_id's saved-roster list; keys the dashboard's cached dropdown."""
+        return cache.get_or_set(cls.cache_version_key(user_id), 1, None)
+
+    @classmethod
+    def save_data(cls, user, name, data, expected_version=None):
+        """
+        Stores data as user's roster called name, creating it if new. An existing
+        roster is rewritten by one UPDATE that bumps its version, with no
+        select_for_update; given expected_version (the version the editor
+        loaded), the UPDATE is conditional on it and StaleVersion is raised if
+        the roster was saved elsewhere since. Returns (id, version) of the saved roster.
+        """
+        rosters = cls.objects.filter(user=user, name=name)
+        guarded = rosters if expected_version is None else rosters.filter(version=expected_version)
+        if guarded.update(data=data, version=models.F("version") + 1):
+            return rosters.values_list("pk", "version").first()
+        if expected_version is not None and rosters.exists():
+            raise StaleVersion(f"Roster {name!r} changed since version {expected_version}")
+        roster = cls.objects.create(user=user, name=name, data=data)
+        return roster.pk, roster.version
+
+class AssessmentResult(models.Model):
+    """
+    One UFLI assessment score, appended each time a class is grouped.
+    Rows are never overwritten across days, so progress through the lesson
+    sequence can be read back per student or per lesson by date range.
+    """
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE)
+    student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, blank=True)
+    student_name = models.CharField(max_length=100)
+    lesson_number = models.CharField(max_length=10)  # the catalog's lesson id: "5", "35a", ...
+    score = models.IntegerField()
+    max_points = models.IntegerField()
+    band = models.CharField(max_length=10, blank=True)  # Red / Yellow / Green / Blue
+    tier = models.CharField(max_length=20, blank=True)  # Intensive Reteach / Reteach / Review / None
+    assessed_on = models.DateField(default=timezone.localdate)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Regrouping the same class on the same day replaces that day's score
+            models.UniqueConstraint(
+                fields=["teacher", "student_name", "lesson_number", "assessed_on"],
+                name="one_result_per_student_lesson_day",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["teacher", "student_name", "assessed_on"], name="result_student_idx"),
+            models.Index(fields=["teacher", "lesson_number", "assessed_on"], name="result_lesson_idx"),
+            models.Index(fields=["student", "assessed_on"], name="result_student_fk_idx"),
+            # lesson_distribution: the date range narrows the scan and every column it
+            # counts or averages is a key column, so Postgres can answer it index-only
+            models.Index(
+                fields=["assessed_on", "lesson_number", "band", "tier", "score", "teacher"],
+                name="result_analytics_idx",
+            ),
+        ]
+
+    CACHE_VERSION_KEY = "assessment_results:version"
+
+    UPSERT = {
+        "update_conflicts": True,
+        "unique_fields": ["teacher", "student_name", "lesson_number", "assessed_on"],
+        "update_fields": ["score", "max_points", "band", "tier", "student"],
+    }
+
+    def __str__(self):
+        return f"{self.student_name} L{self.lesson_number}: {self.score}/{self.max_points}"
+
+    @classmethod
+    def rows_for_grouping(cls, teacher, preview_data, lesson_1, lesson_2, student_ids):
+        """Unsaved results for every non-missing score in the preview roster (last duplicate name wins)."""
+        assessed_on = timezone.localdate()
+        rows = {}
+        for student in student_records(preview_data):
+            for n, lesson in ((1, lesson_1), (2, lesson_2)):
+                if getattr(student, f"missing_score{n}"):
+                    continue
+                score = getattr(student, f"score{n}")
+                rows[student.name, lesson["number"]] = cls(
+                    teacher=teacher,
+                    student_id=student_ids.get(student.name),
+                    student_name=student.name,
+                    lesson_number=str(lesson["number"]),
+                    score=score,
+                    max_points=lesson["total_points"],
+                    band=score_band(score, lesson["total_points"]),
+                    tier=get_instruction_group(score, lesson["total_points"]),
+                    assessed_on=assessed_on,
+                )
+        return list(rows.values())
+
+    @classmethod
+    def record_grouping(cls, teacher, preview_data, lesson_1, lesson_2):
+        """
+        Bulk-inserts the grouped roster's scores (one INSERT however large the
+        class) and folds them into that day's LessonRollups.
+        """
+        student_ids = dict(Student.objects.filter(teacher=teacher).values_list("name", "id"))
+        rows = cls.rows_for_grouping(teacher, preview_data, lesson_1, lesson_2, student_ids)
+        if not rows:
+            return rows
+
+        keys = {(row.student_name, row.lesson_number) for row in rows}
+        with transaction.atomic():
+            # Same-day scores about to be replaced, so the rollups can subtract them
+            replaced = [
+                (lesson_number, score)
+                for name, lesson_number, score in cls.objects.filter(
+                    teacher=teacher,
+                    assessed_on=rows[0].assessed_on,
+                    lesson_number__in={lesson for _, lesson in keys},
+                    student_name__in={name for name, _ in keys},
+                ).values_list("student_name", "lesson_number", "score")
+                if (name, lesson_number) in keys
+            ]
+            cls.objects.bulk_create(rows, **cls.UPSERT)
+            LessonRollup.apply(teacher, rows[0].assessed_on, rows, replaced)
+        bump_cache_version(cls.CACHE_VERSION_KEY)
+        return rows
+
+    @classmethod
+    async def arecord_grouping(cls, teacher, preview_data, lesson_1, lesson_2):
+        return await sync_to_async(cls.record_grouping)(teacher, preview_data, lesson_1, lesson_2)
+
+
+def score_band(score, max_points):
+    return (get_color(score, max_points) or "") if max_points else ""
+
+
+class LessonRollup(models.Model):
+    """
+    Per class (teacher) x lesson x day summary of AssessmentResult rows.
+
+    Scores are small integers, so the rollup keeps a histogram (count per
+    score, 0..max_points) plus the exact total; band and tier counts, mean and
+    median are derived from it. record_grouping adds new scores and subtracts
+    replaced ones, so a summary never rescans the results table.
+    """
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE)
+    lesson_number = models.CharField(max_length=10)  # the catalog's lesson id, as on AssessmentResult
+    assessed_on = models.DateField()
+    max_points = models.IntegerField()
+    histogram = models.JSONField(default=list)
+    count = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    mean = models.FloatField(null=True)
+    median = models.FloatField(null=True)
+    bands = models.JSONField(default=dict)
+    tiers = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["teacher", "lesson_number", "assessed_on"], name="one_rollup_per_lesson_day"),
+        ]
+
+    def __str__(self):
+        return f"L{self.lesson_number} {self.assessed_on}: {self.count} students"
+
+    def add(self, score, sign=1):
+        bucket = min(max(score, 0), self.max_points)
+        self.histogram[bucket] += sign
+        self.count += sign
+        self.total += sign * score
+
+    def refresh_stats(self):
+        """Recomputes the derived columns from the histogram (O(max_points))."""
+        self.bands, self.tiers = {}, {}
+        for score, n in enumerate(self.histogram):
+            if n:
+                band = score_band(score, self.max_points) or "None"
+                tier = get_instruction_group(score, self.max_points)
+                self.bands[band] = self.bands.get(band, 0) + n
+                self.tiers[tier] = self.tiers.get(tier, 0) + n
+
+        if not self.count:
+            self.mean = self.median = None
+            return
+        self.mean = self.total / self.count
+        self.median = (self._nth_score((self.count - 1) // 2) + self._nth_score(self.count // 2)) / 2
+
+    def _nth_score(self, k):
+        """The k-th smallest score (0-based), read off the histogram."""
+        seen = 0
+        for score, n in enumerate(self.histogram):
+            seen += n
+            if k < seen:
+                return score
+
+    @classmethod
+    def apply(cls, teacher, assessed_on, added, replaced=()):
+        """Folds added AssessmentResults in, and replaced (lesson_number, score) pairs out."""
+        by_lesson = {}
+        for row in added:
+            by_lesson.setdefault(row.lesson_number, (row.max_points, [], []))[1].append(row.score)
+        for lesson_number, score in replaced:
+            if lesson_number in by_lesson:
+                by_lesson[lesson_number][2].append(score)
+
+        for lesson_number, (max_points, scores, old_scores) in by_lesson.items():
+            rollup, _ = cls.objects.select_for_update().get_or_create(
+                teacher=teacher, lesson_number=lesson_number, assessed_on=assessed_on,
+                defaults={"max_points": max_points, "histogram": [0] * (max_points + 1)},
+            )
+            if rollup.max_points != max_points:
+                rollup.rebuild()
+            else:
+                for score in old_scores:
+                    rollup.add(score, -1)
+                for score in scores:
+                    rollup.add(score)
+                rollup.refresh_stats()
+                rollup.save()
+
+    def rebuild(self):
+        """Recomputes this rollup from its AssessmentResult rows."""
+        results = list(AssessmentResult.objects.filter(
+            teacher_id=self.teacher_id, lesson_number=self.lesson_number, assessed_on=self.assessed_on
+        ).order_by("created_at").values_list("score", "max_points"))
+        if results:
+            self.max_points = results[-1][1]
+        self.histogram, self.count, self.total = [0] * (self.max_points + 1), 0, 0
+        for score, _ in results:
+            self.add(score)
+        self.refresh_stats()
+        self.save()
+
+    def summary(self):
+        """Plain-dict view for exports and JSON."""
+        return {
+            "lesson_number": self.lesson_number,
+            "assessed_on": self.assessed_on.isoformat(),
+            "max_points": self.max_points,
+            "count": self.count,
+            "mean": self.mean,
+            "median": self.median,
+            "bands": self.bands,
+            "tiers": self.tiers,
+        }
+
+    @classmethod
+    def latest_summaries(cls, teacher, lesson_numbers):
+        """Most recent rollup summary for each of lesson_numbers (catalog ids, str or int) that has one."""
+        lesson_numbers = [str(n) for n in lesson_numbers]
+        latest = {}
+        for rollup in cls.objects.filter(teacher=teacher, lesson_number__in=lesson_numbers).order_by("-assessed_on"):
+            latest.setdefault(rollup.lesson_number, rollup.summary())
+        return [latest[n] for n in lesson_numbers if n in latest]
+
+
+BANDS = ("Red", "Yellow", "Green", "Blue")
+TIER_NAMES = ("Intensive Reteach", "Reteach", "Review", "None")
+
+
+def lesson_distribution(since=None, until=None):
+    """
+    Band and tier counts per lesson across every teacher, aggregated in the
+    database (one GROUP BY with conditional counts). Returns the rows as a list
+    in catalog order (lesson ids are strings, so "10" would sort before "5"),
+    ready to paginate.
+    """
+    results = AssessmentResult.objects.all()
+    if since:
+        results = results.filter(assessed_on__gte=since)
+    if until:
+        results = results.filter(assessed_on__lte=until)
+    rows = (
+        results.values("lesson_number")
+        .annotate(
+            results=models.Count("*"),
+            teachers=models.Count("teacher", distinct=True),
+            mean=models.Avg("score"),
+            # Count the filtered column itself, not id, so the index covers the query
+            **{f"band_{band.lower()}": models.Count("band", filter=models.Q(band=band)) for band in BANDS},
+            **{f"tier_{n}": models.Count("tier", filter=models.Q(tier=tier)) for n, tier in enumerate(TIER_NAMES)},
+        )
+        .order_by()
+    )
+    positions = load_ufli_lessons().positions
+    return sorted(rows, key=lambda row: (positions.get(row["lesson_number"], len(positions)), row["lesson_number"]))
+
+
+def distribution_row(row):
+    """Reshapes a lesson_distribution() row into nested band/tier dicts."""
+    return {
+        "lesson_number": row["lesson_number"],
+        "results": row["results"],
+        "teachers": row["teachers"],
+        "mean": round(row["mean"], 2) if row["mean"] is not None else None,
+        "bands": {band: row[f"band_{band.lower()}"] for band in BANDS},
+        "tiers": {tier: row[f"tier_{n}"] for n, tier in enumerate(TIER_NAMES)},
+    }
+
+
+class InterventionSchedule(models.Model):
+    """
+    Weekly focus-group cadence for a teacher, or for every teacher at a school.
+    Empty fields fall back to the defaults in main/utils/schedule.py.
+    """
+    name = models.CharField(max_length=100)
+    teacher = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
+    school = models.CharField(max_length=100, blank=True, db_index=True)
+    days = models.JSONField(default=list, blank=True)  # e.g. ["M", "Tu", "W", "Th"]
+    tier_days = models.JSONField(default=dict, blank=True)  # {"Reteach": ["M", "W"], ...}
+    labels = models.JSONField(default=dict, blank=True)  # {"Review": "🔍 Quick Checkers", ...}
+    group_capacity = models.PositiveIntegerField(null=True, blank=True)  # max students per group
+    updated_at = models.DateTimeField(auto_now=True)
+
+    CACHE_VERSION_KEY = "intervention_schedule:version"
+
+    def __str__(self):
+        return f"{self.name} ({self.teacher or self.school or 'default'})"
+
+    def compile(self):
+        return compile_schedule(self.days, self.tier_days, self.labels, self.group_capacity)
+
+    @classmethod
+    def _cache_key(cls, user_id, version):
+        return f"intervention_schedule:{version}:{user_id}"
+
+    @classmethod
+    def _resolve(cls, user):
+        """The teacher's own schedule, else their school's, else None."""
+        schedule = cls.objects.filter(teacher=user).first()
+        if schedule is None:
+            school = Profile.objects.filter(user=user).values_list("school", flat=True).first()
+            if school:
+                schedule = cls.objects.filter(school=school, teacher__isnull=True).order_by("-updated_at").first()
+        return schedule
+
+    @classmethod
+    def compiled_for(cls, user):
+        """Compiled schedule config for user, cached until any schedule or profile changes."""
+        key = cls._cache_key(user.pk, cache.get_or_set(cls.CACHE_VERSION_KEY, 1, None))
+        config = cache.get(key)
+        if config is None:
+            schedule = cls._resolve(user)
+            config = schedule.compile() if schedule else DEFAULT_SCHEDULE
+            cache.set(key, config, None)
+        return config
+
+    @classmethod
+    async def acompiled_for(cls, user):
+        """compiled_for for async views; runs the same lookup so the two can't drift apart."""
+        return await sync_to_async(cls.compiled_for)(user)
+
+    @classmethod
+    def invalidate(cls):
+        """Retires every cached config by bumping the version in their keys."""
+        bump_cache_version(cls.CACHE_VERSION_KEY)
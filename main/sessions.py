@@ -0,0 +1,56 @@
+"""
+Session engine for the dashboard: cache-first storage with write coalescing.
+
+The dashboard re-assigns a dozen session keys (step flags, lesson choices,
+preview roster, grouped results) on almost every request, usually to the
+values they already had. Django marks the session modified on any assignment,
+so each page view would cost a cache write plus an UPDATE of django_session.
+
+This store remembers the serialized session as it was loaded and skips the
+save when the data has not actually changed. Reads come from the cache
+(SESSION_CACHE_ALIAS) and fall back to the database, exactly like cached_db.
+
+Enable with SESSION_ENGINE = "main.sessions".
+"""
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from main.utils.profiling import phase
+
+
+class SessionStore(CachedDBStore):
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_snapshot = None
+
+    def _snapshot(self, data):
+        return self.serializer().dumps(data)
+
+    def _unchanged(self):
+        """True if the session was loaded and its data still serializes identically."""
+        if self._loaded_snapshot is None or self.session_key is None:
+            return False
+        return self._snapshot(self._session) == self._loaded_snapshot
+
+    def load(self):
+        with phase("session"):
+            data = super().load()
+        self._loaded_snapshot = self._snapshot(data) if data else None
+        return data
+
+    async def aload(self):
+        with phase("session"):
+            data = await super().aload()
+        self._loaded_snapshot = self._snapshot(data) if data else None
+        return data
+
+    def save(self, must_create=False):
+        if not must_create and self._unchanged():
+            return
+        super().save(must_create)
+        self._loaded_snapshot = self._snapshot(self._session)
+
+    async def asave(self, must_create=False):
+        if not must_create and self._unchanged():
+            return
+        await super().asave(must_create)
+        self._loaded_snapshot = self._snapshot(self._session)
@@ -1,9 +1,48 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Profile
+from django.db.models import QuerySet
+from .models import AssessmentResult, InterventionSchedule, LessonRollup, Profile, Roster, bump_cache_version
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+@receiver(post_save, sender=InterventionSchedule)
+@receiver(post_delete, sender=InterventionSchedule)
+@receiver(post_save, sender=Profile)
+def invalidate_schedule_cache(sender, **kwargs):
+    InterventionSchedule.invalidate()
+
+@receiver(post_save, sender=Roster)
+@receiver(post_delete, sender=Roster)
+def invalidate_roster_dropdown(sender, instance, **kwargs):
+    bump_cache_version(Roster.cache_version_key(instance.user_id))
+
+@receiver(post_save, sender=AssessmentResult)
+def refresh_lesson_rollup(sender, instance, **kwargs):
+    """Single-row edits (admin); record_grouping's bulk inserts update rollups themselves."""
+    rollup = LessonRollup.objects.filter(
+        teacher_id=instance.teacher_id, lesson_number=instance.lesson_number, assessed_on=instance.assessed_on
+    ).first() or LessonRollup(
+        teacher_id=instance.teacher_id, lesson_number=instance.lesson_number,
+        assessed_on=instance.assessed_on, max_points=instance.max_points,
+    )
+    rollup.rebuild()
+
+@receiver(post_delete, sender=AssessmentResult)
+def shrink_lesson_rollup(sender, instance, origin=None, **kwargs):
+    """
+    Rebuilds the rollup a deleted result belonged to. Cascades (a teacher or
+    student being deleted) are skipped, and a rollup already gone (the
+    teacher's cascade removed it) is never recreated.
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is not AssessmentResult:
+        return
+    rollup = LessonRollup.objects.filter(
+        teacher_id=instance.teacher_id, lesson_number=instance.lesson_number, assessed_on=instance.assessed_on
+    ).first()
+    if rollup is not None:
+        rollup.rebuild()
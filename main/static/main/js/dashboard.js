@@ -200,7 +200,7 @@ function loadUFLILessonTable() {
           <tr><th>Lesson</th><th>Title</th><th>Skills</th></tr>
         </thead>
         <tbody>
-          ${data.map(l => `
+          ${(data.lessons || data).map(l => `
             <tr>
               <td>${l.lesson}</td>
               <td>${l.title}</td>
@@ -1,3 +1,829 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import threading
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.templatetags.static import static
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import Workbook, load_workbook
+from main.middleware import OffloadBackpressureMiddleware
+from main.utils.catalog import CatalogError, LessonCatalog, build_catalog
+from main.utils.log_queue import KeyValueFormatter, QueuedStreamHandler
+from main.utils.offload import OffloadBusy, OffloadService
+from main.utils.parse_excel import MissingColumnsError, parse_roster_dataframe
+from main.main_utils import assign_group, find_lesson, load_ufli_lessons
+from main.utils.preview_codec import PreviewRoster, StudentScore, get_preview, set_preview, student_records
+from main.utils.profiling import current_profile, phase
+from main.models import AssessmentResult, InterventionSchedule, LessonRollup, Roster, StaleVersion, Student
+from main.utils.schedule import compile_schedule, compute_schedule, schedule_rows
+from main.utils.upload_limits import UploadRejected, inspect_upload
+from main.wizard import WizardState
 
-# Create your tests here.
+
+def make_roster_file(rows, headers=("Name", "Score1", "Score2"), name="roster.xlsx"):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(list(headers))
+    for row in rows:
+        ws.append(list(row))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+PREVIEW = [
+    {"name": "Alice", "score1": 1, "score2": 3},
+    {"name": "Bob", "score1": 3, "score2": 0},
+]
+
+
+@pytest.fixture
+def teacher_client(client, django_user_model):
+    user = django_user_model.objects.create_user(username="teach", password="pw12345!")
+    client.force_login(user)
+    session = client.session
+    set_preview(session, PREVIEW)
+    wizard = WizardState()
+    wizard.update(lesson_1_id="5", lesson_2_id="6")
+    wizard.save(session)
+    session.save()
+    return client
+
+
+# ---------- JSON API ----------
+
+@pytest.mark.django_db
+def test_api_preview_returns_session_roster(teacher_client):
+    response = teacher_client.get(reverse("main:api_preview"))
+    data = response.json()
+
+    assert data["ok"] is True
+    assert data["student_count"] == 2
+    assert data["students"][0]["name"] == "Alice"
+
+
+@pytest.mark.django_db
+def test_api_save_scores_updates_only_submitted_rows(teacher_client):
+    response = teacher_client.post(
+        reverse("main:api_save_scores"),
+        data=json.dumps({"rows": [{"index": 2, "score1": "2"}]}),
+        content_type="application/json",
+    )
+    data = response.json()
+
+    assert data["ok"] is True
+    assert data["updated"] == [
+        {"index": 2, "name": "Bob", "score1": 2, "score2": 0, "missing_score1": False, "missing_score2": False}
+    ]
+    assert get_preview(teacher_client.session)[0]["score1"] == PREVIEW[0]["score1"]
+
+
+@pytest.mark.django_db
+def test_api_group_returns_fragment_and_stores_groups(teacher_client):
+    response = teacher_client.post(
+        reverse("main:api_group"),
+        data=json.dumps({"lesson_1": "5", "lesson_2": "6"}),
+        content_type="application/json",
+    )
+    data = response.json()
+
+    assert data["ok"] is True
+    assert "Alice" in data["fragment"]
+    assert [row["name"] for row in data["daily"]] == ["Alice", "Bob"]
+    assert "grouped_data" in teacher_client.session
+
+
+@pytest.mark.django_db
+def test_api_group_rejects_missing_roster(client, django_user_model):
+    user = django_user_model.objects.create_user(username="empty", password="pw12345!")
+    client.force_login(user)
+
+    response = client.post(reverse("main:api_group"), data={"lesson_1": "5", "lesson_2": "6"})
+
+    assert response.status_code == 400
+    assert response.json()["ok"] is False
+
+
+# ---------- Parsing / async views ----------
+
+def test_parse_roster_dataframe_flags_missing_scores():
+    rows = parse_roster_dataframe(make_roster_file([("Alice", 2, None), ("Bob", "x", 3)]))
+
+    assert rows == [
+        {"name": "Alice", "score1": 2, "score2": 0, "missing_score1": False, "missing_score2": True},
+        {"name": "Bob", "score1": 0, "score2": 3, "missing_score1": True, "missing_score2": False},
+    ]
+
+
+def test_parse_roster_dataframe_requires_columns():
+    with pytest.raises(MissingColumnsError):
+        parse_roster_dataframe(make_roster_file([("Alice", 2)], headers=("Name", "Score")))
+
+
+@pytest.mark.django_db
+def test_upload_roster_async_stores_preview(teacher_client):
+    response = teacher_client.post(
+        reverse("main:upload_roster_async"),
+        {"roster_file": make_roster_file([("Cara", 3, 4)])},
+    )
+
+    assert response.status_code == 302
+    assert get_preview(teacher_client.session)[0]["name"] == "Cara"
+    assert WizardState.load(teacher_client.session).entry_mode == "upload"
+
+
+@pytest.mark.django_db
+def test_group_async_matches_sync_api(teacher_client):
+    response = teacher_client.post(reverse("main:group_async"), {"lesson_1": "5", "lesson_2": "6"})
+    data = response.json()
+
+    assert data["ok"] is True
+    assert "Bob" in data["fragment"]
+    assert teacher_client.session["lesson_meta"]["lesson_1"]["id"] == "5"
+
+
+# ---------- Offload pool ----------
+
+def test_offload_service_rejects_jobs_beyond_queue_limit():
+    service = OffloadService(kind="thread", max_workers=1, max_pending=1, retry_after=7)
+    release = threading.Event()
+    try:
+        running = service.submit(release.wait)
+        queued = service.submit(release.wait)
+        with pytest.raises(OffloadBusy) as excinfo:
+            service.submit(release.wait)
+        assert excinfo.value.retry_after == 7
+    finally:
+        release.set()
+    running.result(timeout=5)
+    queued.result(timeout=5)
+    assert service.run(sum, [1, 2]) == 3
+    service.shutdown()
+
+
+def test_backpressure_middleware_returns_503(rf):
+    middleware = OffloadBackpressureMiddleware(lambda request: None)
+    response = middleware.process_exception(rf.get("/"), OffloadBusy(retry_after=3))
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == "3"
+
+
+@pytest.mark.django_db
+def test_polished_export_runs_on_offload_pool(teacher_client):
+    teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+    response = teacher_client.get(reverse("main:generate_excel_view"))
+
+    assert response.status_code == 200
+    wb = load_workbook(io.BytesIO(response.content))
+    assert any(name.startswith("VC & CVC Words") for name in wb.sheetnames)
+    weekly_rows = [[cell.value for cell in row] for row in wb.worksheets[1].iter_rows()]
+    assert ["🚨 Extra Boost Crew"] + ["Alice"] * 5 in weekly_rows
+
+
+# ---------- Upload guardrails ----------
+
+def test_inspect_upload_reads_row_count_without_parsing():
+    data = make_roster_file([(f"Student {i}", 1, 2) for i in range(30)]).read()
+
+    shape = inspect_upload(data, max_rows=20)
+
+    assert shape.sheets == 1
+    assert shape.rows == 30
+    assert shape.truncated is True
+
+
+def test_inspect_upload_rejects_oversized_and_non_excel_files():
+    data = make_roster_file([("Alice", 1, 2)]).read()
+
+    with pytest.raises(UploadRejected):
+        inspect_upload(data, max_bytes=100)
+    with pytest.raises(UploadRejected):
+        inspect_upload(data, max_uncompressed=100)
+    with pytest.raises(UploadRejected):
+        inspect_upload(b"name,score1,score2\nAlice,1,2\n")
+
+
+@pytest.mark.django_db
+def test_dashboard_upload_truncates_to_row_limit(teacher_client, settings):
+    settings.UPLOAD_MAX_ROWS = 5
+    roster = make_roster_file([(f"Student {i}", 1, 2) for i in range(12)])
+
+    teacher_client.post(reverse("main:dashboard"), {"process_roster_upload": "1", "roster_file": roster})
+
+    assert len(get_preview(teacher_client.session)) == 5
+
+
+# ---------- Preview session encoding ----------
+
+def test_preview_roster_round_trips_rows_and_missing_flags():
+    rows = [
+        {"name": "Alice", "score1": 2, "score2": 0, "missing_score1": False, "missing_score2": True},
+        {"name": "Bob", "score1": None, "score2": "4"},
+    ]
+
+    roster = PreviewRoster.decode(PreviewRoster.from_rows(rows).encode())
+
+    assert roster.to_rows() == [
+        rows[0],
+        {"name": "Bob", "score1": 0, "score2": 4, "missing_score1": True, "missing_score2": False},
+    ]
+
+
+def test_preview_roster_encoding_is_smaller_than_row_dicts():
+    rows = [
+        {"name": f"Student {i}", "score1": i % 6, "score2": i % 4, "missing_score1": False, "missing_score2": i % 7 == 0}
+        for i in range(500)
+    ]
+
+    assert len(json.dumps(PreviewRoster.from_rows(rows).encode())) * 3 < len(json.dumps(rows))
+
+
+def test_preview_roster_update_clears_missing_flag():
+    roster = PreviewRoster.from_rows([{"name": "Alice", "score1": None, "score2": None}])
+
+    roster.update(0, score1=3)
+
+    assert roster[0] == {"name": "Alice", "score1": 3, "score2": 0, "missing_score1": False, "missing_score2": True}
+
+
+def test_student_records_match_rows_without_building_dicts():
+    rows = [
+        {"name": "Alice", "score1": 2, "score2": 0, "missing_score1": False, "missing_score2": True},
+        {"name": "Bob", "score1": None, "score2": "4"},
+    ]
+
+    from_roster = student_records(PreviewRoster.from_rows(rows))
+    from_rows = student_records(rows)
+
+    assert from_roster == from_rows
+    assert from_roster[1] == StudentScore("Bob", 0, 4, missing_score1=True)
+    assert not hasattr(from_roster[0], "__dict__")
+
+
+def test_grouped_data_stores_concept_names_once():
+    lessons = load_ufli_lessons()
+    _, grouped_data = assign_group(PreviewRoster.from_rows(PREVIEW), find_lesson(lessons, 5), find_lesson(lessons, 6), {"Alice": None})
+
+    assert grouped_data["concepts"] == {"concept_1": "VC & CVC Words", "concept_2": find_lesson(lessons, 6)["concept"]}
+    assert grouped_data["daily"][0] == {"name": "Alice", "group_1": "Yellow", "score1": 1, "group_2": "Blue", "score2": 3}
+    assert grouped_data["tags"] == {}
+
+
+@pytest.mark.django_db
+def test_dashboard_renders_encoded_preview(teacher_client):
+    response = teacher_client.get(reverse("main:dashboard"))
+
+    assert response.status_code == 200
+    assert 'value="Alice"' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_dashboard_pages_large_preview(teacher_client):
+    session = teacher_client.session
+    set_preview(session, [{"name": f"Student {i}", "score1": i, "score2": 0} for i in range(1, 121)])
+    session.save()
+
+    html = teacher_client.get(reverse("main:dashboard"), {"page": 3}).content.decode()
+
+    assert 'name="name_101" value="Student 101"' in html and 'name="name_120"' in html
+    assert 'name="name_1"' not in html and 'name="name_100"' not in html
+    assert "Students 101–120 of 120" in html
+
+
+@pytest.mark.django_db
+def test_save_roster_merges_json_diff_into_session_roster(teacher_client):
+    diff = {"rows": [{"index": 2, "name": "Bobby", "score1": "2", "score2": "1"}], "deleted": [1], "added": [{"name": "Cy", "score1": "4"}]}
+    teacher_client.post(reverse("main:dashboard"), {"save_roster_raw": "1", "roster_name": "Fall", "roster_diff": json.dumps(diff)})
+
+    rows = Roster.objects.get(name="Fall").data
+    assert [(r["name"], r["score1"], r["score2"]) for r in rows] == [("Bobby", 2, 1), ("Cy", 4, 0)]
+    assert len(get_preview(teacher_client.session)) == 2
+
+
+@pytest.mark.django_db
+def test_preview_page_change_keeps_posted_rows_without_script(teacher_client):
+    response = teacher_client.post(reverse("main:dashboard"), {
+        "preview_page": "2", "roster_diff": "", "name_2": "Bob", "score1_2": "1", "score2_2": "2", "delete_1": "on", "name_1": "Alice",
+    })
+
+    assert response.url.endswith("?page=2#step3")
+    assert get_preview(teacher_client.session).to_rows() == [
+        {"name": "Bob", "score1": 1, "score2": 2, "missing_score1": False, "missing_score2": False},
+    ]
+
+
+# ---------- Session engine ----------
+
+@pytest.mark.django_db
+def test_coalescing_session_skips_unchanged_saves(django_assert_num_queries):
+    from main.sessions import SessionStore
+
+    store = SessionStore()
+    store["step1_done"] = True
+    store.save()
+
+    reloaded = SessionStore(store.session_key)
+    reloaded["step1_done"] = True  # same value: marks modified, but nothing to write
+    with django_assert_num_queries(0):
+        reloaded.save()
+
+    reloaded["step2_done"] = True
+    reloaded.save()
+    assert SessionStore(store.session_key)["step2_done"] is True
+
+
+def test_deploy_check_requires_a_shared_cache(settings):
+    from main.checks import shared_cache_check
+
+    settings.DEBUG, settings.LOCAL_CACHE = False, True
+    assert [error.id for error in shared_cache_check(None)] == ["main.E001"]
+    settings.LOCAL_CACHE = False
+    assert shared_cache_check(None) == []
+
+
+# ---------- Wizard state ----------
+
+def test_wizard_state_tracks_changes_and_current_step():
+    wizard = WizardState()
+    wizard.update(entry_mode="paste", student_count=0)
+    assert wizard.dirty is False
+
+    wizard.complete("step1")
+    wizard.complete("step2")
+    assert wizard.dirty is True
+    assert wizard.step3_open is True
+    assert wizard.current_step == "step3"
+
+    session = {}
+    wizard.save(session)
+    assert session["wizard"] == {"step1_done": True, "step2_done": True, "step3_open": True}
+
+
+@pytest.mark.django_db
+def test_dashboard_grouping_advances_wizard(teacher_client):
+    teacher_client.post(reverse("main:dashboard"), {"save_lessons": "1", "lesson_1": "5", "lesson_2": "6"})
+    response = teacher_client.post(reverse("main:dashboard"), {"sort2support": "1", "lesson_1": "5", "lesson_2": "6"})
+
+    wizard = WizardState.load(teacher_client.session)
+    assert wizard.step1_done and wizard.step4_done
+    assert wizard.lesson_1_name == "VC & CVC Words"
+    assert response.context["current_step"] == "step2"
+    assert "Alice" in response.content.decode()
+
+    teacher_client.post(reverse("main:dashboard"), {"save_lessons": "1", "lesson_1": "5", "lesson_2": "6"})
+    assert WizardState.load(teacher_client.session).step4_done
+    teacher_client.post(reverse("main:dashboard"), {"save_lessons": "1", "lesson_1": "7", "lesson_2": "8"})
+    assert not WizardState.load(teacher_client.session).step4_done
+
+
+# ---------- Weekly schedule ----------
+
+def test_schedule_matrix_places_tiers_on_their_days():
+    students = [{"name": "Alice", "score1": 1}, {"name": "Bob", "score1": 3}, {"name": "Cara", "score1": None}]
+
+    schedule = compute_schedule(students, "score1", 5)
+    matrix = dict(schedule_rows(schedule))
+
+    assert schedule["days"] == ["M", "Tu", "W", "Th", "F"]
+    assert matrix["🚨 Extra Boost Crew"] == [["Alice"]] * 5
+    assert matrix["🔄 Reteach Squad"] == [["Bob"], [], ["Bob"], [], ["Bob"]]
+    assert matrix["🌟 Ready to Fly"] == [[]] * 5
+
+
+def test_compiled_schedule_supports_short_weeks_and_capacity():
+    config = compile_schedule(days=["M", "Tu", "W", "Th"], labels={"Reteach": "Squad"}, group_capacity=2)
+    students = [{"name": name, "score1": 2} for name in ("Ann", "Ben", "Cy")]
+
+    schedule = compute_schedule(students, "score1", 5, config)
+    matrix = dict(schedule_rows(schedule))
+
+    assert schedule["days"] == ["M", "Tu", "W", "Th"]
+    assert matrix["Squad 1"] == [["Ann", "Ben"], [], ["Ann", "Ben"], []]
+    assert matrix["Squad 2"] == [["Cy"], [], ["Cy"], []]
+
+
+@pytest.mark.django_db
+def test_school_schedule_applies_to_its_teachers(django_user_model):
+    teacher = django_user_model.objects.create_user(username="t1", password="pw12345!")
+    assert InterventionSchedule.compiled_for(teacher)["days"] == ["M", "Tu", "W", "Th", "F"]
+
+    teacher.profile.school = "Lincoln"
+    teacher.profile.save()
+    InterventionSchedule.objects.create(name="4-day", school="Lincoln", days=["M", "Tu", "W", "Th"])
+
+    assert InterventionSchedule.compiled_for(teacher)["days"] == ["M", "Tu", "W", "Th"]
+    assert async_to_sync(InterventionSchedule.acompiled_for)(teacher) == InterventionSchedule.compiled_for(teacher)
+
+
+# ---------- Score history ----------
+
+@pytest.mark.django_db
+def test_grouping_appends_score_history_once_per_day(teacher_client):
+    for _ in range(2):
+        teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+
+    results = AssessmentResult.objects.order_by("student_name", "lesson_number")
+    assert [(r.student_name, r.lesson_number, r.score) for r in results] == [
+        ("Alice", "5", 1), ("Alice", "6", 3), ("Bob", "5", 3), ("Bob", "6", 0),
+    ]
+
+
+@pytest.mark.django_db
+def test_grouping_records_lettered_lessons(teacher_client):
+    response = teacher_client.post(reverse("main:api_group"), {"lesson_1": "35a", "lesson_2": "6"})
+
+    assert response.status_code == 200
+    assert sorted(AssessmentResult.objects.values_list("lesson_number", flat=True).distinct()) == ["35a", "6"]
+    assert LessonRollup.objects.get(lesson_number="35a").count == 2
+
+    response = teacher_client.get(reverse("main:generate_excel_view"))
+    summary = load_workbook(io.BytesIO(response.content))["Class Summary"]
+    assert [row[0] for row in summary.iter_rows(min_row=2, values_only=True)] == ["Short A Review", "p /p/"]
+
+
+@pytest.mark.django_db
+def test_lesson_rollup_tracks_regrouped_scores(teacher_client):
+    teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+    teacher_client.post(
+        reverse("main:api_save_scores"),
+        data=json.dumps({"rows": [{"index": 1, "score1": 2}]}),
+        content_type="application/json",
+    )
+    teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+
+    rollup = LessonRollup.objects.get(lesson_number="5")
+    assert (rollup.count, rollup.total, rollup.median) == (2, 5, 2.5)
+    assert sum(rollup.tiers.values()) == 2
+
+    rollup.rebuild()
+    assert (rollup.count, rollup.total, rollup.mean) == (2, 5, 2.5)
+
+    response = teacher_client.get(reverse("main:generate_excel_view"))
+    summary = load_workbook(io.BytesIO(response.content))["Class Summary"]
+    assert summary["C2"].value == 2
+
+
+@pytest.mark.django_db
+def test_deleting_results_updates_rollups_and_teachers_can_be_deleted(teacher_client, django_user_model):
+    teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+
+    AssessmentResult.objects.filter(lesson_number="5").first().delete()
+    assert LessonRollup.objects.get(lesson_number="5").count == 1
+
+    django_user_model.objects.get(username="teach").delete()
+    assert not AssessmentResult.objects.exists()
+    assert not LessonRollup.objects.exists()
+
+
+# ---------- Staff analytics ----------
+
+@pytest.mark.django_db
+def test_staff_analytics_aggregates_across_teachers(teacher_client, admin_client):
+    teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+
+    data = admin_client.get(reverse("main:staff_analytics")).json()
+    lesson_5 = data["lessons"][0]
+
+    assert data["lesson_count"] == 2
+    assert (lesson_5["lesson_number"], lesson_5["results"], lesson_5["teachers"]) == ("5", 2, 1)
+    assert sum(lesson_5["tiers"].values()) == 2
+
+    response = admin_client.get(reverse("main:staff_analytics"), {"format": "xlsx"})
+    ws = load_workbook(io.BytesIO(response.content)).active
+    assert ws["A2"].value == "5"
+    assert ws["B2"].value == "VC & CVC Words"
+
+
+@pytest.mark.django_db
+def test_staff_analytics_requires_staff(teacher_client):
+    response = teacher_client.get(reverse("main:staff_analytics"))
+
+    assert response.status_code == 302
+
+
+# ---------- Request profiling ----------
+
+@pytest.mark.django_db
+def test_profiling_middleware_emits_server_timing(teacher_client, settings):
+    settings.REQUEST_PROFILING = True
+    client = Client()  # middleware is instantiated when the handler is built
+    client.cookies = teacher_client.cookies
+    response = client.get(reverse("main:dashboard"))
+
+    timing = response["Server-Timing"]
+    assert "session;dur=" in timing and "render;dur=" in timing
+    assert 'desc="' in timing and "total;dur=" in timing
+
+
+def test_phase_is_a_no_op_without_a_profile():
+    with phase("grouping"):
+        pass
+    assert current_profile() is None
+
+
+# ---------- Logging ----------
+
+def test_queued_handler_formats_and_writes_from_background_thread():
+    formatted_on = []
+
+    class RecordingFormatter(KeyValueFormatter):
+        def format(self, record):
+            formatted_on.append(threading.current_thread())
+            return super().format(record)
+
+    stream = io.StringIO()
+    handler = QueuedStreamHandler(stream)
+    handler.setFormatter(RecordingFormatter("%(levelname)s %(message)s"))
+    logger = logging.getLogger("main.tests.queued")
+    logger.addHandler(handler)
+    names = ["Amy"]
+    try:
+        logger.warning("grouped %s", names, extra={"teacher": "teach"})
+        names.append("Ben")  # mutated after the call: must not change the logged message
+        handler.flush()
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    assert stream.getvalue() == "WARNING grouped ['Amy'] teacher=teach\n"
+    assert formatted_on and threading.main_thread() not in formatted_on
+
+
+@pytest.mark.django_db
+def test_export_logs_instead_of_printing(teacher_client, capsys, caplog):
+    teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+    with caplog.at_level(logging.DEBUG, logger="main"):
+        teacher_client.get(reverse("main:generate_excel_view"))
+
+    assert capsys.readouterr().out == ""
+    assert any(record.name == "main.views" and record.levelno == logging.DEBUG for record in caplog.records)
+
+
+# ---------- Static files ----------
+
+def test_collected_static_files_are_hashed_compressed_and_immutable(settings, tmp_path):
+    settings.STATIC_ROOT = tmp_path
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+    }
+    call_command("collectstatic", interactive=False, verbosity=0)
+    url = static("main/styles.css")
+
+    assert url != "/static/main/styles.css"
+    assert (tmp_path / url.removeprefix("/static/")).with_suffix(".css.gz").exists()
+    assert not (tmp_path / "main" / "OLD styles.css").exists()
+
+    response = Client().get(url)  # WhiteNoise indexes STATIC_ROOT when the handler is built
+    assert response.status_code == 200
+    assert "immutable" in response["Cache-Control"]
+
+
+# ---------- Dashboard fragment caching ----------
+
+@pytest.mark.django_db
+def test_dashboard_caches_lesson_and_roster_dropdowns(teacher_client, django_user_model):
+    user = django_user_model.objects.get(username="teach")
+    Roster.objects.create(user=user, name="Period 3", data=[])
+    teacher_client.post(reverse("main:dashboard"), {"entry_mode": "load"})
+    teacher_client.get(reverse("main:dashboard"))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = teacher_client.get(reverse("main:dashboard"))
+    assert not any("main_roster" in query["sql"] for query in queries.captured_queries)
+    assert "Period 3" in response.content.decode()
+    assert "Lesson 5:" in response.content.decode()
+
+    Roster.objects.create(user=user, name="Period 4", data=[])
+    assert "Period 4" in teacher_client.get(reverse("main:dashboard")).content.decode()
+
+
+# ---------- Bulk resets ----------
+
+@pytest.mark.django_db
+def test_reset_saved_scores_clears_scores_in_one_update(teacher_client, django_user_model):
+    user = django_user_model.objects.get(username="teach")
+    Student.objects.bulk_create(Student(teacher=user, name=f"S{i}", ufli_score_1=2, ufli_score_2=3) for i in range(20))
+    teacher_client.post(reverse("main:api_group"), {"lesson_1": "5", "lesson_2": "6"})
+
+    with CaptureQueriesContext(connection) as queries:
+        teacher_client.post(reverse("main:reset_saved_scores"))
+    student_writes = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('UPDATE "main_student"')]
+
+    assert len(student_writes) == 1
+    assert not Student.objects.filter(ufli_score_1__isnull=False).exists()
+    assert "grouped_data" not in teacher_client.session
+
+
+@pytest.mark.django_db
+def test_reset_scores_command_targets_one_school(django_user_model):
+    for username, school in (("a", "Lincoln"), ("b", "Lincoln"), ("c", "Oak Ridge")):
+        user = django_user_model.objects.create_user(username=username)
+        user.profile.school = school
+        user.profile.save()
+        Student.objects.create(teacher=user, name=f"{username}1", ufli_score_1=1, ufli_score_2=1)
+
+    out = io.StringIO()
+    call_command("reset_scores", school=["Lincoln"], stdout=out)
+
+    assert "2 students" in out.getvalue()
+    assert list(Student.objects.filter(ufli_score_1__isnull=False).values_list("name", flat=True)) == ["c1"]
+    with pytest.raises(CommandError):
+        call_command("reset_scores")
+
+
+# ---------- Score edits ----------
+
+@pytest.mark.django_db
+def test_apply_score_changes_is_one_guarded_update(django_user_model):
+    teacher = django_user_model.objects.create_user(username="t", password="pw12345!")
+    amy, ben, cal = (Student.objects.create(teacher=teacher, name=name, ufli_score_1=1, ufli_score_2=1) for name in ("Amy", "Ben", "Cal"))
+    ben.ufli_score_1 = 9
+    ben.save()  # saved in another tab: version 1 -> 2
+
+    with CaptureQueriesContext(connection) as queries:
+        saved, conflicts = Student.apply_score_changes(teacher, {
+            amy.pk: {"version": 1, "ufli_score_1": 4},
+            ben.pk: {"version": 1, "ufli_score_1": 5, "ufli_score_2": 5},
+        })
+
+    # Lock the writable rows, one UPDATE, then read back the new versions
+    statements = [q["sql"].split()[0] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]]
+    assert statements == ["SELECT", "UPDATE", "SELECT"]
+
+    assert saved == {amy.pk: 2} and conflicts == {ben.pk: 2}
+    scores = dict(Student.objects.values_list("name", "ufli_score_1"))
+    assert scores == {"Amy": 4, "Ben": 9, "Cal": 1}
+    assert Student.objects.get(pk=cal.pk).version == 1
+
+
+@pytest.mark.django_db
+def test_a_competing_save_with_the_same_score_is_still_a_conflict(django_user_model):
+    teacher = django_user_model.objects.create_user(username="t", password="pw12345!")
+    amy = Student.objects.create(teacher=teacher, name="Amy", ufli_score_1=1, ufli_score_2=1)
+    Student.objects.filter(pk=amy.pk).update(ufli_score_1=4, ufli_score_2=7, version=2)  # other tab, same score_1
+
+    saved, conflicts = Student.apply_score_changes(teacher, {amy.pk: {"version": 1, "ufli_score_1": 4}})
+
+    assert saved == {} and conflicts == {amy.pk: 2}
+
+@pytest.mark.django_db
+def test_update_scores_json_returns_new_versions(teacher_client):
+    student = Student.objects.create(teacher=User.objects.get(username="teach"), name="Amy", ufli_score_1=1)
+    response = teacher_client.post(reverse("main:update_scores"), {"students": [
+        {"id": student.pk, "score2": "3", "version": student.version},
+        {"id": student.pk + 1, "score1": "3"},  # no version: ignored
+    ]}, content_type="application/json")
+
+    student.refresh_from_db()
+    assert response.json() == {"ok": True, "updated": {str(student.pk): 2}, "conflicts": {}}
+    assert (student.ufli_score_1, student.ufli_score_2, student.version) == (1, 3, 2)
+
+
+@pytest.mark.django_db
+def test_save_is_conditional_on_the_loaded_version(django_user_model):
+    roster = Roster.objects.create(user=django_user_model.objects.create_user(username="t"), name="Fall", data=PREVIEW)
+    other_tab = Roster.objects.get(pk=roster.pk)
+
+    roster.data = PREVIEW[:1]
+    roster.save()
+    assert roster.version == 2
+
+    other_tab.data = []
+    with pytest.raises(StaleVersion), transaction.atomic():
+        other_tab.save()
+    assert Roster.objects.get(pk=roster.pk).data == PREVIEW[:1]
+
+    assert Roster.save_data(roster.user, "Fall", PREVIEW) == (roster.pk, 3)
+
+
+@pytest.mark.django_db
+def test_stale_roster_and_student_saves_are_refused_not_500(teacher_client, admin_client):
+    teacher = User.objects.get(username="teach")
+    roster = Roster.objects.create(user=teacher, name="Fall", data=PREVIEW)
+    teacher_client.post(reverse("main:dashboard"), {"load_selected_roster": "1", "roster_id": roster.pk})
+    Roster.save_data(teacher, "Fall", PREVIEW[:1])  # saved from another tab
+
+    response = teacher_client.post(reverse("main:dashboard"), {"save_roster_raw": "1", "roster_name": "Fall", "roster_diff": "{}"})
+    assert response.status_code == 302
+    assert Roster.objects.get(pk=roster.pk).data == PREVIEW[:1]
+
+    student = Student.objects.create(teacher=teacher, name="Amy")
+    url = reverse("admin:main_student_change", args=[student.pk])
+    form = {"teacher": teacher.pk, "name": "Amy", "ufli_score_1": "4", "ufli_score_2": "", "version": "1"}
+    Student.objects.filter(pk=student.pk).update(version=2)
+    response = admin_client.post(url, form, follow=True)
+    assert "changed by someone else" in response.content.decode()
+    assert Student.objects.get(pk=student.pk).ufli_score_1 is None
+
+    response = admin_client.post(url, {**form, "version": "2"})
+    assert response.status_code == 302 and Student.objects.get(pk=student.pk).ufli_score_1 == 4
+
+
+@pytest.mark.django_db
+def test_grouping_is_cached_per_saved_roster_version(teacher_client, monkeypatch):
+    from main import main_utils
+
+    calls = []
+    monkeypatch.setattr(main_utils, "assign_group", lambda *args: calls.append(1) or ("<table>", {"daily": []}))
+    roster = Roster.objects.create(user=User.objects.get(username="teach"), name="Fall", data=PREVIEW)
+    teacher_client.post(reverse("main:dashboard"), {"load_selected_roster": "1", "roster_id": roster.pk})
+
+    for _ in range(2):
+        teacher_client.post(reverse("main:api_group"), {}, content_type="application/json")
+    assert len(calls) == 1
+
+    teacher_client.post(reverse("main:api_save_scores"), {"rows": [{"index": 1, "score1": 2}]}, content_type="application/json")
+    assert get_preview(teacher_client.session).source is None
+    teacher_client.post(reverse("main:api_group"), {}, content_type="application/json")
+    assert len(calls) == 2
+
+
+# ---------- Offline roster import ----------
+
+@pytest.mark.django_db
+def test_import_rosters_command_maps_folders_to_teachers_and_resumes(tmp_path, django_user_model):
+    teacher = django_user_model.objects.create_user(username="teach")
+    Student.objects.create(teacher=teacher, name="Alice", ufli_score_1=0, ufli_score_2=0)
+    (tmp_path / "teach").mkdir()
+    (tmp_path / "ghost").mkdir()
+    with open(tmp_path / "teach" / "Period 3.xlsx", "wb") as f:
+        f.write(make_roster_file([("Alice", 2, 3), ("Bob", None, 1)]).read())
+    (tmp_path / "teach" / "Period 4.csv").write_text("Name,Score1,Score2\nCara,4,x\n")
+    (tmp_path / "teach" / "broken.csv").write_text("Student,Points\nDee,1\n")
+    (tmp_path / "ghost" / "Period 1.csv").write_text("Name,Score1,Score2\nEve,1,1\n")
+    report = tmp_path / "report.csv"
+
+    out = io.StringIO()
+    call_command("import_rosters", str(tmp_path), workers=0, batch_size=2, report=str(report), stdout=out, stderr=io.StringIO())
+
+    assert "Imported 2 rosters: 2 students added, 1 rescored" in out.getvalue()
+    assert sorted(Roster.objects.values_list("name", flat=True)) == ["Period 3", "Period 4"]
+    scores = {s.name: (s.ufli_score_1, s.ufli_score_2) for s in Student.objects.all()}
+    assert scores == {"Alice": (2, 3), "Bob": (None, 1), "Cara": (4, None)}
+    assert "unmatched" in report.read_text()
+
+    out = io.StringIO()
+    call_command("import_rosters", str(tmp_path), workers=0, stdout=out, stderr=io.StringIO())
+    assert "Imported 0 rosters" in out.getvalue() and "2 were already imported" in out.getvalue()
+
+
+# ---------- Offline grouped exports ----------
+
+@pytest.mark.django_db
+def test_export_groups_command_writes_workbooks_and_skips_unchanged(tmp_path, django_user_model):
+    teacher = django_user_model.objects.create_user(username="teach")
+    Roster.objects.create(user=teacher, name="Period 3", data=PREVIEW)
+    roster = Roster.objects.create(user=teacher, name="Period 4", data=PREVIEW)
+    lessons = load_ufli_lessons()
+    AssessmentResult.record_grouping(teacher, PREVIEW, find_lesson(lessons, "5"), find_lesson(lessons, "6"))
+
+    out = io.StringIO()
+    call_command("export_groups", lesson_pair="5,6", out=str(tmp_path), workers=0, stdout=out)
+    assert "2 workbooks written, 0 unchanged" in out.getvalue()
+    summary = load_workbook(tmp_path / "teach" / "period-3.xlsx")["Class Summary"]
+    assert [row[2] for row in summary.iter_rows(min_row=2, values_only=True)] == [2, 2]
+
+    call_command("export_groups", lesson_pair="35a,6", out=str(tmp_path / "lettered"), workers=0, stdout=io.StringIO())
+    assert (tmp_path / "lettered" / "teach" / "period-4.xlsx").exists()
+
+    roster.data = PREVIEW + [{"name": "Cara", "score1": 2, "score2": 2}]
+    roster.save()
+    out = io.StringIO()
+    call_command("export_groups", lesson_pair="5,6", out=str(tmp_path), workers=0, stdout=out)
+    assert "1 workbooks written, 1 unchanged" in out.getvalue()
+
+    with pytest.raises(CommandError):
+        call_command("export_groups", lesson_pair="5", out=str(tmp_path))
+
+
+def test_build_catalog_skips_unchanged_source_and_rejects_bad_rows(tmp_path):
+    source, target = tmp_path / "lessons.csv", tmp_path / "lessons.json"
+    source.write_text("Lesson,Concept,Irregular Words,New Concept Points\n5,VC & CVC Words,and,3\n35a,-all,,4\n")
+
+    written, artifact = build_catalog(source, target)
+    assert written and artifact["index"] == {"5": 0, "35a": 1} and artifact["points"]["35a"] == 4
+    assert build_catalog(source, target) == (False, None)
+
+    source.write_text("Lesson,Concept,Irregular Words,New Concept Points\n5,VC & CVC Words,and,3\n5,,,x\n")
+    with pytest.raises(CatalogError) as exc:
+        build_catalog(source, target)
+    assert "line 3: lesson 5 appears twice" in str(exc.value)
+    assert "line 3: lesson 5 needs whole-number points" in str(exc.value)
+    assert json.loads(target.read_text())["version"] == artifact["version"]
+
+
+def test_runtime_catalog_is_indexed():
+    lessons = load_ufli_lessons()
+
+    assert isinstance(lessons, LessonCatalog) and lessons is load_ufli_lessons()
+    assert find_lesson(lessons, "35a") is lessons[lessons.positions["35a"]]
+    assert find_lesson(lessons, 999) is None
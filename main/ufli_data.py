@@ -1,144 +0,0 @@
-ufli_lessons = [
-    {"number": "1", "concept": "a /ǎ/", "words": ["the", "a"]},
-    {"number": "2", "concept": "m /m/", "words": []},
-    {"number": "3", "concept": "s /s/", "words": ["I"]},
-    {"number": "4", "concept": "t /t/", "words": []},
-    {"number": "5", "concept": "VC & CVC Words", "words": ["and"]},
-    {"number": "6", "concept": "p /p/", "words": []},
-    {"number": "7", "concept": "f /f/", "words": ["a"]},
-    {"number": "8", "concept": "I /ǐ/", "words": []},
-    {"number": "9", "concept": "n /n/", "words": ["is"]},
-    {"number": "10", "concept": "CVC Practice (a, i)", "words": []},
-    {"number": "11", "concept": "Nasalized A (am, an)", "words": ["as"]},
-    {"number": "12", "concept": "o /ǒ/", "words": []},
-    {"number": "13", "concept": "d /d/", "words": ["said"]},
-    {"number": "14", "concept": "c /k/", "words": []},
-    {"number": "15", "concept": "u /ǔ/", "words": ["to", "do"]},
-    {"number": "16", "concept": "g /g/", "words": []},
-    {"number": "17", "concept": "b /b/", "words": ["of"]},
-    {"number": "18", "concept": "e /ě/", "words": []},
-    {"number": "19", "concept": "VC & CVC Practice (all)", "words": ["see"]},
-    {"number": "20", "concept": "-s /s/", "words": []},
-    {"number": "21", "concept": "-s /z/", "words": []},
-    {"number": "22", "concept": "k /k/", "words": []},
-    {"number": "23", "concept": "h /h/", "words": ["be", "me"]},
-    {"number": "24", "concept": "r /r/ Part 1", "words": []},
-    {"number": "25", "concept": "r /r/ Part 2", "words": ["from"]},
-    {"number": "26", "concept": "l /l/ Part 1", "words": ["look", "book"]},
-    {"number": "27", "concept": "l /l/ Part 2", "words": ["are"]},
-    {"number": "28", "concept": "w /w/", "words": []},
-    {"number": "29", "concept": "j /j/", "words": ["was"]},
-    {"number": "30", "concept": "y /y/", "words": []},
-    {"number": "31", "concept": "x /ks/", "words": ["you"]},
-    {"number": "32", "concept": "qu /kw/", "words": []},
-    {"number": "33", "concept": "v /v/", "words": ["what", "have"]},
-    {"number": "34", "concept": "z /z/", "words": []},
-    {"number": "35a", "concept": "Short A Review", "words": ["the*", "I*"]},
-    {"number": "35b", "concept": "Nasalized A Review", "words": ["a*"]},
-    {"number": "35c", "concept": "Short A Advanced Review", "words": ["said*"]},
-    {"number": "36a", "concept": "Short I Review", "words": ["to*", "do*"]},
-    {"number": "36b", "concept": "Short I Advanced Review", "words": ["of*", "see*"]},
-    {"number": "37a", "concept": "Short O Review", "words": ["he*", "be*"]},
-    {"number": "37b", "concept": "Short O Advanced Review", "words": ["me*", "from*"]},
-    {"number": "38a", "concept": "Short A, I, O Review", "words": ["the*", "said*"]},
-    {"number": "38b", "concept": "Short A, I, O Advanced Review", "words": ["to*", "from*"]},
-    {"number": "39a", "concept": "Short U Review", "words": ["look*", "book*"]},
-    {"number": "39b", "concept": "Short U Advanced Review", "words": ["are*", "was*"]},
-    {"number": "40a", "concept": "Short E Review", "words": ["you*"]},
-    {"number": "40b", "concept": "Short E Advanced Review", "words": ["what*", "have*"]},
-    {"number": "41a", "concept": "Short Vowel Review (all)", "words": []},
-    {"number": "41b", "concept": "Short Vowel Advanced Review 1", "words": []},
-    {"number": "41c", "concept": "Short Vowel Advanced Review 2", "words": []},
-    {"number": "42", "concept": "FLSZ Spelling Rule (ff, ll, ss, zz)", "words": ["your", "want"]},
-    {"number": "43", "concept": "-all, -oll, -ull", "words": ["no", "so"]},
-    {"number": "44", "concept": "ck /k/", "words": ["goes", "says"]},
-    {"number": "45", "concept": "sh /sh/", "words": ["she", "we"]},
-    {"number": "46", "concept": "Voiced th /th/", "words": ["they", "their"]},
-    {"number": "47", "concept": "Unvoiced th /th/", "words": ["were"]},
-    {"number": "48", "concept": "ch /ch/", "words": ["talk", "walk"]},
-    {"number": "49", "concept": "Digraphs Review 1", "words": ["she*", "they*"]},
-    {"number": "50", "concept": "wh /w/, ph /f/", "words": ["could", "would"]},
-    {"number": "51", "concept": "ng /ŋ/", "words": ["or", "for"]},
-    {"number": "52", "concept": "nk /ŋk/", "words": ["there", "where"]},
-    {"number": "53", "concept": "Digraph Review 2 (incl. CCCVC)", "words": ["should*", "there*"]},
-    {"number": "54", "concept": "a_e /ā/", "words": ["who"]},
-    {"number": "55", "concept": "i_e /ī/", "words": ["by", "my"]},
-    {"number": "56", "concept": "o_e /ō/", "words": []},
-    {"number": "57", "concept": "Vce Review 1, e_e /ē/", "words": ["who*", "my*"]},
-    {"number": "58", "concept": "u_e /ū/, /yū/", "words": ["one", "once"]},
-    {"number": "59", "concept": "Vce Review 2 (all)", "words": ["by*", "one*"]},
-    {"number": "60", "concept": "_ce /s/", "words": []},
-    {"number": "61", "concept": "_ge /j/", "words": []},
-    {"number": "62", "concept": "Vce Review 3, Vce Exceptions", "words": ["once*"]},
-    {"number": "63", "concept": "-es", "words": ["two", "does"]},
-    {"number": "64", "concept": "-ed", "words": ["many", "any"]},
-    {"number": "65", "concept": "-ing", "words": ["been", "into"]},
-    {"number": "66", "concept": "Closed & Open Syllables", "words": ["friend"]},
-    {"number": "67a", "concept": "Compound Words", "words": ["because"]},
-    {"number": "67b", "concept": "Closed/Closed", "words": []},
-    {"number": "68", "concept": "Open/Closed", "words": []},
-    {"number": "69", "concept": "tch /ch/", "words": ["woman", "women"]},
-    {"number": "70", "concept": "dge /j/", "words": ["move"]},
-    {"number": "71", "concept": "tch /ch/, dge /j/ Review", "words": ["woman*", "move*"]},
-    {"number": "72", "concept": "Long VCC (-ild, -old, -ind, -olt, -ost)", "words": ["both"]},
-    {"number": "73", "concept": "y /ī/", "words": ["four", "fourth"]},
-    {"number": "74", "concept": "y /ē/", "words": ["forty"]},
-    {"number": "75", "concept": "-le", "words": ["people"]},
-    {"number": "76", "concept": "Ending Patterns Review", "words": ["four*", "people*"]},
-    {"number": "77", "concept": "ar /ar/", "words": ["pretty"]},
-    {"number": "78", "concept": "or /or/, ore /or/", "words": ["nothing"]},
-    {"number": "79", "concept": "ar /ar/ & or, ore /or/ Review", "words": ["pretty*", "nothing*"]},
-    {"number": "80", "concept": "er /er/", "words": ["other", "another"]},
-    {"number": "81", "concept": "ir, ur /er/", "words": ["mother", "brother"]},
-    {"number": "82", "concept": "Spelling /er/: er, ir, ur, w + or", "words": ["other*", "mother*"]},
-    {"number": "83", "concept": "R-Controlled Vowels Review", "words": ["father", "water"]},
-    {"number": "84", "concept": "ai, ay /ā/", "words": ["today", "very"]},
-    {"number": "85", "concept": "ee, ea, ey /ē/", "words": ["above", "among"]},
-    {"number": "86", "concept": "oa, ow, oe /ō/", "words": ["again", "against"]},
-    {"number": "87", "concept": "ie, igh /ī/", "words": ["always", "almost"]},
-    {"number": "88", "concept": "Vowel Teams Review 1", "words": ["very*", "again*"]},
-    {"number": "89", "concept": "oo, u /oo/", "words": ["floor", "poor"]},
-    {"number": "90", "concept": "oo /ū/", "words": ["won", "son"]},
-    {"number": "91", "concept": "ew, ui, ue /ū/", "words": ["month"]},
-    {"number": "92", "concept": "Vowel Teams Review 2", "words": []},
-    {"number": "93", "concept": "au, aw, augh /aw/", "words": ["hour", "minute"]},
-    {"number": "94", "concept": "ea /ě/, a /ǒ/", "words": ["Monday", "Wednesday"]},
-    {"number": "95", "concept": "oi, oy /oi/", "words": ["February"]},
-    {"number": "96", "concept": "ou, ow /ow/", "words": ["eye", "heart"]},
-    {"number": "97", "concept": "Vowel Teams & Diphthongs Review", "words": []},
-    {"number": "98", "concept": "kn /n/, wr /r/, mb /m/", "words": ["about"]},
-    {"number": "99", "concept": "-s/ -es", "words": ["answer"]},
-    {"number": "100", "concept": "-er/ -est", "words": []},
-    {"number": "101", "concept": "-ly", "words": ["honest", "honor"]},
-    {"number": "102", "concept": "-less, -ful", "words": []},
-    {"number": "103", "concept": "un-", "words": ["truth", "truly"]},
-    {"number": "104", "concept": "pre-, re-", "words": []},
-    {"number": "105", "concept": "dis-", "words": []},
-    {"number": "106", "concept": "Affixes Review 1", "words": []},
-    {"number": "107", "concept": "Doubling Rule -ed, -ing", "words": ["busy"]},
-    {"number": "108", "concept": "Doubling Rule -er, -est", "words": ["build", "built"]},
-    {"number": "109", "concept": "Drop -e Rule", "words": ["sure"]},
-    {"number": "110", "concept": "-y to i Rule", "words": ["laugh"]},
-    {"number": "111", "concept": "-ar, -or, /er/", "words": ["who", "whom"]},
-    {"number": "112", "concept": "air, are, ear /air/", "words": ["whose"]},
-    {"number": "113", "concept": "ear /ear/", "words": ["toward"]},
-    {"number": "114", "concept": "Alternate /ā/ (ei, ey, eigh, aigh, ea)", "words": ["through"]},
-    {"number": "115", "concept": "Alternate Long U (ew, eu, ue /yū/; ou /ū/)", "words": ["learn", "earth"]},
-    {"number": "116", "concept": "ough /aw/, /ō/", "words": ["buy", "guy"]},
-    {"number": "117", "concept": "Signal Vowels (c /s/, g /j/)", "words": ["guess", "guest"]},
-    {"number": "118", "concept": "ch /sh/, /k/; gn /n/, gh /g/; silent t", "words": ["young", "touch"]},
-    {"number": "119", "concept": "-sion, -tion", "words": ["enough", "tough"]},
-    {"number": "120", "concept": "-ture", "words": []},
-    {"number": "121", "concept": "-er, -or, -ist", "words": []},
-    {"number": "122", "concept": "-ish", "words": []},
-    {"number": "123", "concept": "-y", "words": []},
-    {"number": "124", "concept": "-ness", "words": []},
-    {"number": "125", "concept": "-ment", "words": []},
-    {"number": "126", "concept": "-able, -ible", "words": []},
-    {"number": "127", "concept": "unl-, bl-, tri", "words": []},
-    {"number": "128", "concept": "Affixes Review 2", "words": []},
-    {"number": "129", "concept": "Generic 3 Point Assessment", "words": []},
-    {"number": "130", "concept": "Generic 4 Point Assessment", "words": []},
-    {"number": "131", "concept": "Generic 5 Point Assessment", "words": []},
-    {"number": "132", "concept": "Generic 6 Point Assessment", "words": []},
-]
\ No newline at end of file
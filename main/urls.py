@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = "main"
 
@@ -17,6 +17,20 @@ urlpatterns = [
     path("load-previous-roster/", views.load_previous_roster, name="load_previous_roster"),
     path("upload/", views.upload_page, name="upload_page"),
     path("update-scores/", views.update_scores, name="update_scores"),
+
+    # JSON API (in-place dashboard updates)
+    path("api/preview/", views.api_preview, name="api_preview"),
+    path("api/save-scores/", views.api_save_scores, name="api_save_scores"),
+    path("api/group/", views.api_group, name="api_group"),
+
+    # Staff analytics (all teachers)
+    path("staff/analytics/", views.staff_analytics, name="staff_analytics"),
+
+    # Async (ASGI) equivalents of the heavy upload, grouping and export endpoints
+    path("async/upload-roster/", async_views.upload_roster_async, name="upload_roster_async"),
+    path("async/upload/", async_views.upload_page_async, name="upload_page_async"),
+    path("async/group/", async_views.group_async, name="group_async"),
+    path("async/export-polished/", async_views.generate_excel_view_async, name="generate_excel_view_async"),
     
     # Exports
     path("export-polished/", views.generate_excel_view, name="generate_excel_view"),   # polished multi-sheet export 
@@ -0,0 +1,38 @@
+# main/utils/analytics_export.py
+"""
+XLSX export for the staff analytics view: one row per lesson with band and
+tier counts across all teachers. Takes the already-aggregated rows, so it is
+model-free and runs on the offload pool.
+"""
+import io
+from openpyxl import Workbook
+from openpyxl.styles import Font, PatternFill
+from main.utils.polished_export import autofit_columns
+
+
+def build_analytics_bytes(rows, lesson_names=None):
+    """rows: distribution_row() dicts; lesson_names: {catalog lesson id (str): concept}."""
+    lesson_names = lesson_names or {}
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Lesson Distribution"
+
+    bands = list(rows[0]["bands"]) if rows else []
+    tiers = list(rows[0]["tiers"]) if rows else []
+    ws.append(["Lesson", "Concept", "Results", "Teachers", "Mean"] + bands + tiers)
+    for cell in ws[1]:
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+
+    for row in rows:
+        ws.append(
+            [row["lesson_number"], lesson_names.get(str(row["lesson_number"]), ""), row["results"], row["teachers"], row["mean"]]
+            + [row["bands"][band] for band in bands]
+            + [row["tiers"][tier] for tier in tiers]
+        )
+
+    ws.freeze_panes = "A2"
+    autofit_columns(ws)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,119 @@
+# main/utils/catalog.py
+"""
+UFLI lesson catalog: validated once at build time, loaded as-is at runtime.
+
+main/data/ufli_lessons.csv is the source (columns Lesson, Concept, Irregular
+Words, New Concept Points). build_catalog() checks every row and writes the
+compact artifact main/static/main/data/ufli_lessons.json:
+
+    {"format": 1, "version": "...", "source_sha256": "...",
+     "lessons": [{"number", "concept", "irregular_words", "total_points"}, ...],
+     "index": {number: position}, "points": {number: total_points}}
+
+It rewrites the artifact only when the source's hash differs from the one
+recorded in it, so running it on every deploy is free. load_catalog() just
+parses the artifact: no per-lesson checks, and find_lesson() uses the index.
+
+Model- and settings-free, so convert_lessons.py can run it without Django.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+
+
+CATALOG_FORMAT = 1
+COLUMNS = ("Lesson", "Concept", "Irregular Words", "New Concept Points")
+
+
+class CatalogError(ValueError):
+    """Raised when the lesson source has rows the app cannot use; lists every problem."""
+
+
+class LessonCatalog(list):
+    """The lesson dicts in catalog order, plus the artifact's version, index and points table."""
+
+    def __init__(self, lessons=(), version="", positions=None, points=None):
+        super().__init__(lessons)
+        self.version = version
+        self.positions = positions if positions is not None else {l["number"]: i for i, l in enumerate(self)}
+        self.points = points if points is not None else {l["number"]: l["total_points"] for l in self}
+
+    def get(self, number):
+        position = self.positions.get(str(number))
+        return self[position] if position is not None else None
+
+
+def parse_source(text):
+    """Lesson dicts from the CSV source; raises CatalogError naming each bad line."""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise CatalogError(f"Missing columns: {', '.join(missing)}.")
+
+    lessons, problems, seen = [], [], set()
+    for line, row in enumerate(reader, start=2):
+        number = (row["Lesson"] or "").strip()
+        concept = (row["Concept"] or "").strip()
+        points = (row["New Concept Points"] or "").strip()
+        if not number:
+            problems.append(f"line {line}: no lesson number")
+            continue
+        if number in seen:
+            problems.append(f"line {line}: lesson {number} appears twice")
+        if not concept:
+            problems.append(f"line {line}: lesson {number} has no concept")
+        if not points.isdigit() or int(points) < 1:
+            problems.append(f"line {line}: lesson {number} needs whole-number points, got {points!r}")
+            continue
+        seen.add(number)
+        lessons.append({
+            "number": number,  # kept as a string (handles 35a, 35b, etc.)
+            "concept": concept,
+            "irregular_words": (row["Irregular Words"] or "").strip(),
+            "total_points": int(points),
+        })
+    if problems:
+        raise CatalogError("Invalid lesson source:\n" + "\n".join(problems))
+    return lessons
+
+
+def build_catalog(source, target, force=False):
+    """
+    Rebuilds target from source if the source changed since the last build.
+    Returns (written, artifact dict or None when up to date).
+    """
+    with open(source, "rb") as f:
+        raw = f.read()
+    source_sha256 = hashlib.sha256(raw).hexdigest()
+    if not force and os.path.exists(target):
+        with open(target, encoding="utf-8") as f:
+            current = json.load(f)
+        if isinstance(current, dict) and current.get("source_sha256") == source_sha256:
+            return False, None
+
+    lessons = parse_source(raw.decode("utf-8-sig"))
+    body = json.dumps(lessons, ensure_ascii=False, separators=(",", ":"))
+    artifact = {
+        "format": CATALOG_FORMAT,
+        "version": hashlib.sha256(body.encode()).hexdigest()[:12],
+        "source_sha256": source_sha256,
+        "lessons": lessons,
+        "index": {lesson["number"]: i for i, lesson in enumerate(lessons)},
+        "points": {lesson["number"]: lesson["total_points"] for lesson in lessons},
+    }
+    tmp = f"{target}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, target)
+    return True, artifact
+
+
+def load_catalog(path):
+    """Reads a built artifact into a LessonCatalog (a bare lesson list from before builds still loads)."""
+    with open(path, encoding="utf-8") as f:
+        artifact = json.load(f)
+    if isinstance(artifact, list):
+        return LessonCatalog(artifact, version="unversioned")
+    return LessonCatalog(artifact["lessons"], artifact["version"], artifact["index"], artifact["points"])
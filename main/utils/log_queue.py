@@ -0,0 +1,78 @@
+# main/utils/log_queue.py
+"""
+Non-blocking log output, wired up by LOGGING in settings.
+
+QueuedStreamHandler only puts each record on an in-memory queue; one
+background thread formats it (timestamp, extras, tracebacks) and writes it to
+stderr. The calling thread just interpolates the %-args into the message, so
+objects mutated after the call can't change what is logged. Request threads
+never wait on a slow or blocked stdout (gunicorn's pipe, a container log driver).
+
+Calls below the configured level are dropped before the message is built, so
+log with %-style arguments (logger.debug("groups: %s", groups)), not f-strings,
+and guard anything expensive to compute with logger.isEnabledFor().
+"""
+import atexit
+import copy
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Standard format, followed by the record's extra= fields as key=value pairs."""
+
+    def format(self, record):
+        line = super().format(record)
+        extras = " ".join(f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        return f"{line} {extras}" if extras else line
+
+
+class QueuedStreamHandler(QueueHandler):
+    """Hands records to a listener thread that writes them to stream (default stderr)."""
+
+    def __init__(self, stream=None, level=logging.NOTSET):
+        super().__init__(queue.Queue())
+        self.setLevel(level)
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self._start()
+        atexit.register(self.close)
+        # A forked worker (gunicorn --preload) inherits the queue but not the thread
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def _restart_in_child(self):
+        self.queue = queue.Queue()
+        self._start()
+
+    def prepare(self, record):
+        """Snapshots the message for the queue; formatting is left to the listener thread."""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+    def setFormatter(self, fmt):
+        # The final formatting happens on the listener thread, not in the caller
+        self.target.setFormatter(fmt)
+
+    def flush(self):
+        """Blocks until every queued record has been written."""
+        if self.listener._thread is not None:
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
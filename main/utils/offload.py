@@ -0,0 +1,111 @@
+# main/utils/offload.py
+"""
+Shared executor for CPU-heavy spreadsheet work (parsing uploads, building exports).
+
+openpyxl and pandas hold the GIL, so by default jobs run in a process pool.
+The pool accepts at most OFFLOAD_MAX_WORKERS running plus OFFLOAD_MAX_PENDING
+queued jobs; beyond that submit() raises OffloadBusy, which
+OffloadBackpressureMiddleware turns into a 503 with a Retry-After header.
+
+Jobs must be plain module-level functions with picklable arguments (pass file
+bytes, not UploadedFile objects) and must not import models.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+
+
+class OffloadBusy(Exception):
+    """Raised when the offload pool is saturated and cannot queue another job."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Offload pool is busy; retry after {retry_after}s.")
+        self.retry_after = retry_after
+
+
+class OffloadService:
+    """A process or thread pool with a hard cap on running + queued jobs."""
+
+    def __init__(self, kind="process", max_workers=2, max_pending=8, retry_after=5,
+                 timeout=None, start_method="spawn"):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "thread":
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers, thread_name_prefix="s2s-offload"
+                        )
+                    else:
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context(self.start_method),
+                        )
+        return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """Queues func(*args, **kwargs) and returns a Future, or raises OffloadBusy."""
+        if not self._slots.acquire(blocking=False):
+            raise OffloadBusy(self.retry_after)
+        try:
+            future = self.executor.submit(func, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Runs a job on the pool and blocks the calling (sync) view until it finishes."""
+        return self.submit(func, *args, **kwargs).result(timeout=self.timeout)
+
+    async def arun(self, func, *args, **kwargs):
+        """Runs a job on the pool without blocking the event loop."""
+        future = asyncio.wrap_future(self.submit(func, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout=self.timeout)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_service = None
+
+
+def get_offload_service():
+    """Returns the process-wide OffloadService configured from settings."""
+    global _service
+    if _service is None:
+        _service = OffloadService(
+            kind=getattr(settings, "OFFLOAD_EXECUTOR", "process"),
+            max_workers=getattr(settings, "OFFLOAD_MAX_WORKERS", 2),
+            max_pending=getattr(settings, "OFFLOAD_MAX_PENDING", 8),
+            retry_after=getattr(settings, "OFFLOAD_RETRY_AFTER", 5),
+            timeout=getattr(settings, "OFFLOAD_TIMEOUT", 120),
+            start_method=getattr(settings, "OFFLOAD_START_METHOD", "spawn"),
+        )
+    return _service
+
+
+def run_offloaded(func, *args, **kwargs):
+    """Sync views: run func on the shared pool and wait for its result."""
+    return get_offload_service().run(func, *args, **kwargs)
+
+
+async def arun_offloaded(func, *args, **kwargs):
+    """Async views: await func on the shared pool."""
+    return await get_offload_service().arun(func, *args, **kwargs)
@@ -1,6 +1,18 @@
-import pandas as pd
+import csv
+import io
+import itertools
+import os
+import openpyxl
+from main.utils.upload_limits import UploadRejected
+
+
+class MissingColumnsError(ValueError):
+    """Raised when an uploaded roster lacks the name/score1/score2 columns."""
+
 
 def parse_excel(file):
+    import pandas as pd  # optional (not in requirements.txt); only these readers need it
+
     df = pd.read_excel(file)
 
     # Normalize column names
@@ -14,3 +26,128 @@ def parse_excel(file):
     # Convert to list of dicts
     student_data = df.to_dict(orient="records")
     return student_data
+
+
+def parse_roster_dataframe(file, max_rows=None):
+    """
+    Parse a roster upload (name, score1, score2) with pandas into preview rows.
+    Missing or non-numeric scores are saved as 0 and flagged as missing.
+    Accepts a file object or raw bytes (as sent to an offload worker);
+    max_rows stops reading after that many data rows.
+    Raises MissingColumnsError if the required columns are not present.
+    """
+    import pandas as pd
+
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    df = pd.read_excel(file, nrows=max_rows)
+    df.columns = [str(c).strip().lower().replace(" ", "") for c in df.columns]
+    if not {"name", "score1", "score2"}.issubset(df.columns):
+        raise MissingColumnsError("Missing required columns: name, score1, score2.")
+
+    preview_data = []
+    for _, row in df.iterrows():
+        name = str(row.get("name", "")).strip()
+        score1 = row.get("score1")
+        score2 = row.get("score2")
+        missing_score1 = score1 in (None, "", "nan")
+        missing_score2 = score2 in (None, "", "nan")
+        try:
+            score1 = int(score1) if not missing_score1 else 0
+        except (ValueError, TypeError):
+            score1, missing_score1 = 0, True
+        try:
+            score2 = int(score2) if not missing_score2 else 0
+        except (ValueError, TypeError):
+            score2, missing_score2 = 0, True
+        if name:
+            preview_data.append({
+                "name": name,
+                "score1": score1,
+                "score2": score2,
+                "missing_score1": missing_score1,
+                "missing_score2": missing_score2,
+            })
+    return preview_data
+
+
+def parse_roster_workbook(file, max_rows=None):
+    """
+    Parse the first three columns of the active sheet (header row skipped) into preview rows.
+    max_rows stops reading after that many data rows.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    wb = openpyxl.load_workbook(file, read_only=True)
+    sheet = wb.active
+
+    preview_data = []
+    max_row = max_rows + 1 if max_rows else None
+    for row in sheet.iter_rows(min_row=2, max_row=max_row, max_col=3, values_only=True):
+        name, score1, score2 = (tuple(row) + (None, None, None))[:3]
+        if name:
+            preview_data.append({
+                "name": str(name).strip(),
+                "score1": int(score1) if score1 else 0,
+                "score2": int(score2) if score2 else 0,
+            })
+    wb.close()
+    return preview_data
+
+
+def _score(value):
+    """(score, missing) for one cell; blanks and non-numbers are saved as 0 and flagged."""
+    if value is None or str(value).strip() == "":
+        return 0, True
+    try:
+        return int(float(value)), False
+    except (TypeError, ValueError):
+        return 0, True
+
+
+def roster_rows(rows, max_rows=None):
+    """
+    Turns an iterable of row tuples (header first) into preview rows, matching
+    columns by header and flagging missing scores like parse_roster_dataframe.
+    Consumes rows lazily, stopping after max_rows data rows.
+    """
+    rows = iter(rows)
+    header = [str(cell).strip().lower().replace(" ", "") if cell is not None else "" for cell in next(rows, ())]
+    try:
+        columns = [header.index(key) for key in ("name", "score1", "score2")]
+    except ValueError:
+        raise MissingColumnsError("Missing required columns: name, score1, score2.") from None
+
+    preview_data = []
+    for row in itertools.islice(rows, max_rows):
+        name, score1, score2 = (row[i] if i < len(row) else None for i in columns)
+        name = str(name).strip() if name is not None else ""
+        if not name:
+            continue
+        score1, missing_score1 = _score(score1)
+        score2, missing_score2 = _score(score2)
+        preview_data.append({
+            "name": name,
+            "score1": score1,
+            "score2": score2,
+            "missing_score1": missing_score1,
+            "missing_score2": missing_score2,
+        })
+    return preview_data
+
+
+def parse_roster_path(path, max_rows=None, max_bytes=None):
+    """
+    Streams one roster file from disk (.xlsx or .csv) into preview rows, for
+    offline imports. Takes and returns plain values, so it can run in a worker process.
+    """
+    if max_bytes and os.path.getsize(path) > max_bytes:
+        raise UploadRejected(f"File is larger than {max_bytes} bytes.")
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return roster_rows(csv.reader(f), max_rows)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        return roster_rows(wb.active.iter_rows(values_only=True), max_rows)
+    finally:
+        wb.close()
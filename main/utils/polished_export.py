@@ -0,0 +1,259 @@
+# main/utils/polished_export.py
+"""
+Polished multi-sheet export (the "Export Weekly Plan" button).
+
+Kept free of model imports so the builders can run in an offload worker process.
+"""
+import io
+import logging
+import re
+from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+from openpyxl.formatting.rule import FormulaRule
+from main.main_utils import assign_group
+from main.utils.profiling import phase
+from main.utils.schedule import empty_schedule, schedule_rows
+from main.wizard import lesson_meta
+
+logger = logging.getLogger(__name__)
+
+
+def sheet_name_with_date(title: str) -> str:
+    """
+    Sanitize a string for use as an Excel sheet name, always appending today's date.
+    - Removes invalid Excel characters
+    - Appends YYYY-MM-DD
+    - Truncates to 31 characters (Excel limit)
+    """
+    # Remove invalid Excel characters
+    safe = re.sub(r'[:\\/*?\[\]]', '-', title).strip()
+
+    # Append today's date
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    safe = f"{safe} {today_str}"
+
+    # Excel sheet names max length = 31
+    if len(safe) > 31:
+        safe = safe[:28] + "..."
+
+    return safe
+
+def autofit_columns(ws):
+    """Resize each column in a worksheet to fit its longest value."""
+    for i, col in enumerate(ws.columns, 1):  # i is the column index
+        max_length = 0
+        col_letter = get_column_letter(i)
+        for cell in col:
+            try:
+                if cell.value:
+                    max_length = max(max_length, len(str(cell.value)))
+            except Exception:
+                pass
+        adjusted_width = max_length + 2
+        ws.column_dimensions[col_letter].width = adjusted_width
+
+
+def add_group_color_highlighting(ws, start_row=2, last_col="C", group_col="A"):
+    """
+    Highlight entire rows based on whether the group label in group_col
+    contains 'Red', 'Yellow', 'Green', or 'Blue'.
+    The range automatically extends to ws.max_row.
+    """
+
+    end_row = ws.max_row  # dynamically detect last row with data
+    
+    ws.freeze_panes = "A2"
+
+    colors = {
+        "Red":    "F4CCCC",  # light red
+        "Yellow": "FFF2CC",  # light yellow
+        "Green":  "D9EAD3",  # light green
+        "Blue":   "CFE2F3",  # light blue
+    }
+
+    for keyword, hex_color in colors.items():
+        fill = PatternFill(start_color=hex_color, end_color=hex_color, fill_type="solid")
+        # Formula: look for the keyword anywhere in the group label column
+        formula = f'ISNUMBER(SEARCH("{keyword}",${group_col} & ROW()))'
+        ws.conditional_formatting.add(
+            f"A{start_row}:{last_col}{end_row}",
+            FormulaRule(formula=[formula], fill=fill)
+        )
+
+
+def build_export_bytes(grouped_data, lesson_1, lesson_2, summaries=()):
+    """Builds the polished export workbook and returns it as xlsx bytes."""
+    with phase("workbook_build"):
+        wb = generate_excel(grouped_data, lesson_1, lesson_2, summaries)  # must return a Workbook
+    with phase("workbook_save"):
+        buffer = io.BytesIO()
+        wb.save(buffer)
+    return buffer.getvalue()
+
+
+def build_grouped_export(preview_data, lesson_1, lesson_2, schedule_config=None, summaries=()):
+    """
+    Groups one saved roster and builds its polished export (xlsx bytes) in a
+    single job; lesson_1/lesson_2 are catalog dicts. Used by the export_groups command.
+    """
+    _, grouped_data = assign_group(preview_data, lesson_1, lesson_2, {}, schedule_config)
+    meta = lesson_meta(lesson_1, lesson_2)
+    return build_export_bytes(grouped_data, meta["lesson_1"], meta["lesson_2"], summaries)
+
+
+def add_summary_sheet(wb, summaries, lesson_names, header_font, header_fill):
+    """
+    Class summary per lesson, written straight from LessonRollup.summary() dicts —
+    no per-student arithmetic at export time.
+    """
+    ws = wb.create_sheet(title="Class Summary")
+    ws.append(["Lesson", "Date", "Students", "Mean", "Median", "Red", "Yellow", "Green", "Blue",
+               "Intensive Reteach", "Reteach", "Review", "Ready"])
+    for cell in ws[1]:
+        cell.font = header_font
+        cell.fill = header_fill
+
+    for summary in summaries:
+        bands, tiers = summary["bands"], summary["tiers"]
+        ws.append([
+            lesson_names.get(str(summary["lesson_number"]), summary["lesson_number"]),
+            summary["assessed_on"],
+            summary["count"],
+            round(summary["mean"], 2) if summary["mean"] is not None else None,
+            summary["median"],
+            *(bands.get(band, 0) for band in ("Red", "Yellow", "Green", "Blue")),
+            *(tiers.get(tier, 0) for tier in ("Intensive Reteach", "Reteach", "Review", "None")),
+        ])
+
+    ws.freeze_panes = "A2"
+    autofit_columns(ws)
+
+
+def generate_excel(grouped_data, lesson_1, lesson_2, summaries=()):
+    wb = Workbook()
+    wb.remove(wb.active)  # Remove default empty sheet
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+
+    group_colors = {
+        "Extra Boost Crew": "FFC0CB",  # Pink
+        "Reteach Squad": "FFFACD",     # Lemon
+        "Quick Checkers": "CCFFCC",    # Light green
+        "Ready to Fly": "ADD8E6",      # Light blue
+    }
+
+    lesson_names = {
+        "concept1": lesson_1["name"],
+        "concept2": lesson_2["name"]
+    }
+
+    for concept_key in ("daily", "concept1", "concept2"):
+        groups = grouped_data.get(concept_key)
+        if groups is None:
+            continue
+
+        sheet_title = sheet_name_with_date(lesson_names.get(concept_key, concept_key))
+        ws = wb.create_sheet(title=sheet_title)
+
+        if concept_key == "daily":
+            ws.append(["Student", "Group 1", "Concept 1", "Group 2", "Concept 2"])
+            # Concept names are stored once per grouping (older sessions repeat them per student)
+            concepts = grouped_data.get("concepts", {})
+            for student in groups:
+                name = student.get("name", "")
+                group_1 = student.get("group_1", "")
+                concept_1 = student.get("concept_1", concepts.get("concept_1", ""))
+                group_2 = student.get("group_2", "")
+                concept_2 = student.get("concept_2", concepts.get("concept_2", ""))
+                ws.append([name, group_1, concept_1, group_2, concept_2])
+
+        elif isinstance(groups, dict):
+            ws.append(["Group", "Student", "Score"])
+            score_key = "score1" if concept_key == "concept1" else "score2"
+
+            for group_name, students in groups.items():
+                for student in students:
+                    # ✅ Handle dicts
+                    if isinstance(student, dict):
+                        name = student.get("name", "")
+                        score = student.get(score_key, "")
+                    # ✅ Handle 2-element tuples/lists
+                    elif isinstance(student, (list, tuple)) and len(student) == 2:
+                        name, score = student
+                    # ✅ Handle plain strings
+                    elif isinstance(student, str):
+                        name = student
+                        score = ""
+                    # ✅ Handle unexpected formats
+                    else:
+                        logger.warning("Unexpected student format in %s: %r", group_name, student)
+                        continue
+
+                    # ✅ Flatten deeply nested values
+                    if isinstance(name, (list, tuple)):
+                        name = ", ".join(str(x) for x in name)
+                    if isinstance(score, (list, tuple)):
+                        score = ", ".join(str(x) for x in score)
+
+                    ws.append([group_name, name, score])
+
+
+
+
+
+        else:
+            logger.warning("Skipping %s: unexpected structure %s", concept_key, type(groups).__name__)
+            continue
+
+        for cell in ws[1]:
+            cell.font = header_font
+            cell.fill = header_fill
+
+        if logger.isEnabledFor(logging.DEBUG):
+            sample = groups[:1] if isinstance(groups, list) else list(groups.items())[:1]
+            logger.debug("%s: %s groups, sample %r", concept_key, type(groups).__name__, sample)
+
+        ws.freeze_panes = "A2"
+        add_group_color_highlighting(ws, start_row=2, last_col="C", group_col="A")
+
+        # Leave a blank row before weekly plan
+        ws.append([])
+
+        # Weekly plan, from the schedule computed at grouping time
+        schedule = grouped_data.get("schedule_1" if concept_key == "concept1" else "schedule_2") or empty_schedule()
+        ws.append(["Focus Group"] + schedule["days"])
+        for cell in ws[ws.max_row]:
+            cell.font = header_font
+            cell.fill = header_fill
+
+        for label, cells in schedule_rows(schedule):
+            ws.append([label] + [", ".join(names) or "No group today for these student" for names in cells])
+
+        # Wrap text
+
+        for row in ws.iter_rows(min_row=2, max_col=6):
+            for cell in row:
+                cell.alignment = Alignment(wrap_text=True)
+
+        # Autofit columns (use helper)
+        autofit_columns(ws)
+
+
+        # Row fills by group
+        for row in ws.iter_rows(min_row=ws.max_row - len(schedule["rows"]) + 1, max_col=6):
+            group_label = row[0].value
+            fill_color = group_colors.get(group_label)
+            if fill_color:
+                for cell in row:
+                    cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
+
+    if summaries:
+        add_summary_sheet(
+            wb, summaries, {str(lesson_1.get("id")): lesson_1["name"], str(lesson_2.get("id")): lesson_2["name"]},
+            header_font, header_fill,
+        )
+
+    return wb
@@ -0,0 +1,212 @@
+# main/utils/preview_codec.py
+"""
+Compact session encoding for the Step 3 preview roster.
+
+Instead of a list of {"name", "score1", "score2", "missing_score1", "missing_score2"}
+dicts, the session stores one names list, each score column packed into a
+base64 array of shorts, and a hex bitmask of missing scores (two bits per
+student). PreviewRoster reads either form and hands views and templates the
+familiar row dicts, built on demand. A roster loaded from (or just saved as) a
+saved Roster also records that roster's (id, version) as its source until it
+is edited, which lets grouping results be cached per roster version.
+
+Grouping and the exports work on StudentScore records instead: one slotted
+object per student with no per-row dict, read straight off the columns.
+"""
+import base64
+import sys
+from array import array
+from dataclasses import dataclass
+
+
+PREVIEW_FORMAT = 1
+SESSION_KEY = "preview_data"
+
+
+def _pack(scores):
+    typecode = "h" if all(-32768 <= s <= 32767 for s in scores) else "q"
+    packed = array(typecode, scores)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return typecode, base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _unpack(typecode, encoded):
+    packed = array(typecode)
+    packed.frombytes(base64.b64decode(encoded))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
+
+
+def _to_int(value):
+    """Scores arrive as ints, numeric strings, or None; None/junk count as missing."""
+    try:
+        return int(value), False
+    except (TypeError, ValueError):
+        return 0, True
+
+
+@dataclass(slots=True)
+class StudentScore:
+    """One student's two scores, as grouping and the exports consume them."""
+
+    name: str
+    score1: int
+    score2: int
+    missing_score1: bool = False
+    missing_score2: bool = False
+
+    @classmethod
+    def from_row(cls, row):
+        score1, bad1 = _to_int(row.get("score1"))
+        score2, bad2 = _to_int(row.get("score2"))
+        return cls(row["name"], score1, score2, row.get("missing_score1", False) or bad1, row.get("missing_score2", False) or bad2)
+
+
+def student_records(rows):
+    """StudentScore records for a PreviewRoster, a list of row dicts (saved rosters, API payloads) or records."""
+    if isinstance(rows, PreviewRoster):
+        return list(rows.records())
+    return [row if isinstance(row, StudentScore) else StudentScore.from_row(row) for row in rows]
+
+
+class PreviewRoster:
+    """Column-oriented preview roster that iterates as row dicts."""
+
+    __slots__ = ("names", "scores1", "scores2", "missing", "source")
+
+    def __init__(self, names=None, scores1=None, scores2=None, missing=0, source=None):
+        self.names = names or []
+        self.scores1 = scores1 or []
+        self.scores2 = scores2 or []
+        self.missing = missing  # bit 2*i = score1 missing, bit 2*i+1 = score2 missing
+        self.source = source  # (roster id, version) while unedited since loading or saving
+
+    @classmethod
+    def from_rows(cls, rows):
+        roster = cls()
+        for row in rows:
+            roster.append(
+                row["name"],
+                row.get("score1"),
+                row.get("score2"),
+                row.get("missing_score1", False),
+                row.get("missing_score2", False),
+            )
+        return roster
+
+    @classmethod
+    def decode(cls, payload):
+        """Builds a roster from a session value: encoded dict, legacy row list, or None."""
+        if isinstance(payload, cls):
+            return payload
+        if not payload:
+            return cls()
+        if isinstance(payload, list):
+            return cls.from_rows(payload)
+        return cls(
+            names=list(payload["names"]),
+            scores1=_unpack(payload["t1"], payload["s1"]),
+            scores2=_unpack(payload["t2"], payload["s2"]),
+            missing=int(payload["m"], 16),
+            source=tuple(payload["src"]) if payload.get("src") else None,
+        )
+
+    def encode(self):
+        t1, s1 = _pack(self.scores1)
+        t2, s2 = _pack(self.scores2)
+        encoded = {"v": PREVIEW_FORMAT, "names": self.names, "t1": t1, "s1": s1, "t2": t2, "s2": s2, "m": format(self.missing, "x")}
+        if self.source:
+            encoded["src"] = list(self.source)
+        return encoded
+
+    def append(self, name, score1, score2, missing_score1=False, missing_score2=False):
+        score1, bad1 = _to_int(score1)
+        score2, bad2 = _to_int(score2)
+        self.source = None
+        self.names.append(name)
+        self.scores1.append(score1)
+        self.scores2.append(score2)
+        self._set_missing(len(self.names) - 1, missing_score1 or bad1, missing_score2 or bad2)
+
+    def update(self, index, name=None, score1=None, score2=None):
+        """Edits one row in place; a submitted score clears that score's missing flag."""
+        self.source = None
+        if name:
+            self.names[index] = name
+        missing1 = bool(self.missing >> (2 * index) & 1)
+        missing2 = bool(self.missing >> (2 * index + 1) & 1)
+        if score1 is not None:
+            self.scores1[index], missing1 = score1, False
+        if score2 is not None:
+            self.scores2[index], missing2 = score2, False
+        self._set_missing(index, missing1, missing2)
+
+    def delete(self, indices):
+        """Removes the rows at the given 0-based indices; later rows move up."""
+        drop = set(indices)
+        if not drop:
+            return
+        self.source = None
+        keep = [i for i in range(len(self.names)) if i not in drop]
+        bits = format(self.missing, "b")[::-1].ljust(2 * len(self.names), "0")
+        self.names = [self.names[i] for i in keep]
+        self.scores1 = [self.scores1[i] for i in keep]
+        self.scores2 = [self.scores2[i] for i in keep]
+        self.missing = int("".join(bits[2 * i:2 * i + 2] for i in keep)[::-1] or "0", 2)
+
+    def _set_missing(self, index, missing1, missing2):
+        self.missing &= ~(0b11 << (2 * index))
+        self.missing |= (int(bool(missing1)) | int(bool(missing2)) << 1) << (2 * index)
+
+    def row(self, index):
+        return {
+            "name": self.names[index],
+            "score1": self.scores1[index],
+            "score2": self.scores2[index],
+            "missing_score1": bool(self.missing >> (2 * index) & 1),
+            "missing_score2": bool(self.missing >> (2 * index + 1) & 1),
+        }
+
+    def to_rows(self):
+        return [self.row(i) for i in range(len(self.names))]
+
+    def records(self):
+        """Yields a StudentScore per student, without building row dicts."""
+        # One pass over the bitmask as text; shifting a roster-sized int per row would be quadratic
+        bits = format(self.missing, "b")[::-1].ljust(2 * len(self.names), "0")
+        for i, (name, score1, score2) in enumerate(zip(self.names, self.scores1, self.scores2)):
+            yield StudentScore(name, score1, score2, bits[2 * i] == "1", bits[2 * i + 1] == "1")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):  # lets Paginator page the roster without building every row
+            return [self.row(i) for i in range(*index.indices(len(self.names)))]
+        if index < 0:
+            index += len(self.names)
+        if not 0 <= index < len(self.names):
+            raise IndexError(index)
+        return self.row(index)
+
+    def __iter__(self):
+        return (self.row(i) for i in range(len(self.names)))
+
+    def __len__(self):
+        return len(self.names)
+
+
+def get_preview(session):
+    """Returns the session's preview roster as a PreviewRoster (empty if none)."""
+    return PreviewRoster.decode(session.get(SESSION_KEY))
+
+
+def set_preview(session, rows, source=None):
+    """
+    Stores rows (a PreviewRoster or list of row dicts) in the session, compactly
+    encoded. source is the (id, version) of the saved Roster the rows are.
+    """
+    roster = rows if isinstance(rows, PreviewRoster) else PreviewRoster.from_rows(rows)
+    if source:
+        roster.source = tuple(source)
+    session[SESSION_KEY] = roster.encode()
+    return roster
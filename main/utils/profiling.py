@@ -0,0 +1,112 @@
+# main/utils/profiling.py
+"""
+Per-request phase timings.
+
+RequestProfilingMiddleware starts a RequestProfile for each request when
+REQUEST_PROFILING is on; code marks the interesting stretches with
+
+    with phase("grouping"):
+        ...
+
+or decorates a function with @timed("lessons"). Timings accumulate per phase
+name and leave as a Server-Timing header plus one structured log line.
+
+With profiling off the middleware removes itself at startup and phase() is a
+single ContextVar lookup, so instrumented code costs nothing measurable. In an
+offload worker process there is no active profile either, so the same
+helpers are safe to call from pool jobs (the parent times the wait instead).
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_current = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """Accumulated milliseconds (and hit counts) per phase for one request."""
+
+    __slots__ = ("started", "phases", "queries", "query_ms")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}  # name -> [total ms, count]
+        self.queries = 0
+        self.query_ms = 0.0
+
+    def add(self, name, ms):
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += ms
+        entry[1] += 1
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """The Server-Timing header value (https://w3c.github.io/server-timing/)."""
+        metrics = [f"{name};dur={ms:.1f}" for name, (ms, _) in self.phases.items()]
+        metrics.append(f'db;dur={self.query_ms:.1f};desc="{self.queries} queries"')
+        metrics.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(metrics)
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total_ms(), 1),
+            "db_queries": self.queries,
+            "db_ms": round(self.query_ms, 1),
+            "phases": {name: round(ms, 1) for name, (ms, _) in self.phases.items()},
+        }
+
+
+def start_profile():
+    """Activates a new profile for the current request; returns (profile, reset token)."""
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop_profile(token):
+    _current.reset(token)
+
+
+def current_profile():
+    return _current.get()
+
+
+@contextmanager
+def phase(name):
+    """Times the enclosed block under name, if a request is being profiled."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name):
+    """Decorator form of phase()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_query(execute, sql, params, many, context):
+    """connection.execute_wrapper hook: counts and times queries for the active profile."""
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.query_ms += (time.perf_counter() - start) * 1000
@@ -0,0 +1,120 @@
+# main/utils/schedule.py
+"""
+Weekly intervention schedule: who meets in which focus group on which day.
+
+compute_schedule() classifies each student once per grouping and returns a
+compact day x tier plan (tier rows, each with its meeting days and member
+names). assign_group stores one plan per concept in grouped_data, and both the
+dashboard's weekly HTML tables and the Excel exports render from it instead of
+re-deriving tiers from scores with their own schedule maps.
+
+The cadence itself (week days, tier -> days, labels, group capacity) comes from
+a compiled config: compile_schedule() turns an InterventionSchedule's settings
+into lookup tables once, so classifying a student is a list index.
+DEFAULT_SCHEDULE is the config used when a teacher has none.
+
+Model-free, so the export builders can use it in an offload worker process.
+"""
+
+DAYS = ("M", "Tu", "W", "Th", "F")
+
+# Focus-group tiers in display order, with the teacher-facing crew names
+TIERS = {
+    "Intensive Reteach": "🚨 Extra Boost Crew",
+    "Reteach": "🔄 Reteach Squad",
+    "Review": "🔍 Quick Checkers",
+    "None": "🌟 Ready to Fly",
+}
+
+# Days each tier meets
+SCHEDULE = {
+    "Intensive Reteach": DAYS,
+    "Reteach": ("M", "W", "F"),
+    "Review": ("Tu", "Th"),
+    "None": (),
+}
+
+
+def get_instruction_group(score, max_points):
+    if max_points == 3:
+        return "Intensive Reteach" if score <= 1 else "Review" if score == 2 else "None"
+    elif max_points == 4:
+        return "Intensive Reteach" if score <= 1 else "Reteach" if score == 2 else "Review" if score == 3 else "None"
+    elif max_points == 5:
+        return "Intensive Reteach" if score <= 1 else "Reteach" if score in [2,3] else "Review" if score == 4 else "None"
+    elif max_points == 6:
+        return "Intensive Reteach" if score <= 1 else "Reteach" if score in [2,3] else "Review" if score in [4,5] else "None"
+    return "Unclassified"
+
+
+def compile_schedule(days=None, tier_days=None, labels=None, group_capacity=None):
+    """
+    Builds the lookup tables compute_schedule() needs from schedule settings.
+    Tier days outside the week are dropped; unknown tiers are ignored.
+    """
+    days = [day for day in DAYS if day in days] if days else list(DAYS)
+    tier_days = {**SCHEDULE, **{k: v for k, v in (tier_days or {}).items() if k in SCHEDULE}}
+    labels = {**TIERS, **{k: v for k, v in (labels or {}).items() if k in TIERS and v}}
+    return {
+        "days": days,
+        "tiers": [(tier, labels[tier], [day for day in days if day in tier_days[tier]]) for tier in TIERS],
+        "capacity": group_capacity or None,
+        # tier_of[max_points][score] -> tier, for every lesson size get_instruction_group knows
+        "tier_of": {
+            max_points: [get_instruction_group(score, max_points) for score in range(max_points + 1)]
+            for max_points in (3, 4, 5, 6)
+        },
+    }
+
+
+DEFAULT_SCHEDULE = compile_schedule()
+
+
+def compute_schedule(students, score_key, max_points, config=None):
+    """
+    Builds the weekly plan for one concept.
+    Returns {"days": [...], "rows": [{"tier", "label", "days", "names"}, ...]};
+    students outside the four tiers (unclassified lessons) are left out, and a
+    tier larger than the config's group capacity is split into numbered groups.
+    """
+    config = config or DEFAULT_SCHEDULE
+    tier_of = config["tier_of"].get(max_points)
+    members = {tier: [] for tier in TIERS}
+    if tier_of:
+        top = len(tier_of) - 1
+        for student in students:
+            if isinstance(student, dict):  # plain rows; a None score leaves the student out
+                name, score = student["name"], student.get(score_key)
+                if score is None:
+                    continue
+            else:  # StudentScore records
+                name, score = student.name, getattr(student, score_key)
+            members[tier_of[min(max(int(score), 0), top)]].append(name)
+
+    capacity = config["capacity"]
+    rows = []
+    for tier, label, days in config["tiers"]:
+        names = members[tier]
+        if not capacity or len(names) <= capacity:
+            rows.append({"tier": tier, "label": label, "days": days, "names": names})
+            continue
+        for n, start in enumerate(range(0, len(names), capacity), 1):
+            rows.append({"tier": tier, "label": f"{label} {n}", "days": days, "names": names[start:start + capacity]})
+
+    return {"days": list(config["days"]), "rows": rows}
+
+
+def schedule_rows(schedule, days=None):
+    """
+    Yields (label, cells) for each tier, where cells holds the names meeting on
+    each of days (default: all of the schedule's days) — the matrix renderers draw.
+    """
+    days = days or schedule["days"]
+    for row in schedule["rows"]:
+        meets = set(row["days"])
+        yield row["label"], [row["names"] if day in meets else [] for day in days]
+
+
+def empty_schedule():
+    """Plan with no members, for grouped_data saved before schedules were stored."""
+    return compute_schedule([], "score1", 0)
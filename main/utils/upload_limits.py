@@ -0,0 +1,91 @@
+# main/utils/upload_limits.py
+"""
+Cheap pre-parse checks for uploaded spreadsheets.
+
+An .xlsx file is a zip archive, so its central directory tells us the sheet
+count and the decompressed XML size, and the <dimension> tag at the top of the
+first worksheet gives the row count — all without building a workbook.
+Oversized files are rejected before pandas/openpyxl touch them; files with too
+many rows are allowed through but parsed with a row cap.
+"""
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from django.conf import settings
+
+
+XLS_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # legacy .xls (OLE2) header
+WORKSHEET_RE = re.compile(r"^xl/worksheets/sheet\d+\.xml$")
+DIMENSION_RE = re.compile(rb'<dimension[^>]*\sref="[A-Z]+\d+(?::[A-Z]+(\d+))?"')
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is too large or not a spreadsheet; the message is teacher-facing."""
+
+
+@dataclass
+class UploadShape:
+    size: int
+    sheets: int = 1
+    rows: int = None  # data rows in the first sheet, if the file declares them
+    max_rows: int = None  # cap to pass to the parser
+    truncated: bool = False
+
+
+def _mb(n):
+    return f"{n / (1024 * 1024):.0f} MB"
+
+
+def inspect_upload(data, max_bytes=None, max_sheets=None, max_rows=None, max_uncompressed=None):
+    """
+    Validates raw upload bytes and returns an UploadShape.
+    Raises UploadRejected for files that are too big, not Excel, have too many
+    sheets, or would decompress to too much XML.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    max_sheets = max_sheets or settings.UPLOAD_MAX_SHEETS
+    max_rows = max_rows or settings.UPLOAD_MAX_ROWS
+    max_uncompressed = max_uncompressed or settings.UPLOAD_MAX_UNCOMPRESSED_BYTES
+
+    shape = UploadShape(size=len(data), max_rows=max_rows)
+    if shape.size > max_bytes:
+        raise UploadRejected(f"File is larger than {_mb(max_bytes)}.")
+
+    if data[:8] == XLS_SIGNATURE:
+        return shape  # legacy .xls: only the byte limit applies
+    if not zipfile.is_zipfile(io.BytesIO(data)):
+        raise UploadRejected("File is not an Excel workbook (.xlsx or .xls).")
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        entries = archive.infolist()
+        if sum(entry.file_size for entry in entries) > max_uncompressed:
+            raise UploadRejected(f"Workbook expands to more than {_mb(max_uncompressed)} of data.")
+
+        sheets = sorted(
+            (entry.filename for entry in entries if WORKSHEET_RE.match(entry.filename)),
+            key=lambda name: int(re.search(r"\d+", name.rsplit("/", 1)[-1]).group()),
+        )
+        shape.sheets = len(sheets)
+        if shape.sheets > max_sheets:
+            raise UploadRejected(f"Workbook has {shape.sheets} sheets; the limit is {max_sheets}.")
+
+        if sheets:
+            with archive.open(sheets[0]) as sheet:
+                match = DIMENSION_RE.search(sheet.read(4096))
+            if match and match.group(1):
+                shape.rows = max(int(match.group(1)) - 1, 0)  # minus the header row
+                shape.truncated = shape.rows > max_rows
+
+    return shape
+
+
+def read_checked_upload(uploaded_file):
+    """
+    Size-checks an UploadedFile before reading it, then inspects its contents.
+    Returns (data, shape); raises UploadRejected.
+    """
+    if uploaded_file.size > settings.UPLOAD_MAX_BYTES:
+        raise UploadRejected(f"File is larger than {_mb(settings.UPLOAD_MAX_BYTES)}.")
+    data = uploaded_file.read()
+    return data, inspect_upload(data)
@@ -1,24 +1,55 @@
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.dateparse import parse_date
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
-from main.utils.export_excel import generate_excel
-from main.models import Student, Roster
+from django.urls import reverse
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_GET, require_POST
+from main.utils.polished_export import (
+    add_group_color_highlighting,
+    autofit_columns,
+    build_export_bytes,
+    generate_excel,
+    sheet_name_with_date,
+)
+from main.utils.analytics_export import build_analytics_bytes
+from main.utils.offload import OffloadBusy, run_offloaded
+from main.utils.parse_excel import MissingColumnsError, parse_roster_dataframe, parse_roster_workbook
+from main.utils.preview_codec import get_preview, set_preview
+from main.utils.profiling import phase, timed
+from main.utils.schedule import empty_schedule, schedule_rows
+from main.utils.upload_limits import UploadRejected, read_checked_upload
+from main.wizard import WizardState, clear_roster_session, lesson_meta
+from main.models import (
+    AssessmentResult,
+    InterventionSchedule,
+    LessonRollup,
+    Roster,
+    StaleVersion,
+    Student,
+    distribution_row,
+    lesson_distribution,
+)
 from .forms import SignUpForm, AddStudentForm
 from main.main_utils import (
     load_ufli_lessons,
-    assign_group,
-    get_instruction_group,
+    lesson_catalog_version,
+    find_lesson,
+    cached_assign_group,
     get_color_class,
 )
-from datetime import datetime
-import io, re, pandas as pd, openpyxl
-from openpyxl import Workbook, load_workbook
+import io, re, json
+from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
-from openpyxl.formatting.rule import FormulaRule
+import logging
+
+logger = logging.getLogger(__name__)
 
 # ---------- Auth Views ----------
 
@@ -54,103 +85,105 @@ def logout_view(request):
 
 # ---------- Dashboard ----------
 
+PREVIEW_PAGE_SIZE = 50
+
+def _preview_diff(post):
+    """
+    The Step 3 edits in a dashboard POST, as
+    {"rows": [{"index", "name", "score1", "score2"}], "deleted": [index, ...], "added": [{...}]}
+    with 1-based row numbers. The page's script sends only changed rows as JSON
+    in roster_diff; without it, the rows on the posted page are read from the
+    name_N/score1_N/score2_N/delete_N inputs. Raises ValueError on a malformed diff.
+    """
+    if post.get("roster_diff"):
+        diff = json.loads(post["roster_diff"])
+        if not isinstance(diff, dict) or not all(isinstance(diff.get(k, []), list) for k in ("rows", "deleted", "added")):
+            raise ValueError("roster_diff must be an object of lists")
+        return diff
+
+    diff = {"rows": [], "deleted": [], "added": []}
+    for key in post:
+        match = re.fullmatch(r"name_(\d+)", key)
+        if not match:
+            continue
+        index = match.group(1)
+        if post.get(f"delete_{index}"):
+            diff["deleted"].append(int(index))
+        else:
+            diff["rows"].append({
+                "index": int(index),
+                "name": post[key],
+                "score1": post.get(f"score1_{index}"),
+                "score2": post.get(f"score2_{index}"),
+            })
+    if post.get("new_name", "").strip():
+        diff["added"].append({"name": post["new_name"], "score1": post.get("new_score1"), "score2": post.get("new_score2")})
+    return diff
+
+def _merge_preview_diff(preview_data, diff):
+    """Applies a _preview_diff to the session roster in place: edits, then deletions, then new rows."""
+    deleted = set()
+    for row in diff.get("rows", []):
+        try:
+            index = int(row["index"]) - 1
+        except (KeyError, ValueError, TypeError):
+            raise ValueError(f"bad row {row!r}")
+        if not 0 <= index < len(preview_data):
+            continue
+        name = str(row.get("name") or "").strip()
+        if not name:  # clearing a name removes the student, as before
+            deleted.add(index)
+            continue
+        preview_data.update(
+            index,
+            name=name,
+            score1=_to_score(row["score1"]) if "score1" in row else None,
+            score2=_to_score(row["score2"]) if "score2" in row else None,
+        )
+    for index in diff.get("deleted", []):
+        try:
+            deleted.add(int(index) - 1)
+        except (ValueError, TypeError):
+            raise ValueError(f"bad deleted row {index!r}")
+    preview_data.delete(deleted)
+
+    for row in diff.get("added", []):
+        if not isinstance(row, dict):
+            raise ValueError(f"bad new row {row!r}")
+        name = str(row.get("name") or "").strip()
+        if name:
+            preview_data.append(name, _to_score(row.get("score1")), _to_score(row.get("score2")))
+    return preview_data
+
+
 @login_required
 def dashboard(request):
     """Displays student data, grouping logic, and lesson metadata."""
 
-    context = {}  # ✅ Define early so it's safe to use below
-
-    # Add static context
+    context = {}  # branch-specific messages; the shared context is built once at the end
+    wizard = WizardState.load(request.session)
     ufli_lessons = load_ufli_lessons()
-    context["ufli_lessons"] = ufli_lessons
-    context["saved_rosters"] = Roster.objects.filter(user=request.user)
-    
-    # Restore Step 1 selections from session
-    
-    if "lesson_1_id" in request.session and "lesson_2_id" in request.session:
-        context["lesson_1_id"] = request.session["lesson_1_id"]
-        context["lesson_2_id"] = request.session["lesson_2_id"]
-        context["lesson_1_name"] = request.session.get("lesson_1_name")
-        context["lesson_2_name"] = request.session.get("lesson_2_name")
-        context["lesson_1_max"] = request.session.get("lesson_1_max")
-        context["lesson_2_max"] = request.session.get("lesson_2_max")
-        context["preview_data"] = request.session.get("preview_data", [])
-        context["student_count"] = request.session.get("student_count", 0)
-        context["entry_mode"] = request.session.get("entry_mode", "")
-        context["groups"] = request.session.get("groups", [])
-
-    # --- Initialize defaults ---
-
-    students = Student.objects.filter(teacher=request.user)
-    student_tags = {s.name: s.tag for s in students}
-    context["student_tags"] = student_tags
 
     # --- Handle POST actions ---
     if request.method == "POST":
 
         # Step 1: Save selected lessons (local message, no redirect)
         if "save_lessons" in request.POST:
-            lesson_1_id = request.POST.get("lesson_1")
-            lesson_2_id = request.POST.get("lesson_2")
-
-            lesson_1 = next((l for l in ufli_lessons if str(l.get("number")) == str(lesson_1_id)), None)
-            lesson_2 = next((l for l in ufli_lessons if str(l.get("number")) == str(lesson_2_id)), None)
+            lesson_1 = find_lesson(ufli_lessons, request.POST.get("lesson_1"))
+            lesson_2 = find_lesson(ufli_lessons, request.POST.get("lesson_2"))
 
             if not lesson_1 or not lesson_2:
                 context["step1_error"] = "❌ Could not find one or both selected lessons."
-
             else:
-                request.session["step1_done"] = True
-                request.session["lesson_1_id"] = str(lesson_1["number"])
-                request.session["lesson_2_id"] = str(lesson_2["number"])
-                request.session["lesson_1_name"] = lesson_1["concept"]
-                request.session["lesson_2_name"] = lesson_2["concept"]
-                request.session["lesson_1_max"] = lesson_1["total_points"]
-                request.session["lesson_2_max"] = lesson_2["total_points"]
-                request.session["lesson_meta"] = {
-                    "lesson_1": {
-                        "id": str(lesson_1["number"]), 
-                        "name": lesson_1["concept"], 
-                        "max": lesson_1["total_points"], 
-                        "full": lesson_1,
-                    },
-                    "lesson_2": {
-                        "id": str(lesson_2["number"]), 
-                        "name": lesson_2["concept"], 
-                        "max": lesson_2["total_points"], 
-                        "full": lesson_2
-                    },
-                }
-                context["lesson_1_id"] = str(lesson_1["number"])
-                context["lesson_2_id"] = str(lesson_2["number"])
-
-                # ✅ Only set success message if both lessons are valid
-                if lesson_1 and lesson_2:
-                    context["step1_success"] = f"✅ Lessons saved: {lesson_1['concept']} and {lesson_2['concept']}."
-
-
-            # Rehydrate context just like in your dashboard view
-            context.update({
-                "step1_done": request.session.get("step1_done", False),
-                "ufli_lessons": ufli_lessons,
-                "lesson_1_id": request.session.get("lesson_1_id"),
-                "lesson_2_id": request.session.get("lesson_2_id"),
-                "lesson_1": lesson_1,
-                "lesson_2": lesson_2,
-                "preview_data": request.session.get("preview_data", []),
-                "entry_mode": request.session.get("entry_mode", "paste"),
-                "grouped_html": request.session.get("grouped_html"),
-                "grouped_data": request.session.get("grouped_data"),
-                "just_grouped": request.session.pop("just_grouped", False),
-                "students": students,
-                "student_tags": student_tags,
-            })
-            return render(request, "main/dashboard.html", context)
-
+                wizard.set_lessons(lesson_1, lesson_2)
+                wizard.complete("step1")
+                request.session["lesson_meta"] = lesson_meta(lesson_1, lesson_2)
+                context["step1_success"] = f"✅ Lessons saved: {lesson_1['concept']} and {lesson_2['concept']}."
 
         # Step 2: Choose entry mode
         elif "entry_mode" in request.POST:
-            request.session["entry_mode"] = request.POST["entry_mode"]
+            wizard.update(entry_mode=request.POST["entry_mode"])
+            wizard.save(request.session)
             return redirect("main:dashboard")
 
         # Step 2a: Paste roster
@@ -162,64 +195,44 @@ def dashboard(request):
             if not preview_data:
                 messages.error(request, "❌ Paste failed: no names found.", extra_tags="step2")
             else:
-                request.session["preview_data"] = preview_data
-                request.session["entry_mode"] = "preview"
-                request.session["student_count"] = len(preview_data)
-                request.session["step2_done"] = True
-                request.session["step3_open"] = True
-
+                set_preview(request.session, preview_data)
+                wizard.update(entry_mode="preview", student_count=len(preview_data))
+                wizard.complete("step2")
                 messages.success(request, f"✅ {len(preview_data)} names processed from paste.", extra_tags="step2")
-  
-            request.session["step2_done"] = True
+
+            wizard.save(request.session)
             return redirect("main:dashboard")
 
         # Step 2b: Upload roster
         elif "process_roster_upload" in request.POST and request.FILES.get("roster_file"):
             try:
-                df = pd.read_excel(request.FILES["roster_file"])
-                df.columns = [str(c).strip().lower().replace(" ", "") for c in df.columns]
-                if not {"name", "score1", "score2"}.issubset(df.columns):
-                    messages.error(request, "❌ Missing required columns: name, score1, score2.")
-                    return redirect("main:dashboard")
-
-                preview_data = []
-                for _, row in df.iterrows():
-                    name = str(row.get("name", "")).strip()
-                    score1 = row.get("score1")
-                    score2 = row.get("score2")
-                    missing_score1 = score1 in (None, "", "nan")
-                    missing_score2 = score2 in (None, "", "nan")
-                    try:
-                        score1 = int(score1) if not missing_score1 else 0
-                    except (ValueError, TypeError):
-                        score1, missing_score1 = 0, True
-                    try:
-                        score2 = int(score2) if not missing_score2 else 0
-                    except (ValueError, TypeError):
-                        score2, missing_score2 = 0, True
-                    if name:
-                        preview_data.append({
-                            "name": name,
-                            "score1": score1,
-                            "score2": score2,
-                            "missing_score1": missing_score1,
-                            "missing_score2": missing_score2,
-                        })
-   
-
-                if not preview_data:
-                    messages.error(request, "❌ Upload failed: no valid rows.", extra_tags="step2")
-                else:
-                    request.session["preview_data"] = preview_data
-                    request.session["student_count"] = len(preview_data)
-                    request.session["entry_mode"] = "upload"
-                    request.session["step2_done"] = True
-                    request.session["step3_open"] = True 
-                    messages.success(request, f"✅ {len(preview_data)} names processed from upload.", extra_tags="step2")
+                data, shape = read_checked_upload(request.FILES["roster_file"])
+            except UploadRejected as e:
+                messages.error(request, f"❌ Upload rejected: {e}", extra_tags="step2")
+                return redirect("main:dashboard")
 
+            try:
+                preview_data = run_offloaded(parse_roster_dataframe, data, shape.max_rows)
+            except OffloadBusy:
+                raise
+            except MissingColumnsError as e:
+                messages.error(request, f"❌ {e}")
+                return redirect("main:dashboard")
             except Exception:
                 messages.error(request, "❌ Upload failed: invalid file.", extra_tags="step2")
+                return redirect("main:dashboard")
 
+            if not preview_data:
+                messages.error(request, "❌ Upload failed: no valid rows.", extra_tags="step2")
+            else:
+                set_preview(request.session, preview_data)
+                wizard.update(entry_mode="upload", student_count=len(preview_data))
+                wizard.complete("step2")
+                messages.success(request, f"✅ {len(preview_data)} names processed from upload.", extra_tags="step2")
+                if shape.truncated:
+                    messages.warning(request, f"⚠️ Only the first {shape.max_rows} rows were loaded.", extra_tags="step2")
+
+            wizard.save(request.session)
             return redirect("main:dashboard")
 
 
@@ -229,16 +242,17 @@ def dashboard(request):
             roster_id = request.POST.get("roster_id")
             try:
                 roster = Roster.objects.get(id=roster_id, user=request.user)
-                request.session["preview_data"] = roster.data
-                request.session["student_count"] = len(roster.data)
-                request.session["step2_done"] = True
-                request.session["step3_open"] = True 
-                request.session["entry_mode"] = "load"
-                request.session["loaded_roster_name"] = roster.name
+                preview_data = set_preview(request.session, roster.data, source=(roster.pk, roster.version))
+                wizard.update(
+                    entry_mode="load", student_count=len(preview_data),
+                    loaded_roster_name=roster.name, loaded_roster_version=roster.version,
+                )
+                wizard.complete("step2")
 
                 messages.success(request, f"✅ Roster '{roster.name}' loaded.", extra_tags="step2c")
             except Roster.DoesNotExist:
                 messages.error(request, "❌ Selected roster not found.", extra_tags="step2c")
+            wizard.save(request.session)
             return redirect("main:dashboard")
 
         elif "delete_roster" in request.POST:
@@ -252,45 +266,14 @@ def dashboard(request):
             return redirect("main:dashboard")
 
 
-        # Step 3: Save scores
+        # Step 3: Save scores (the form posts only edited rows; see _preview_diff)
         elif "save_roster_raw" in request.POST:
-            student_count = request.session.get("student_count", 0)
-            preview_data = []
-
-            # Parse existing student rows
-            for i in range(1, student_count + 1):
-                #skip deleted rows
-                if request.POST.get(f"delete_{i}"):
-                    continue
-                name = request.POST.get(f"name_{i}", "").strip()
-                score1 = request.POST.get(f"score1_{i}", "")
-                score2 = request.POST.get(f"score2_{i}", "")
-                if name:
-                    try:
-                        score1 = int(score1) if score1 else 0
-                    except (ValueError, TypeError):
-                        score1 = 0
-                    try:
-                        score2 = int(score2) if score2 else 0
-                    except (ValueError, TypeError):
-                        score2 = 0
-                    preview_data.append({"name": name, "score1": score1, "score2": score2})
-
-            # Handle new student row
-            new_name = request.POST.get("new_name", "").strip()
-            if new_name:
-                new_score1 = request.POST.get("new_score1") or 0
-                new_score2 = request.POST.get("new_score2") or 0
-                try:
-                    new_score1 = int(new_score1)
-                except (ValueError, TypeError):
-                    new_score1 = 0
-                try:
-                    new_score2 = int(new_score2)
-                except (ValueError, TypeError):
-                    new_score2 = 0
-
-                preview_data.append({"name": new_name, "score1": new_score1, "score2": new_score2})
+            preview_data = get_preview(request.session)
+            try:
+                _merge_preview_diff(preview_data, _preview_diff(request.POST))
+            except ValueError:
+                messages.error(request, "❌ Could not read your roster edits. Please try again.", extra_tags="step3")
+                return redirect("main:dashboard")
 
             roster_name = request.POST.get("roster_name", "").strip()
             
@@ -298,28 +281,27 @@ def dashboard(request):
                 messages.error(request, "❌ Roster name is required.")
                 return redirect("main:dashboard")
 
-            roster = Roster.objects.create(name=roster_name, user=request.user)
-
             if not preview_data:
                 context["upload_error"] = "❌ No valid student names found. Roster not saved."
-            elif not roster_name:
-                context["upload_error"] = "❌ Roster name is required."
             else:
-                Roster.objects.update_or_create(
-                    user=request.user,
-                    name=roster_name,
-                    defaults={"data": preview_data}
-                )
+                expected = wizard.loaded_roster_version if roster_name == wizard.loaded_roster_name else None
+                try:
+                    source = Roster.save_data(request.user, roster_name, preview_data.to_rows(), expected)
+                except StaleVersion:
+                    messages.error(
+                        request,
+                        f"⚠️ Roster '{roster_name}' was changed in another tab after you loaded it, so it was not saved. "
+                        "Load it again, or save your edits under a new name.",
+                        extra_tags="step3",
+                    )
+                    return redirect("main:dashboard")
 
                 # ✅ Mark Step 3 complete and unlock Step 4
-                
                 context["roster_uploaded"] = True
                 context["roster_name"] = roster_name
-                request.session["preview_data"] = preview_data
-                request.session["student_count"] = len(preview_data)
-                request.session["loaded_roster_name"] = roster.name
-                request.session["step3_done"] = True  # ✅ Add this inside the final else block
-                request.session["step4_open"] = True
+                set_preview(request.session, preview_data, source=source)
+                wizard.update(student_count=len(preview_data), loaded_roster_name=roster_name, loaded_roster_version=source[1])
+                wizard.complete("step3")
 
                 messages.success(
                     request,
@@ -327,227 +309,282 @@ def dashboard(request):
                     extra_tags="step3"
                 )
 
-            # Update context for rendering
-
-            context.update({
-                "step1_done": request.session.get("step1_done", False),
-                "ufli_lessons": ufli_lessons,
-                "lesson_1_id": request.session.get("lesson_1_id"),
-                "lesson_2_id": request.session.get("lesson_2_id"),
-                "lesson_1": next((l for l in ufli_lessons if str(l.get("number")) == str(request.session.get("lesson_1_id"))), None),
-                "lesson_2": next((l for l in ufli_lessons if str(l.get("number")) == str(request.session.get("lesson_2_id"))), None),
-                "preview_data": preview_data,
-                "entry_mode": request.session.get("entry_mode", "paste"),
-                "grouped_html": request.session.get("grouped_html"),
-                "grouped_data": request.session.get("grouped_data"),
-                "just_grouped": request.session.pop("just_grouped", False),
-                "students": students,
-                "student_tags": student_tags,
-                "loaded_roster_name": request.session.get("loaded_roster_name"),
-                "step3_done": request.session.get("step3_done", False),
-                "step4_open": request.session.get("step4_open", False),
-            })
-
-
-            messages.success(
-                request,
-                f"✅ Roster '{roster_name}' saved with {len(preview_data)} students.",
-                extra_tags="step3"
-            )
-            return render(request, "main/dashboard.html", context)
+        # Step 3: Change preview page, keeping this page's edits
+        elif "preview_page" in request.POST:
+            preview_data = get_preview(request.session)
+            try:
+                _merge_preview_diff(preview_data, _preview_diff(request.POST))
+            except ValueError:
+                messages.error(request, "❌ Could not read your roster edits. Please try again.", extra_tags="step3")
+                return redirect("main:dashboard")
+            set_preview(request.session, preview_data)
+            wizard.update(student_count=len(preview_data))
+            wizard.save(request.session)
+            return redirect(f"{reverse('main:dashboard')}?page={_to_score(request.POST['preview_page']) or 1}#step3")
 
 
         # Step 4: Sort2Support
         elif "sort2support" in request.POST:
-            lesson_1_id = request.POST.get("lesson_1")
-            lesson_2_id = request.POST.get("lesson_2")
-            lesson_1 = next((l for l in ufli_lessons if str(l.get("number")) == lesson_1_id), None)
-            lesson_2 = next((l for l in ufli_lessons if str(l.get("number")) == lesson_2_id), None)
-            preview_data = request.session.get("preview_data", [])
+            lesson_1 = find_lesson(ufli_lessons, request.POST.get("lesson_1"))
+            lesson_2 = find_lesson(ufli_lessons, request.POST.get("lesson_2"))
+            preview_data = get_preview(request.session)
 
             if not lesson_1 or not lesson_2 or not preview_data:
                 context["group_error"] = "❌ Missing data for export. Please group students with Sort2Support in Step 4 first."
-                return render(request, "main/dashboard.html", context)
-
-            grouped_html, grouped_data = assign_group(preview_data, lesson_1, lesson_2, student_tags)
-
-            request.session["grouped_daily"] = grouped_data["daily"]
-            request.session["grouped_data"] = grouped_data
-            request.session["grouped_html"] = grouped_html
-            request.session["just_grouped"] = True
-
-            request.session["lesson_meta"] = {
-                "lesson_1": {
-                    "id": str(lesson_1["number"]),
-                    "name": lesson_1["concept"],
-                    "max": lesson_1["total_points"],
-                    "full": lesson_1,
-                },
-                "lesson_2": {
-                    "id": str(lesson_2["number"]),
-                    "name": lesson_2["concept"],
-                    "max": lesson_2["total_points"],
-                    "full": lesson_2,
-                }
-            }
-            messages.success(request, "✅ Students grouped successfully.", extra_tags="step4")
-
-            context["group_success"] = f"✅ Students grouped for {lesson_1['concept']} and {lesson_2['concept']}."
-            context.update({
-                "step1_done": request.session.get("step1_done", False),
-                "ufli_lessons": ufli_lessons,
-                "lesson_1": lesson_1,
-                "lesson_2": lesson_2,
-                "lesson_1_id": lesson_1_id,
-                "lesson_2_id": lesson_2_id,
-                "preview_data": preview_data,
-                "entry_mode": request.session.get("entry_mode", "paste"),
-                "grouped_html": grouped_html,
-                "grouped_data": grouped_data,
-                "just_grouped": True,
-                "students": students,
-                "student_tags": student_tags,
-            })
+            else:
+                student_tags = {s.name: getattr(s, "tag", None) for s in Student.objects.filter(teacher=request.user)}
+                grouped_html, grouped_data = cached_assign_group(
+                    preview_data, lesson_1, lesson_2, student_tags, InterventionSchedule.compiled_for(request.user)
+                )
 
+                request.session["grouped_data"] = grouped_data
+                request.session["grouped_html"] = grouped_html
+                request.session["lesson_meta"] = lesson_meta(lesson_1, lesson_2)
+                AssessmentResult.record_grouping(request.user, preview_data, lesson_1, lesson_2)
+                wizard.set_lessons(lesson_1, lesson_2)
+                wizard.update(just_grouped=True)
+                wizard.complete("step4")
 
-            return render(request, "main/dashboard.html", context)
+                messages.success(request, "✅ Students grouped successfully.", extra_tags="step4")
+                context["group_success"] = f"✅ Students grouped for {lesson_1['concept']} and {lesson_2['concept']}."
 
         # Step 5: Finalize grouped data
 
         elif "finalize_groups" in request.POST:
-            grouped_data = request.session.get("grouped_data")
-            grouped_html = request.session.get("grouped_html")
-            lesson_meta = request.session.get("lesson_meta", {})
-            preview_data = request.session.get("preview_data", [])
-
-            if not grouped_data or not grouped_html or not lesson_meta:
+            if not request.session.get("grouped_data") or not request.session.get("grouped_html") \
+                    or not request.session.get("lesson_meta"):
                 messages.error(request, "❌ Grouped data missing. Please complete Step 4 first.", extra_tags="step5")
-                return render(request, "main/dashboard.html", context)
-
-            # Mark Step 5 complete
-            request.session["step5_done"] = True
-            request.session["step5_open"] = True
-            request.session["just_finalized"] = True
-
-            messages.success(request, "✅ Groups finalized and ready for export.", extra_tags="step5")
-
-            context.update({
-                "grouped_data": grouped_data,
-                "grouped_html": grouped_html,
-                "lesson_meta": lesson_meta,
-                "preview_data": preview_data,
-                "step5_done": True,
-                "step5_open": True,
-                "just_finalized": True,
-            })
-
-            return render(request, "main/dashboard.html", context)
+            else:
+                wizard.update(just_finalized=True)
+                wizard.complete("step5")
+                messages.success(request, "✅ Groups finalized and ready for export.", extra_tags="step5")
             
 
-    # --- After POST handling, hydrate context for GET render ---
-    lesson_1_id = request.session.get("lesson_1_id")
-    lesson_2_id = request.session.get("lesson_2_id")
-    lesson_1 = next((l for l in ufli_lessons if str(l.get("number")) == str(lesson_1_id)), None)
-    lesson_2 = next((l for l in ufli_lessons if str(l.get("number")) == str(lesson_2_id)), None)
+    # --- Hydrate the shared context (GET, and POST branches that render in place) ---
+    lesson_1 = find_lesson(ufli_lessons, wizard.lesson_1_id)
+    lesson_2 = find_lesson(ufli_lessons, wizard.lesson_2_id)
 
     grouped_data = request.session.get("grouped_data")
-    grouped_html = request.session.get("grouped_html")
-    lesson_meta = request.session.get("lesson_meta", {})
-    just_grouped = request.session.pop("just_grouped", False)
-    just_finalized = request.session.pop("just_finalized", False)
-
-    entry_mode = request.POST.get("entry_mode") or request.session.get("entry_mode", "paste")
-    request.session["entry_mode"] = entry_mode
-    preview_data = request.session.get("preview_data", [])
-
-    # --- Validate grouped_data ---
     if not isinstance(grouped_data, dict):
-        print(f"grouped_data is None or invalid: {grouped_data}")
         grouped_data = {}
 
-    # --- Step tracking ---  
-    step1_done = request.session.get("step1_done", False)
-    step2_done = request.session.get("step2_done", False)
-    step3_done = request.session.get("step3_done", False)
-    step4_done = request.session.get("step4_done", False)
-    step5_done = request.session.get("step5_done", False)
-    step5_open = request.session.get("step5_open", False)
-
-    # --- Determine current step ---
-
-    if not step1_done:
-        current_step = "step1"
-    elif not step2_done:
-        current_step = "step2"
-    elif not step3_done:
-        current_step = "step3"
-    elif not step4_done:
-        current_step = "step4"
-    elif not step5_done:
-        current_step = "step5"
-    else:
-        current_step = "complete"
-
-
-    # --- Build final context ---
+    preview_data = get_preview(request.session)
 
+    context.update(wizard.context())
     context.update({
-        "groups1": grouped_data.get("concept1", {}),
-        "groups2": grouped_data.get("concept2", {}),
-        "concept1_name": lesson_1["name"] if lesson_1 and "name" in lesson_1 else "Concept 1",
-        "concept2_name": lesson_2["name"] if lesson_2 and "name" in lesson_2 else "Concept 2",
         "ufli_lessons": ufli_lessons,
+        "saved_rosters": Roster.objects.filter(user=request.user),  # lazy: only runs on a fragment cache miss
+        "catalog_version": lesson_catalog_version(),
+        "rosters_version": Roster.cache_version(request.user.pk),
         "lesson_1": lesson_1,
         "lesson_2": lesson_2,
-        "lesson_1_id": lesson_1_id,
-        "lesson_2_id": lesson_2_id,
         "preview_data": preview_data,
-        "entry_mode": entry_mode,
-        "grouped_html": grouped_html,
+        "preview_page": Paginator(preview_data, PREVIEW_PAGE_SIZE).get_page(request.GET.get("page")),
+        "groups1": grouped_data.get("concept1", {}),
+        "groups2": grouped_data.get("concept2", {}),
+        "concept1_name": lesson_1["concept"] if lesson_1 else "Concept 1",
+        "concept2_name": lesson_2["concept"] if lesson_2 else "Concept 2",
+        "grouped_html": request.session.get("grouped_html"),
         "grouped_data": grouped_data,
-        "just_grouped": just_grouped,
-        "students": students,
-        "student_tags": student_tags,
-        "step1_done": step1_done,
-        "step2_done": step2_done,
-        "step3_done": step3_done,
-        "step4_done": step4_done,
-        "step5_done": step5_done,
-        "step5_open": step5_open,
-        "current_step": current_step,
+        "just_grouped": wizard.pop("just_grouped"),
+        "just_finalized": wizard.pop("just_finalized"),
     })
 
+    wizard.save(request.session)
+    with phase("render"):
+        return render(request, "main/dashboard.html", context)
+
+
+
+# ---------- JSON API ----------
+# Lightweight endpoints used by the dashboard to regroup and save scores in place,
+# without the full POST → redirect → render round-trip of the five-step page.
+
+def _json_payload(request):
+    """Returns the request body as a dict, accepting JSON or form-encoded posts."""
+    if request.content_type == "application/json":
+        try:
+            payload = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        return payload if isinstance(payload, dict) else None
+    return request.POST.dict()
+
+def _to_score(value):
+    """Coerces a submitted score to int, treating blanks and junk as 0."""
+    try:
+        return int(value) if value not in (None, "") else 0
+    except (ValueError, TypeError):
+        return 0
+
+@timed("render")
+def _grouped_fragment(request, grouped_data, lesson_1, lesson_2):
+    """Renders the concept tables partial for in-place replacement on the page."""
+    return render_to_string("main/_grouped_tables.html", {
+        "groups1": grouped_data.get("concept1", {}),
+        "groups2": grouped_data.get("concept2", {}),
+        "concept1_name": lesson_1["concept"] if lesson_1 else "Concept 1",
+        "concept2_name": lesson_2["concept"] if lesson_2 else "Concept 2",
+        "lesson_1": lesson_1,
+        "lesson_2": lesson_2,
+    }, request=request)
 
-   
-    # Optional: saved rosters list
-    # context["saved_rosters"] = Roster.objects.filter(user=request.user).order_by("-created_at")
+@login_required
+@require_GET
+def api_preview(request):
+    """Returns the current preview roster and selected lessons as JSON."""
+    preview_data = get_preview(request.session)
+    wizard = WizardState.load(request.session)
+    return JsonResponse({
+        "ok": True,
+        "lesson_1_id": wizard.lesson_1_id,
+        "lesson_2_id": wizard.lesson_2_id,
+        "lesson_1_max": wizard.lesson_1_max,
+        "lesson_2_max": wizard.lesson_2_max,
+        "student_count": len(preview_data),
+        "students": preview_data.to_rows(),
+    })
 
-    # Clear any one-time flags
-    request.session.pop("step2_open", None)
+@login_required
+@require_POST
+def api_save_scores(request):
+    """
+    Updates only the submitted preview rows.
+    Expects {"rows": [{"index": 1, "name": ..., "score1": ..., "score2": ...}]},
+    where index is the 1-based row number shown in the Step 3 table.
+    """
+    payload = _json_payload(request)
+    if payload is None or not isinstance(payload.get("rows"), list):
+        return JsonResponse({"ok": False, "error": "❌ Expected a JSON body with a 'rows' list."}, status=400)
+
+    preview_data = get_preview(request.session)
+    updated = []
+    for row in payload["rows"]:
+        try:
+            index = int(row.get("index")) - 1
+        except (AttributeError, ValueError, TypeError):
+            continue
+        if not 0 <= index < len(preview_data):
+            continue
 
-    return render(request, "main/dashboard.html", context)
+        preview_data.update(
+            index,
+            name=str(row.get("name") or "").strip(),
+            score1=_to_score(row["score1"]) if "score1" in row else None,
+            score2=_to_score(row["score2"]) if "score2" in row else None,
+        )
+        updated.append({"index": index + 1, **preview_data[index]})
+
+    if updated:
+        set_preview(request.session, preview_data)
+
+    return JsonResponse({"ok": True, "updated": updated, "student_count": len(preview_data)})
+
+@login_required
+@require_POST
+def api_group(request):
+    """Runs Sort2Support grouping on the session roster and returns the refreshed tables."""
+    payload = _json_payload(request) or {}
+    wizard = WizardState.load(request.session)
+    lesson_1_id = payload.get("lesson_1") or wizard.lesson_1_id
+    lesson_2_id = payload.get("lesson_2") or wizard.lesson_2_id
+
+    ufli_lessons = load_ufli_lessons()
+    lesson_1 = find_lesson(ufli_lessons, lesson_1_id)
+    lesson_2 = find_lesson(ufli_lessons, lesson_2_id)
+    preview_data = get_preview(request.session)
+
+    if not lesson_1 or not lesson_2 or not preview_data:
+        return JsonResponse({
+            "ok": False,
+            "error": "❌ Missing data for grouping. Please select lessons and add students first.",
+        }, status=400)
+
+    student_tags = {s.name: getattr(s, "tag", None) for s in Student.objects.filter(teacher=request.user)}
+    grouped_html, grouped_data = cached_assign_group(
+        preview_data, lesson_1, lesson_2, student_tags, InterventionSchedule.compiled_for(request.user)
+    )
+
+    request.session["grouped_data"] = grouped_data
+    request.session["grouped_html"] = grouped_html
+    request.session["lesson_meta"] = lesson_meta(lesson_1, lesson_2)
+    AssessmentResult.record_grouping(request.user, preview_data, lesson_1, lesson_2)
+    wizard.set_lessons(lesson_1, lesson_2)
+    wizard.complete("step4")
+    wizard.save(request.session)
+
+    return JsonResponse({
+        "ok": True,
+        "message": f"✅ Students grouped for {lesson_1['concept']} and {lesson_2['concept']}.",
+        "daily": grouped_data["daily"],
+        "fragment": _grouped_fragment(request, grouped_data, lesson_1, lesson_2),
+    })
+
+
+# ---------- Staff analytics ----------
+
+ANALYTICS_PAGE_SIZE = 50
+ANALYTICS_CACHE_SECONDS = 300
+
+@staff_member_required
+@require_GET
+def staff_analytics(request):
+    """
+    Band and tier distribution per lesson across all teachers.
+    ?since=YYYY-MM-DD&until=YYYY-MM-DD filter by assessment date; ?page=N pages
+    the JSON; ?format=xlsx downloads every lesson as a workbook. Results are
+    cached until the next grouping records new scores.
+    """
+    since = parse_date(request.GET.get("since") or "")
+    until = parse_date(request.GET.get("until") or "")
+    export = request.GET.get("format") == "xlsx"
+    page_number = request.GET.get("page") or 1
+
+    version = cache.get_or_set(AssessmentResult.CACHE_VERSION_KEY, 1, None)
+    key = f"staff_analytics:{version}:{since}:{until}:{'xlsx' if export else page_number}"
+    cached = cache.get(key)
+
+    if export:
+        if cached is None:
+            rows = [distribution_row(row) for row in lesson_distribution(since, until)]
+            lesson_names = {str(lesson["number"]): lesson["concept"] for lesson in load_ufli_lessons()}
+            cached = run_offloaded(build_analytics_bytes, rows, lesson_names)
+            cache.set(key, cached, ANALYTICS_CACHE_SECONDS)
+        response = HttpResponse(cached, content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        response["Content-Disposition"] = 'attachment; filename="lesson_distribution.xlsx"'
+        return response
+
+    if cached is None:
+        page = Paginator(lesson_distribution(since, until), ANALYTICS_PAGE_SIZE).get_page(page_number)
+        cached = {
+            "ok": True,
+            "page": page.number,
+            "num_pages": page.paginator.num_pages,
+            "lesson_count": page.paginator.count,
+            "lessons": [distribution_row(row) for row in page],
+        }
+        cache.set(key, cached, ANALYTICS_CACHE_SECONDS)
+    return JsonResponse(cached)
 
 
 # ---------- Upload / Reset ----------
 @login_required
 def upload_page(request):
     if request.method == "POST" and request.FILES.get("file"):
-        wb = openpyxl.load_workbook(request.FILES["file"])
-        sheet = wb.active
-
-        preview_data = []
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            name, score1, score2 = row[:3]
-            if name:
-                preview_data.append({
-                    "name": str(name).strip(),
-                    "score1": int(score1) if score1 else 0,
-                    "score2": int(score2) if score2 else 0,
-
-                })
-
-        request.session["preview_data"] = preview_data
-        request.session["entry_mode"] = "preview"
+        try:
+            data, shape = read_checked_upload(request.FILES["file"])
+        except UploadRejected as e:
+            messages.error(request, f"❌ Upload rejected: {e}")
+            return redirect("main:dashboard")
+
+        preview_data = run_offloaded(parse_roster_workbook, data, shape.max_rows)
+        if shape.truncated:
+            messages.warning(request, f"⚠️ Only the first {shape.max_rows} rows were loaded.")
+
+        set_preview(request.session, preview_data)
+        wizard = WizardState.load(request.session)
+        wizard.update(entry_mode="preview", student_count=len(preview_data))
+        wizard.save(request.session)
         return redirect("main:dashboard")
 
     return render(request, "main/dashboard.html")
@@ -608,23 +645,22 @@ def download_template(request):
 def load_previous_roster(request):
     last_roster = Roster.objects.filter(user=request.user).order_by("-created_at").first()
     if last_roster:
-        request.session["preview_data"] = last_roster.data
-        request.session["student_count"] = len(last_roster.data)
-        request.session["just_loaded"] = True
+        preview_data = set_preview(request.session, last_roster.data, source=(last_roster.pk, last_roster.version))
+        wizard = WizardState.load(request.session)
+        wizard.update(
+            student_count=len(preview_data), just_loaded=True,
+            loaded_roster_name=last_roster.name, loaded_roster_version=last_roster.version,
+        )
+        wizard.save(request.session)
     return redirect("main:dashboard")  
 
 @login_required
 def reset_saved_scores(request):
     """Clears all student scores but preserves names, and clears preview/grouped session data."""
-    students = Student.objects.filter(teacher=request.user)
-    for s in students:
-        s.ufli_score_1 = None
-        s.ufli_score_2 = None
-        s.save()
+    Student.reset_scores([request.user.pk])
 
     # Clear any preview/grouped session data so the dashboard refreshes cleanly
-    for key in ["preview_data", "grouped_html", "grouped_data"]:
-        request.session.pop(key, None)
+    clear_roster_session(request.session)
 
     messages.success(request, "🧹 All scores cleared, but student names remain.")
     return redirect("main:dashboard")
@@ -635,56 +671,13 @@ def reset_class(request):
     Student.objects.filter(teacher=request.user).delete()
 
     # Clear any preview/grouped session data so the dashboard refreshes cleanly
-    
-    for key in ["preview_data", "grouped_html", "grouped_data"]:
-        request.session.pop(key, None)
-        request.session.pop("grouped_data", None)
-        request.session.pop("grouped_html", None)
-        request.session.pop("lesson_meta", None)
-        request.session.pop("step4_done", None)
-        request.session.pop("step5_done", None)
-        request.session.pop("step4_open", None)
-        request.session.pop("step5_open", None)
+    clear_roster_session(request.session, "lesson_meta")
 
     messages.success(request, "🔄 Entire class reset successfully.")
     return redirect("main:dashboard")
 
 # ---------- Export Logic ----------
 
-def sheet_name_with_date(title: str) -> str:
-    """
-    Sanitize a string for use as an Excel sheet name, always appending today's date.
-    - Removes invalid Excel characters
-    - Appends YYYY-MM-DD
-    - Truncates to 31 characters (Excel limit)
-    """
-    # Remove invalid Excel characters
-    safe = re.sub(r'[:\\/*?\[\]]', '-', title).strip()
-
-    # Append today's date
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    safe = f"{safe} {today_str}"
-
-    # Excel sheet names max length = 31
-    if len(safe) > 31:
-        safe = safe[:28] + "..."
-
-    return safe
-
-def autofit_columns(ws):
-    """Resize each column in a worksheet to fit its longest value."""
-    for i, col in enumerate(ws.columns, 1):  # i is the column index
-        max_length = 0
-        col_letter = get_column_letter(i)
-        for cell in col:
-            try:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            except Exception:
-                pass
-        adjusted_width = max_length + 2
-        ws.column_dimensions[col_letter].width = adjusted_width
-
 def style_header_row(ws, row_num: int = 1):
     """Style a header row with bold font, background color, and centered text."""
     header_font = Font(name="Comic Sans MS", bold=True, size=12, color="FFFFFF")
@@ -714,15 +707,14 @@ def get_fill(score):
 def export_grouped_excel(request):
 
     # Pull lesson metadata from session
-    lesson_1_name = request.session.get("lesson_1_name", "Concept 1")
-    lesson_2_name = request.session.get("lesson_2_name", "Concept 2")
+    wizard = WizardState.load(request.session)
+    lesson_1_name = wizard.lesson_1_name or "Concept 1"
+    lesson_2_name = wizard.lesson_2_name or "Concept 2"
 
-    print("✅ Export view triggered")
-    
     # grouped_data = request.session.get("grouped_data")
 
-    daily_data = request.session.get("grouped_daily", [])
     grouped_data = request.session.get("grouped_data", {})
+    daily_data = request.session.get("grouped_daily") or grouped_data.get("daily", [])  # grouped_daily: older sessions
 
     if not grouped_data or not daily_data:
         messages.error(
@@ -731,9 +723,7 @@ def export_grouped_excel(request):
         )
         return redirect("main:dashboard")
 
-    print("✅ lesson_1_name:", lesson_1_name)
-    print("✅ lesson_2_name:", lesson_2_name)
-    print("✅ daily_data:", list(grouped_data.keys()) if grouped_data else "❌ grouped_data missing")
+    logger.debug("Weekly plan export: %s / %s, grouped_data keys %s", lesson_1_name, lesson_2_name, grouped_data.keys())
 
 
     if not grouped_data or not daily_data:
@@ -747,10 +737,8 @@ def export_grouped_excel(request):
     wb = Workbook()
     wb.remove(wb.active)   # Remove default sheet
 
-    print("✅ Workbook built with sheets:", wb.sheetnames)
-
     # ✅ Sheet 1: Daily Summary
-    summary = wb.create_sheet(title="Assessment: Grouping Assignments")
+    summary = wb.create_sheet(title="Assessment - Grouping")
     summary.append([
         "Student", 
         f"Group 1 ({lesson_1_name})", 
@@ -798,80 +786,17 @@ def export_grouped_excel(request):
 
 
     # ✅ Sheet 4: Weekly Plan
+    schedule = grouped_data.get("schedule_1") or empty_schedule()
     weekly_sheet = wb.create_sheet(title="Weekly Plan")
-    weekly_sheet.append(["Focus Group", "Tu", "W", "Th", "F"])
+    weekly_sheet.append(["Focus Group"] + schedule["days"])
     style_header_row(weekly_sheet)
 
-    # Build table_data
-    day_order = ["Tu", "W", "Th", "F"]
-    schedule_map = {
-        "Intensive Reteach": ["M", "Tu", "W", "F"],
-        "Reteach": ["M", "W", "F"],
-        "Review": ["Tu", "Th"],
-        "None": [],
-        "Missing": [],
-        "Unclassified": []
-    }
-    categories = {
-        "Intensive Reteach": "🚨 Extra Boost Crew",
-        "Reteach": "🔄 Reteach Squad",
-        "Review": "🔍 Quick Checkers",
-        "None": "🌟 Ready to Fly"
-    }
-
-    table_data = {cat: {day: [] for day in day_order} for cat in categories}
-    score_key = "score1"  # or "score2" depending on context
-    max_points = request.session.get("lesson_1_max", 5)
-
-    for tag in grouped_data.get("tags", []):
-        name = tag.get("name")
-        score = tag.get(score_key)
-        if name is None or score is None:
-            continue
-        group = get_instruction_group(score, max_points)
-        for day in schedule_map.get(group, []):
-            if day in table_data[group]:
-                table_data[group][day].append(name)
-
-    # Append rows
-    for group_key, label in categories.items():
-        row = [label]
-        for day in day_order:
-            names = ", ".join(table_data[group_key][day]) or "No group today—"
-            row.append(names)
-        weekly_sheet.append(row)
+    for label, cells in schedule_rows(schedule):
+        weekly_sheet.append([label] + [", ".join(names) or "No group today—" for names in cells])
 
     autofit_columns(weekly_sheet)
 
 
-def add_group_color_highlighting(ws, start_row=2, last_col="C", group_col="A"):
-    """
-    Highlight entire rows based on whether the group label in group_col
-    contains 'Red', 'Yellow', 'Green', or 'Blue'.
-    The range automatically extends to ws.max_row.
-    """
-
-    end_row = ws.max_row  # dynamically detect last row with data
-    
-    ws.freeze_panes = "A2"
-
-    colors = {
-        "Red":    "F4CCCC",  # light red
-        "Yellow": "FFF2CC",  # light yellow
-        "Green":  "D9EAD3",  # light green
-        "Blue":   "CFE2F3",  # light blue
-    }
-
-    for keyword, hex_color in colors.items():
-        fill = PatternFill(start_color=hex_color, end_color=hex_color, fill_type="solid")
-        # Formula: look for the keyword anywhere in the group label column
-        formula = f'ISNUMBER(SEARCH("{keyword}",${group_col} & ROW()))'
-        ws.conditional_formatting.add(
-            f"A{start_row}:{last_col}{end_row}",
-            FormulaRule(formula=[formula], fill=fill)
-        )
-
-
 #        sheet_title = lesson_names.get(concept_key, concept_key)
 #        ws = wb.create_sheet(title=sheet_title)
 #        ws.append(["Group", "Name", "Score"])
@@ -896,32 +821,68 @@ def add_group_color_highlighting(ws, start_row=2, last_col="C", group_col="A"):
 
 
 # ---------- Excel Templates  ----------
-@login_required
-def update_scores(request):
-    """Updates student scores from dashboard form submission."""
-    if request.method == "POST":
-        students = Student.objects.filter(teacher=request.user)
-        for student in students:
-            score_1 = request.POST.get(f"score_1_{student.id}", None)
-            score_2 = request.POST.get(f"score_2_{student.id}", None)
-
-            score_1 = score_1 if score_1 != "" else None
-            score_2 = score_2 if score_2 != "" else None
+def _optional_score(value):
+    """Coerces a submitted score to int, treating blanks and junk as no score (None)."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
 
-            if score_1 is not None:
-                try:
-                    student.ufli_score_1 = int(score_1)
-                except ValueError:
-                    student.ufli_score_1 = None
-            if score_2 is not None:
-                try:
-                    student.ufli_score_2 = int(score_2)
-                except ValueError:
-                    student.ufli_score_2 = None
+def _score_changes(request):
+    """
+    {student id: change} for Student.apply_score_changes, from only the students
+    in the post. JSON: {"students": [{"id", "score1", "score2", "version"}]};
+    form: score_1_<id>/score_2_<id>/version_<id>, where a blank score is left
+    as is. Students without a readable version are skipped.
+    """
+    changes = {}
+    if request.content_type == "application/json":
+        payload = _json_payload(request) or {}
+        for entry in payload.get("students") or []:
+            try:
+                pk, version = int(entry["id"]), int(entry["version"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            changes[pk] = {"version": version}
+            for key, field in (("score1", "ufli_score_1"), ("score2", "ufli_score_2")):
+                if key in entry:
+                    changes[pk][field] = _optional_score(entry[key])
+        return changes
+
+    for key, value in request.POST.items():
+        match = re.fullmatch(r"version_(\d+)", key)
+        if not match or not value.isdigit():
+            continue
+        pk = int(match.group(1))
+        changes[pk] = {"version": int(value)}
+        for n, field in ((1, "ufli_score_1"), (2, "ufli_score_2")):
+            score = request.POST.get(f"score_{n}_{pk}", "")
+            if score != "":
+                changes[pk][field] = _optional_score(score)
+    return changes
 
-            student.save()
+@login_required
+def update_scores(request):
+    """
+    Saves scores for only the students posted (the client sends changed rows),
+    in one UPDATE guarded by the version each row was loaded with.
+    JSON posts get back the new version of each saved student and the
+    current one of each student that was changed elsewhere first.
+    """
+    if request.method != "POST":
+        return redirect("main:dashboard")
 
-        messages.success(request, "✅ Scores updated successfully.")
+    saved, conflicts = Student.apply_score_changes(request.user, _score_changes(request))
+    if request.content_type == "application/json":
+        return JsonResponse({
+            "ok": True,
+            "updated": saved,
+            "conflicts": conflicts,
+        })
+
+    messages.success(request, f"✅ Scores updated for {len(saved)} students.")
+    if conflicts:
+        messages.warning(request, f"⚠️ {len(conflicts)} students were changed elsewhere and not saved. Reload to see their latest scores.")
     return redirect("main:dashboard")
 
 
@@ -932,6 +893,10 @@ def update_scores(request):
 #    wb.save(response)
 #    return response
 
+def _export_summaries(user, lesson_1, lesson_2):
+    """Latest class rollups for the two exported lessons."""
+    return LessonRollup.latest_summaries(user, [lesson["id"] for lesson in (lesson_1, lesson_2) if lesson.get("id")])
+
 @login_required
 def generate_excel_view(request):
     grouped_data = request.session.get("grouped_data", {})
@@ -941,9 +906,8 @@ def generate_excel_view(request):
     lesson_1 = lesson_meta.get("lesson_1", {})
     lesson_2 = lesson_meta.get("lesson_2", {})
 
-    print("✅ lesson_1:", lesson_1)
-    print("✅ lesson_2:", lesson_2)
-    print("✅ grouped_data keys:", list(grouped_data.keys()) if grouped_data else "None")
+    logger.debug("Export: lesson_1=%s lesson_2=%s grouped_data keys %s",
+                 lesson_1.get("id"), lesson_2.get("id"), grouped_data.keys())
 
     if not grouped_data or not lesson_1 or not lesson_2:
         messages.error(request, "Missing data for export. Please click Sort2Support first.")
@@ -954,262 +918,94 @@ def generate_excel_view(request):
     max1 = lesson_1.get("max")
     max2 = lesson_2.get("max")
 
-    print("✅ grouped_data keys:", list(grouped_data.keys()))
-
-    # Generate workbook
-    wb = generate_excel(grouped_data, lesson_1, lesson_2)  # must return a Workbook
-
-    # Write workbook into a BytesIO buffer
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
-    # Return as downloadable response
+    # Generate workbook and return as downloadable response
+    summaries = _export_summaries(request.user, lesson_1, lesson_2)
+    with phase("export"):
+        content = run_offloaded(build_export_bytes, grouped_data, lesson_1, lesson_2, summaries)
     response = HttpResponse(
-        buffer.getvalue(),
+        content,
         content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
     response["Content-Disposition"] = 'attachment; filename="student_export.xlsx"'
     return response
 
-def generate_excel(grouped_data, lesson_1, lesson_2):
-    wb = Workbook()
-    wb.remove(wb.active)  # Remove default empty sheet
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-
-    day_order = ["M", "Tu", "W", "Th", "F"]
-    day_labels = {"M":"M","Tu":"Tu","W":"W","Th":"Th","F":"F"}
-    schedule_map = {
-        "Intensive Reteach": ["M", "Tu", "W", "F"],
-        "Reteach": ["M", "W", "F"],
-        "Review": ["Tu", "Th"],
-        "None": [],
-        "Missing": [],
-        "Unclassified": []
-    }
-    categories = {
-        "Intensive Reteach": "🚨 Extra Boost Crew",
-        "Reteach": "🔄 Reteach Squad",
-        "Review": "🔍 Quick Checkers",
-        "None": "🌟 Ready to Fly"
-    }
-    group_colors = {
-        "Extra Boost Crew": "FFC0CB",  # Pink
-        "Reteach Squad": "FFFACD",     # Lemon
-        "Quick Checkers": "CCFFCC",    # Light green
-        "Ready to Fly": "ADD8E6",      # Light blue
-    }
-
-    lesson_names = {
-        "concept1": lesson_1["name"],
-        "concept2": lesson_2["name"]
-    }
-
-    for concept_key, groups in grouped_data.items():
-        if concept_key == "tags":
-            continue
-
-        sheet_title = sheet_name_with_date(lesson_names.get(concept_key, concept_key))
-        ws = wb.create_sheet(title=sheet_title)
-
-        if concept_key == "daily":
-            ws.append(["Student", "Group 1", "Concept 1", "Group 2", "Concept 2"])
-            for student in groups:
-                name = student.get("name", "")
-                group_1 = student.get("group_1", "")
-                concept_1 = student.get("concept_1", "")
-                group_2 = student.get("group_2", "")
-                concept_2 = student.get("concept_2", "")
-                ws.append([name, group_1, concept_1, group_2, concept_2])
-
-        elif isinstance(groups, dict):
-            ws.append(["Group", "Student", "Score"])
-            score_key = "score1" if concept_key == "concept1" else "score2"
-
-            for group_name, students in groups.items():
-                for student in students:
-                    # ✅ Handle dicts
-                    if isinstance(student, dict):
-                        name = student.get("name", "")
-                        score = student.get(score_key, "")
-                    # ✅ Handle 2-element tuples/lists
-                    elif isinstance(student, (list, tuple)) and len(student) == 2:
-                        name, score = student
-                    # ✅ Handle plain strings
-                    elif isinstance(student, str):
-                        name = student
-                        score = ""
-                    # ✅ Handle unexpected formats
-                    else:
-                        print(f"⚠️ Unexpected student format in {group_name}:", student)
-                        continue
-
-                    # ✅ Flatten deeply nested values
-                    if isinstance(name, (list, tuple)):
-                        name = ", ".join(str(x) for x in name)
-                    if isinstance(score, (list, tuple)):
-                        score = ", ".join(str(x) for x in score)
-
-                    ws.append([group_name, name, score])
-
-
-
-
-
-        else:
-            print(f"⚠️ Skipping {concept_key} — unexpected structure:", type(groups))
-            continue
-
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-
-        print("🔍 concept_key:", concept_key)
-        print("🔍 groups type:", type(groups))
-
-        if isinstance(groups, list):
-            print("🔍 groups sample:", groups[:1])
-        elif isinstance(groups, dict):
-            print("🔍 groups sample:", list(groups.items())[:1])
-        else:
-            print("🔍 groups sample:", groups)
-
-        ws.freeze_panes = "A2"
-        add_group_color_highlighting(ws, start_row=2, last_col="C", group_col="A")
-
-        # Leave a blank row before weekly plan
-        ws.append([])
-
-        # Weekly Plan Header
-        ws.append(["Focus Group"] + [day_labels[d] for d in day_order])
-        for cell in ws[ws.max_row]:
-            cell.font = header_font
-            cell.fill = header_fill
-
-        # Build weekly plan from grouped_data["tags"]
-        table_data = {cat: {day: [] for day in day_order} for cat in categories}
-        score_key = "score1" if concept_key == "concept1" else "score2"
-        max_points = lesson_1["full"]["total_points"] if concept_key == "concept1" else lesson_2["full"]["total_points"]
-        print("✅ Using max_points for", concept_key, ":", max_points)
-
-
-        for tag in grouped_data.get("tags", []):
-            score = tag.get(score_key)
-            name = tag["name"]
-            max_points = lesson_1["total_points"] if concept_key == "concept1" else lesson_2["total_points"]
-            group = get_instruction_group(score, max_points)
-
-            if group in table_data:
-                for day in schedule_map.get(group, []):
-                    table_data[group][day].append(name)
-
-        for group_key, label in categories.items():
-            row = [label]
-            for day in day_order:
-                names = ", ".join(table_data[group_key][day]) or "No group today for these student"
-                row.append(names)
-            ws.append(row)
-
-        # Wrap text
-
-        for row in ws.iter_rows(min_row=2, max_col=6):
-            for cell in row:
-                cell.alignment = Alignment(wrap_text=True)
-
-        # Autofit columns (use helper)
-        autofit_columns(ws)
-
-
-        # Row fills by group
-        for row in ws.iter_rows(min_row=ws.max_row - len(categories) + 1, max_col=6):
-            group_label = row[0].value
-            fill_color = group_colors.get(group_label)
-            if fill_color:
-                for cell in row:
-                    cell.fill = PatternFill(start_color=fill_color, end_color=fill_color, fill_type="solid")
-
-    return wb
 
 #def generate_excel_view_V2(request):
-    grouped_data = request.session.get("grouped_data", {})
-
-    print("✅ grouped_data keys:", list(grouped_data.keys()))
+#    grouped_data = request.session.get("grouped_data", {})
 
-    export_data = request.session.get("new_entries", [])
-    lessons = request.session.get("lessons", {})
+##    export_data = request.session.get("new_entries", [])
+#    lessons = request.session.get("lessons", {})
 
-    print("DEBUG export_data:", export_data)
-    print("DEBUG lessons:", lessons)
+#    print("DEBUG export_data:", export_data)
+#    print("DEBUG lessons:", lessons)
 
-    wb = generate_excel(export_data, lessons)  # must return a Workbook
+#    wb = generate_excel(export_data, lessons)  # must return a Workbook
 
-    # Write workbook into a BytesIO buffer
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+#    # Write workbook into a BytesIO buffer
+#    buffer = io.BytesIO()
+#    wb.save(buffer)
+#    buffer.seek(0)
 
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f'attachment; filename="Sort2Support_{datetime.now():%Y%m%d}.xlsx"'
-    return response
+#    response = HttpResponse(
+#        buffer.getvalue(),
+#        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+#    )
+#    response["Content-Disposition"] = f'attachment; filename="Sort2Support_{datetime.now():%Y%m%d}.xlsx"'
+#    return response
 
 #def generate_excel_V2(export_data, lessons):
-    wb = Workbook()
-    wb.remove(wb.active)
-
-    # --- Main Sheet ---
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    main_title = f"{today_str} Weekly Groupings"
-    ws_main = wb.active
-    ws_main.title = normalize_sheet_name(main_title, with_date=False)
-
-    headers = ["Name", "Concept", "Score"]
-    ws_main.append(headers)
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    for cell in ws_main[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-
-    for name, concept, score in export_data:
-        ws_main.append([name, concept, score])
-        score_cell = ws_main.cell(row=ws_main.max_row, column=3)
-        fill = get_fill(score)
-        if fill:
-            score_cell.fill = fill
-
-    ws_main.freeze_panes = "A2"
-    print("✅ Lessons keys:", list(lessons.keys()))
-
-    # --- Lesson Sheets ---
-    for lesson_title, students in lessons.items():
-        sheet_title = normalize_sheet_name(lesson_title)
-        if sheet_title not in wb.sheetnames:
-            ws = wb.create_sheet(title=sheet_title)
-            ws.append(["Student", "Score"])
-            for cell in ws[1]:
-                cell.font = header_font
-                cell.fill = header_fill
-        else:
-            ws = wb[sheet_title]
+#    wb = Workbook()
+#    wb.remove(wb.active)
+
+#    # --- Main Sheet ---
+#    today_str = datetime.now().strftime("%Y-%m-%d")
+#    main_title = f"{today_str} Weekly Groupings"
+#    ws_main = wb.active
+#    ws_main.title = normalize_sheet_name(main_title, with_date=False)
+
+#    headers = ["Name", "Concept", "Score"]
+#    ws_main.append(headers)
+
+#    header_font = Font(bold=True, color="FFFFFF")
+#    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+#    for cell in ws_main[1]:
+#        cell.font = header_font
+#        cell.fill = header_fill
+
+#    for name, concept, score in export_data:
+#        ws_main.append([name, concept, score])
+#        score_cell = ws_main.cell(row=ws_main.max_row, column=3)
+#        fill = get_fill(score)
+#        if fill:
+#            score_cell.fill = fill
+
+#    ws_main.freeze_panes = "A2"
+#    print("✅ Lessons keys:", list(lessons.keys()))
+
+#    # --- Lesson Sheets ---
+#    for lesson_title, students in lessons.items():
+#        sheet_title = normalize_sheet_name(lesson_title)
+#        if sheet_title not in wb.sheetnames:
+#            ws = wb.create_sheet(title=sheet_title)
+#            ws.append(["Student", "Score"])
+#            for cell in ws[1]:
+#                cell.font = header_font
+#                cell.fill = header_fill
+#        else:
+#            ws = wb[sheet_title]
+
+#        for name, score in students:
+#            ws.append([name, score])
+#            row_idx = ws.max_row
+#            fill = get_fill(score)
+#            if fill:
+#                ws.cell(row=row_idx, column=1).fill = fill
+#                ws.cell(row=row_idx, column=2).fill = fill
 
-        for name, score in students:
-            ws.append([name, score])
-            row_idx = ws.max_row
-            fill = get_fill(score)
-            if fill:
-                ws.cell(row=row_idx, column=1).fill = fill
-                ws.cell(row=row_idx, column=2).fill = fill
-
-        ws.freeze_panes = "A2"
+#        ws.freeze_panes = "A2"
 
-    # ✅ Return the workbook, not a response
-    return wb
+#    # ✅ Return the workbook, not a response
+#    return wb
 
 # --- BACKUP: original export_grouped_excel ---
 # def export_grouped_excel(request):
@@ -0,0 +1,161 @@
+"""
+Dashboard wizard state, stored as a single session value.
+
+The five-step dashboard used to keep a dozen flat session keys (step1_done …
+step5_open, lesson ids/names/max, entry_mode, student_count, one-shot
+just_* flags) and rebuild the same context dict in every branch. WizardState
+loads them once per request, tracks whether anything actually changed, writes
+them back once, and derives current_step and the template context.
+
+Only values that differ from their defaults are stored, so a fresh session
+costs nothing and a finished wizard is a handful of short keys.
+"""
+from main.utils.preview_codec import SESSION_KEY as PREVIEW_KEY
+
+SESSION_KEY = "wizard"
+STEPS = ("step1", "step2", "step3", "step4", "step5")
+
+DEFAULTS = {
+    "step1_done": False,
+    "step2_done": False,
+    "step3_done": False,
+    "step4_done": False,
+    "step5_done": False,
+    "step3_open": False,
+    "step4_open": False,
+    "step5_open": False,
+    "lesson_1_id": None,
+    "lesson_2_id": None,
+    "lesson_1_name": None,
+    "lesson_2_name": None,
+    "lesson_1_max": None,
+    "lesson_2_max": None,
+    "entry_mode": "paste",
+    "student_count": 0,
+    "loaded_roster_name": None,
+    "loaded_roster_version": None,  # checked when the roster is saved back under the same name
+    # One-shot flags: read with pop(), cleared on the next render
+    "just_grouped": False,
+    "just_finalized": False,
+    "just_loaded": False,
+}
+
+# Completing a step unlocks the panel of the step after it
+OPENS = {"step2": "step3_open", "step3": "step4_open", "step5": "step5_open"}
+
+# Steps 4 and 5 depend on the grouping; new lessons or a new roster invalidate them
+GROUPING_KEYS = ("step4_done", "step5_done", "step4_open", "step5_open")
+
+# Session values built from the current roster's scores
+ROSTER_SESSION_KEYS = (PREVIEW_KEY, "grouped_html", "grouped_data", "grouped_daily")
+
+
+class WizardState:
+    """Dashboard progress for one session; attribute access, explicit save."""
+
+    __slots__ = ("_values", "dirty")
+
+    def __init__(self, values=None):
+        self._values = {k: v for k, v in (values or {}).items() if k in DEFAULTS}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, session):
+        return cls(session.get(SESSION_KEY))
+
+    @classmethod
+    async def aload(cls, session):
+        return cls(await session.aget(SESSION_KEY))
+
+    def __getattr__(self, name):
+        try:
+            return self._values.get(name, DEFAULTS[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def update(self, **changes):
+        """Sets fields, marking the state dirty only if a value actually changes."""
+        for name, value in changes.items():
+            if name not in DEFAULTS:
+                raise AttributeError(name)
+            if getattr(self, name) == value:
+                continue
+            if value == DEFAULTS[name]:
+                self._values.pop(name, None)
+            else:
+                self._values[name] = value
+            self.dirty = True
+
+    def pop(self, name):
+        """Returns a one-shot flag and clears it."""
+        value = getattr(self, name)
+        self.update(**{name: DEFAULTS[name]})
+        return value
+
+    def complete(self, step):
+        """Marks a step done and opens the panel it unlocks."""
+        changes = {f"{step}_done": True}
+        if step in OPENS:
+            changes[OPENS[step]] = True
+        self.update(**changes)
+
+    def set_lessons(self, lesson_1, lesson_2):
+        """Records the two selected UFLI lessons (catalog dicts); a different pair reopens steps 4 and 5."""
+        if (self.lesson_1_id, self.lesson_2_id) != (str(lesson_1["number"]), str(lesson_2["number"])):
+            self.reset_grouping()
+        self.update(
+            lesson_1_id=str(lesson_1["number"]),
+            lesson_2_id=str(lesson_2["number"]),
+            lesson_1_name=lesson_1["concept"],
+            lesson_2_name=lesson_2["concept"],
+            lesson_1_max=lesson_1["total_points"],
+            lesson_2_max=lesson_2["total_points"],
+        )
+
+    def reset_grouping(self):
+        self.update(**{name: False for name in GROUPING_KEYS})
+
+    @property
+    def current_step(self):
+        for step in STEPS:
+            if not getattr(self, f"{step}_done"):
+                return step
+        return "complete"
+
+    def context(self):
+        """Template variables for the dashboard; one-shot flags are left to the caller."""
+        context = {name: getattr(self, name) for name in DEFAULTS if not name.startswith("just_")}
+        context["current_step"] = self.current_step
+        return context
+
+    def save(self, session):
+        if self.dirty:
+            session[SESSION_KEY] = dict(self._values)
+            self.dirty = False
+
+    async def asave(self, session):
+        if self.dirty:
+            await session.aset(SESSION_KEY, dict(self._values))
+            self.dirty = False
+
+
+def clear_roster_session(session, *extra_keys):
+    """Drops the roster's preview and grouping (plus extra_keys) and reopens the grouping steps."""
+    for key in ROSTER_SESSION_KEYS + extra_keys:
+        session.pop(key, None)
+    wizard = WizardState.load(session)
+    wizard.reset_grouping()
+    wizard.save(session)
+
+
+def lesson_meta(lesson_1, lesson_2):
+    """The session's lesson_meta value, read by the Excel exports."""
+    return {
+        key: {
+            "id": str(lesson["number"]),
+            "name": lesson["concept"],
+            "max": lesson["total_points"],
+            "full": lesson,
+        }
+        for key, lesson in (("lesson_1", lesson_1), ("lesson_2", lesson_2))
+    }
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
+    "whitenoise.runserver_nostatic",
     "django.contrib.staticfiles",
     "excel_app",
     "main",
@@ -39,12 +40,15 @@ LOGOUT_REDIRECT_URL = "login"
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "main.middleware.RequestProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "main.middleware.OffloadBackpressureMiddleware",
 ]
 
 ROOT_URLCONF = "sort2support.urls"
@@ -52,18 +56,20 @@ ROOT_URLCONF = "sort2support.urls"
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        'DIRS': [
-            BASE_DIR / 'main' / 'templates', 
-            BASE_DIR / "excel_app" / "templates",
-   
-        ],
-        "APP_DIRS": True,
+        # Templates live in each app's templates/ dir; compiled once per process
+        # (the cached loader still picks up edits under runserver's autoreloader)
+        "DIRS": [],
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
         },
     },
 ]
@@ -84,6 +90,25 @@ DATABASES = {
 }
 
 
+# Cache. Sessions, the dashboard fragments, schedules, analytics and grouping
+# results all rely on version keys in this cache, so every process must share
+# it: with more than one worker (gunicorn -w N) set CACHE_URL to redis or
+# memcached. The local-memory default only suits a single dev process, and
+# `manage.py check --deploy` fails on it when DEBUG is off (main/checks.py).
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://sort2support"),
+}
+LOCAL_CACHE = CACHES["default"]["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache"
+
+# Sessions: cache-first reads with DB fallback, and saves skipped when nothing changed.
+# A per-process cache would serve each worker its own stale copy, so read the DB then.
+SESSION_ENGINE = env(
+    "SESSION_ENGINE", default="django.contrib.sessions.backends.db" if LOCAL_CACHE else "main.sessions"
+)
+SESSION_CACHE_ALIAS = "default"
+SESSION_SAVE_EVERY_REQUEST = False
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -100,8 +125,18 @@ USE_TZ = True
 
 # Static & Media
 STATIC_URL = "/static/"
-STATICFILES_DIRS = [BASE_DIR / "main" / "static"]  # dev assets
-STATIC_ROOT = BASE_DIR / "staticfiles"    # collectstatic output
+STATIC_ROOT = BASE_DIR / "staticfiles"    # collectstatic output (app static/ dirs are found automatically)
+
+# WhiteNoise serves STATIC_ROOT: hashed file names cached for a year as immutable,
+# with gzip (and brotli, when Brotli is installed) copies built by collectstatic.
+# While developing, files are served unhashed straight from the app directories.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+        else "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
@@ -117,8 +152,44 @@ EMAIL_HOST_USER = env("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
 EMAIL_USE_TLS = env.bool("EMAIL_USE_TLS", default=True)
 
-print("EMAIL HOST:", EMAIL_HOST)
-print("EMAIL USER:", EMAIL_HOST_USER)
+# Upload guardrails (checked before any workbook is parsed, see main/utils/upload_limits.py)
+UPLOAD_MAX_BYTES = env.int("UPLOAD_MAX_BYTES", default=2 * 1024 * 1024)
+UPLOAD_MAX_UNCOMPRESSED_BYTES = env.int("UPLOAD_MAX_UNCOMPRESSED_BYTES", default=20 * 1024 * 1024)
+UPLOAD_MAX_SHEETS = env.int("UPLOAD_MAX_SHEETS", default=10)
+UPLOAD_MAX_ROWS = env.int("UPLOAD_MAX_ROWS", default=1000)  # extra rows are dropped, not rejected
+
+# Offloaded work (xlsx parsing / workbook builds run in a shared pool, see main/utils/offload.py)
+OFFLOAD_EXECUTOR = env("OFFLOAD_EXECUTOR", default="process")  # "process" or "thread"
+OFFLOAD_MAX_WORKERS = env.int("OFFLOAD_MAX_WORKERS", default=2)
+OFFLOAD_MAX_PENDING = env.int("OFFLOAD_MAX_PENDING", default=8)  # queued jobs before 503s
+OFFLOAD_RETRY_AFTER = env.int("OFFLOAD_RETRY_AFTER", default=5)  # seconds, sent as Retry-After
+OFFLOAD_TIMEOUT = env.int("OFFLOAD_TIMEOUT", default=120)
+OFFLOAD_START_METHOD = env("OFFLOAD_START_METHOD", default="spawn")
+
+# Per-request phase timings as Server-Timing headers and "main.profiling" logs
+REQUEST_PROFILING = env.bool("REQUEST_PROFILING", default=DEBUG)
+
+# Logging: records are queued and written by a background thread (see main/utils/log_queue.py).
+# App loggers default to DEBUG only when DEBUG is on, so debug calls cost nothing in production.
+LOG_LEVEL = env("LOG_LEVEL", default="DEBUG" if DEBUG else "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "keyvalue": {
+            "()": "main.utils.log_queue.KeyValueFormatter",
+            "format": "%(asctime)s %(levelname)s %(name)s %(message)s",
+        },
+    },
+    "handlers": {
+        "queued": {"()": "main.utils.log_queue.QueuedStreamHandler", "formatter": "keyvalue"},
+    },
+    "root": {"handlers": ["queued"], "level": "WARNING"},
+    "loggers": {
+        "main": {"level": LOG_LEVEL},
+        "excel_app": {"level": LOG_LEVEL},
+    },
+}
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"